@@ -0,0 +1,175 @@
+"""
+Reparto de vídeos entre varios hosts que comparten videos/ y procesados/
+Antes de procesar un vídeo, el nodo crea su fichero de arrendamiento (lease) en
+procesados/.leases/ con O_CREAT|O_EXCL, que es atómico también en recursos compartidos.
+Un hilo de latido renueva la fecha de modificación de los arrendamientos propios; si un
+nodo cae, sus arrendamientos caducan pasados LEASE_TTL_SECONDS y otro nodo los recupera.
+El paso final (mover el vídeo a procesados/) solo se hace si el arrendamiento sigue
+siendo del nodo, de modo que cada resultado se confirma una única vez
+"""
+import json
+import os
+import pathlib
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+
+
+def cargar_config_arrendamientos():
+    return {
+        'ttl': float(os.getenv('LEASE_TTL_SECONDS', '120')),
+        'latido': float(os.getenv('LEASE_HEARTBEAT_SECONDS', '30'))
+    }
+
+
+class Arrendamientos:
+    """Arrendamientos de los vídeos que este nodo está procesando"""
+
+    def __init__(self, carpeta, ttl=120, latido=30):
+        self.carpeta = pathlib.Path(carpeta)
+        self.carpeta.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.latido = latido
+        self.nodo = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.propios = set()
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def ruta(self, nombre):
+        return self.carpeta / f"{nombre}.lease"
+
+    def _crear(self, nombre):
+        """Crea el fichero de arrendamiento; False si ya existe"""
+        try:
+            fd = os.open(str(self.ruta(nombre)), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'nodo': self.nodo, 'host': socket.gethostname(),
+                       'adquirido': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        return True
+
+    def _titular(self, nombre):
+        try:
+            with open(self.ruta(nombre), 'r', encoding='utf-8') as f:
+                return json.load(f).get('nodo')
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _caducado(self, nombre):
+        try:
+            return time.time() - self.ruta(nombre).stat().st_mtime > self.ttl
+        except FileNotFoundError:
+            return False
+
+    def adquirir(self, nombre):
+        """Intenta quedarse con el vídeo; recupera arrendamientos caducados de nodos caídos"""
+        if self._crear(nombre):
+            with self._lock:
+                self.propios.add(nombre)
+            return True
+
+        if not self._caducado(nombre):
+            return False
+
+        # Solo un nodo consigue renombrar el arrendamiento caducado: ese es el que lo recupera
+        lapida = self.ruta(nombre).with_name(f"{nombre}.lease.{uuid.uuid4().hex[:8]}.caducado")
+        try:
+            os.rename(self.ruta(nombre), lapida)
+        except FileNotFoundError:
+            return False
+        # Si el titular renovó justo entre la comprobación y el renombrado, se le devuelve
+        if time.time() - lapida.stat().st_mtime <= self.ttl:
+            try:
+                os.rename(lapida, self.ruta(nombre))
+            except OSError:
+                pass
+            return False
+        lapida.unlink()
+        print(f"🔓 Arrendamiento caducado de {nombre} recuperado")
+        return self.adquirir(nombre)
+
+    def vigente(self, nombre):
+        """True si el arrendamiento sigue siendo de este nodo (comprobar antes de confirmar)"""
+        return self._titular(nombre) == self.nodo
+
+    def renovar_todos(self):
+        with self._lock:
+            propios = list(self.propios)
+        for nombre in propios:
+            if self.vigente(nombre):
+                try:
+                    os.utime(self.ruta(nombre))
+                    continue
+                except FileNotFoundError:
+                    # Liberado entre la comprobación y la renovación (aquí o por otro nodo)
+                    pass
+            with self._lock:
+                perdido = nombre in self.propios
+                self.propios.discard(nombre)
+            if perdido:
+                print(f"⚠️ Se ha perdido el arrendamiento de {nombre}")
+
+    def liberar(self, nombre):
+        with self._lock:
+            self.propios.discard(nombre)
+        if self.vigente(nombre):
+            try:
+                self.ruta(nombre).unlink()
+            except FileNotFoundError:
+                pass
+
+    def liberar_todos(self):
+        with self._lock:
+            propios = list(self.propios)
+        for nombre in propios:
+            self.liberar(nombre)
+
+    def _latir(self):
+        while not self._parar.wait(self.latido):
+            # Un fallo al renovar no puede parar el latido: los demás vídeos quedarían sin renovar
+            try:
+                self.renovar_todos()
+            except Exception as e:
+                print(f"⚠️ Error renovando arrendamientos: {e}")
+
+    def iniciar_latidos(self):
+        self._hilo = threading.Thread(target=self._latir, name="latido-arrendamientos", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._parar.set()
+        if self._hilo:
+            self._hilo.join()
+        self.liberar_todos()
+
+    def reclamar(self, lotes, al_rechazar=None):
+        """Genera solo los lotes cuyos vídeos ha podido arrendar este nodo
+
+        Se reclama en el momento de extraer cada lote (no todos al principio), así los
+        nodos se reparten el trabajo a medida que quedan libres. `al_rechazar` recibe el
+        nombre de cada vídeo que se queda otro nodo.
+        """
+        for lote in lotes:
+            adquiridos = []
+            for candidato in lote:
+                fichero = candidato['fichero']
+                if self.adquirir(fichero.name):
+                    adquiridos.append(candidato)
+                    # Otro nodo pudo terminarlo y moverlo antes de que lo arrendáramos
+                    if not fichero.exists():
+                        self.liberar(fichero.name)
+                        adquiridos.pop()
+                        if al_rechazar:
+                            al_rechazar(fichero.name)
+                else:
+                    print(f"🔒 {fichero.name}: lo está procesando otro nodo")
+                    if al_rechazar:
+                        al_rechazar(fichero.name)
+            if adquiridos:
+                yield adquiridos
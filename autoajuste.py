@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Autoajuste de faster-whisper para el host actual
+Mide un clip de referencia con cada combinación de compute_type, cpu_threads y
+num_workers, y guarda la más rápida por host, modelo y dispositivo en autoajuste.json.
+transcribir.py carga esa configuración automáticamente; las variables WHISPER_*
+del .env, si tienen valor, siguen mandando sobre el autoajuste
+
+Uso:
+    python autoajuste.py                          # clip: primer vídeo de videos_backup/
+    python autoajuste.py --clip ruta/al/video.mp4 --segundos 90
+    python autoajuste.py --modelo medium --tipos int8 float32 --hilos 4 8 --workers 1 2
+    python autoajuste.py --mostrar                # configuraciones guardadas
+"""
+import argparse
+import os
+import pathlib
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import torch
+from dotenv import load_dotenv
+from faster_whisper import WhisperModel, decode_audio
+
+from estado_trabajos import escribir_json_atomico, leer_json
+from modelos import resolver_modelo
+
+load_dotenv()
+
+RUTA_POR_DEFECTO = pathlib.Path(__file__).parent / "autoajuste.json"
+
+TIPOS_CPU = ['int8', 'int8_float32', 'float32']
+TIPOS_CUDA = ['float16', 'int8_float16', 'int8', 'float32']
+
+# Valores usados cuando no hay ni variable de entorno ni autoajuste para el host
+POR_DEFECTO = {
+    'cuda': {'compute_type': 'float16', 'cpu_threads': 0, 'num_workers': 1},
+    'cpu': {'compute_type': 'int8', 'cpu_threads': 0, 'num_workers': 1}
+}
+
+VIDEO_EXTS = [".mp4", ".mkv", ".avi", ".mov", ".m4a", ".mp3", ".wav"]
+
+
+def ruta_autoajuste():
+    return pathlib.Path(os.getenv('AUTOTUNE_FILE') or RUTA_POR_DEFECTO)
+
+
+def clave_host(modelo, device):
+    return f"{socket.gethostname()}|{modelo}|{device}"
+
+
+def leer_variable(nombre, tipo=str):
+    """Valor de una variable WHISPER_* o None si no está definida o está vacía"""
+    valor = os.getenv(nombre, '').strip()
+    return tipo(valor) if valor else None
+
+
+def cargar_config_whisper(device):
+    """Configuración de WhisperModel: variables de entorno > autoajuste del host > valores por defecto"""
+    modelo = leer_variable('WHISPER_MODEL') or 'small'
+    guardada = (leer_json(ruta_autoajuste()) or {}).get(clave_host(modelo, device))
+
+    config = {'modelo': modelo, 'device': device, **POR_DEFECTO[device], 'origen': 'por defecto'}
+    if guardada:
+        config.update({k: guardada[k] for k in ('compute_type', 'cpu_threads', 'num_workers')})
+        config['origen'] = f"autoajuste del {guardada['fecha']}"
+
+    for clave, variable, tipo in (('compute_type', 'WHISPER_COMPUTE_TYPE', str),
+                                  ('cpu_threads', 'WHISPER_CPU_THREADS', int),
+                                  ('num_workers', 'WHISPER_NUM_WORKERS', int)):
+        valor = leer_variable(variable, tipo)
+        if valor is not None:
+            config[clave] = valor
+            config['origen'] = "variables de entorno" if config['origen'] == 'por defecto' else f"{config['origen']} + .env"
+
+    return config
+
+
+def clip_referencia(ruta, segundos, sampling_rate=16000):
+    """Decodifica los primeros segundos del clip de referencia"""
+    audio = decode_audio(str(ruta), sampling_rate=sampling_rate)
+    return audio[:int(segundos * sampling_rate)]
+
+
+def medir_configuracion(modelo, device, audio, compute_type, cpu_threads, num_workers, sampling_rate=16000):
+    """Transcribe el clip num_workers veces en paralelo y devuelve la velocidad (segundos de audio por segundo)"""
+    model = WhisperModel(resolver_modelo(modelo, compute_type), device=device, compute_type=compute_type,
+                         cpu_threads=cpu_threads, num_workers=num_workers)
+
+    def transcribir(_):
+        segments, _info = model.transcribe(audio, language="es", beam_size=5, word_timestamps=True)
+        return len(list(segments))
+
+    # Calentamiento: la primera llamada incluye inicializaciones que no cuentan
+    transcribir(None)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_workers) as ejecutor:
+        list(ejecutor.map(transcribir, range(num_workers)))
+    segundos = time.perf_counter() - inicio
+    return len(audio) / sampling_rate * num_workers / segundos
+
+
+def combinaciones(device, tipos=None, hilos=None, workers=None):
+    nucleos = os.cpu_count() or 4
+    tipos = tipos or (TIPOS_CUDA if device == 'cuda' else TIPOS_CPU)
+    # En GPU los hilos de CPU apenas influyen: solo se prueba el valor por defecto de CTranslate2
+    hilos = hilos or ([0] if device == 'cuda' else sorted({max(1, nucleos // 4), max(1, nucleos // 2), nucleos}))
+    workers = workers or [1, 2]
+    return [(t, h, w) for t in tipos for h in hilos for w in workers]
+
+
+def autoajustar(clip, modelo, device, segundos=60, tipos=None, hilos=None, workers=None):
+    """Prueba todas las combinaciones, guarda la más rápida y devuelve la lista de resultados"""
+    audio = clip_referencia(clip, segundos)
+    print(f"🎯 Clip de referencia: {clip.name} ({len(audio) / 16000:.0f}s) · modelo {modelo} · {device}")
+
+    resultados = []
+    for compute_type, cpu_threads, num_workers in combinaciones(device, tipos, hilos, workers):
+        etiqueta = f"{compute_type:<13} hilos={cpu_threads:<3} workers={num_workers}"
+        try:
+            velocidad = medir_configuracion(modelo, device, audio, compute_type, cpu_threads, num_workers)
+        except Exception as e:
+            # Algunos compute_type no están soportados en todos los dispositivos
+            print(f"   ⚠️ {etiqueta} → no disponible: {e}")
+            continue
+        print(f"   ⏱️ {etiqueta} → {velocidad:.2f}x")
+        resultados.append({'compute_type': compute_type, 'cpu_threads': cpu_threads,
+                           'num_workers': num_workers, 'velocidad': round(velocidad, 3)})
+
+    if not resultados:
+        return resultados
+
+    mejor = max(resultados, key=lambda r: r['velocidad'])
+    ruta = ruta_autoajuste()
+    guardadas = leer_json(ruta) or {}
+    guardadas[clave_host(modelo, device)] = {
+        **mejor,
+        'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'clip': clip.name,
+        'segundos_clip': round(len(audio) / 16000, 1),
+        'resultados': resultados
+    }
+    escribir_json_atomico(ruta, guardadas)
+    print(f"✅ Más rápida: {mejor['compute_type']}, cpu_threads={mejor['cpu_threads']}, "
+          f"num_workers={mejor['num_workers']} ({mejor['velocidad']:.2f}x) → guardada en {ruta.name}")
+    return resultados
+
+
+def buscar_clip():
+    """Primer vídeo de videos_backup/ (o de videos/) para usar como referencia"""
+    base = pathlib.Path(__file__).parent
+    for carpeta in (base / "videos_backup", base / "videos"):
+        if carpeta.exists():
+            for fichero in sorted(carpeta.iterdir()):
+                if fichero.suffix.lower() in VIDEO_EXTS:
+                    return fichero
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Busca la configuración más rápida de faster-whisper para este host")
+    parser.add_argument('--clip', type=pathlib.Path, help="Vídeo o audio de referencia (por defecto el primero de videos_backup/)")
+    parser.add_argument('--segundos', type=float, default=60, help="Segundos del clip que se transcriben en cada prueba")
+    parser.add_argument('--modelo', help="Modelo Whisper (por defecto WHISPER_MODEL o small)")
+    parser.add_argument('--dispositivo', choices=['cpu', 'cuda'], help="Por defecto cuda si está disponible")
+    parser.add_argument('--tipos', nargs='+', help="compute_type a probar")
+    parser.add_argument('--hilos', nargs='+', type=int, help="Valores de cpu_threads a probar")
+    parser.add_argument('--workers', nargs='+', type=int, help="Valores de num_workers a probar")
+    parser.add_argument('--mostrar', action='store_true', help="Muestra las configuraciones guardadas y sale")
+    args = parser.parse_args()
+
+    if args.mostrar:
+        guardadas = leer_json(ruta_autoajuste()) or {}
+        if not guardadas:
+            print("📭 No hay configuraciones guardadas")
+        for clave, config in sorted(guardadas.items()):
+            print(f"{clave:<40} {config['compute_type']:<13} hilos={config['cpu_threads']:<3} "
+                  f"workers={config['num_workers']} {config['velocidad']:.2f}x ({config['fecha']})")
+        return
+
+    if args.dispositivo:
+        device = args.dispositivo
+    else:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    clip = args.clip or buscar_clip()
+    if not clip or not clip.exists():
+        print("❌ No se encontró un clip de referencia: indica uno con --clip")
+        return
+
+    autoajustar(clip, args.modelo or leer_variable('WHISPER_MODEL') or 'small', device,
+                args.segundos, args.tipos, args.hilos, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Búsqueda de texto completo en todas las transcripciones
+Cada segmento transcrito se guarda en la tabla `segmentos_busqueda` del registro SQLite
+con su vídeo, código, inicio/fin en milisegundos y número en el .srt, y se indexa en la
+tabla FTS5 `busqueda`. Los términos se indexan en minúsculas, sin tildes y reducidos a
+su raíz con el stemmer Snowball de español (nltk), así "programación" encuentra también
+"programar" o "programacion". El pipeline indexa cada vídeo al terminarlo (sin nltk
+instalado, la transcripción sigue y la búsqueda queda desactivada)
+
+Uso:
+    python busqueda.py buscar "bucle for" [--limite 20] [--codigo KK-F1]
+    python busqueda.py reindexar            # indexa todo lo que hay en procesados/
+"""
+import argparse
+import pathlib
+import re
+import unicodedata
+from functools import lru_cache
+
+from codigos_video import descomponer_codigo_video
+from historico import NOMBRE_ARCHIVO, ArchivoHistorico, segmentos_video
+from registro_db import RegistroEjecuciones
+
+ESQUEMA_BUSQUEDA = """
+CREATE TABLE IF NOT EXISTS segmentos_busqueda (
+    id INTEGER PRIMARY KEY,
+    video TEXT NOT NULL,
+    codigo_video TEXT,
+    indice_srt INTEGER NOT NULL,
+    inicio_ms INTEGER NOT NULL,
+    fin_ms INTEGER NOT NULL,
+    texto TEXT NOT NULL,
+    terminos TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_segmentos_busqueda_video ON segmentos_busqueda(video);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS busqueda USING fts5(
+    terminos, content='segmentos_busqueda', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS segmentos_busqueda_ai AFTER INSERT ON segmentos_busqueda BEGIN
+    INSERT INTO busqueda(rowid, terminos) VALUES (new.id, new.terminos);
+END;
+
+CREATE TRIGGER IF NOT EXISTS segmentos_busqueda_ad AFTER DELETE ON segmentos_busqueda BEGIN
+    INSERT INTO busqueda(busqueda, rowid, terminos) VALUES ('delete', old.id, old.terminos);
+END;
+"""
+
+PATRON_PALABRA = re.compile(r'\w+')
+
+
+@lru_cache(maxsize=1)
+def cargar_stemmer():
+    # Dependencia opcional: solo la necesitan la búsqueda y el resumen extractivo
+    try:
+        from nltk.stem.snowball import SnowballStemmer
+    except ImportError:
+        raise RuntimeError("La búsqueda de texto completo requiere nltk: pip install nltk")
+    return SnowballStemmer('spanish')
+
+
+def sin_tildes(texto):
+    return "".join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
+
+
+@lru_cache(maxsize=100000)
+def raiz(palabra):
+    """Raíz de una palabra en minúsculas y sin tildes (la que se indexa y se busca)"""
+    return sin_tildes(cargar_stemmer().stem(palabra))
+
+
+def terminos(texto):
+    return " ".join(raiz(palabra) for palabra in PATRON_PALABRA.findall(texto.lower()))
+
+
+def consulta_fts(texto):
+    """Convierte la búsqueda del usuario en una consulta FTS5 (todas las raíces, la última como prefijo)"""
+    raices = terminos(texto).split()
+    if not raices:
+        return None
+    return " ".join([f'"{r}"' for r in raices[:-1]] + [f'"{raices[-1]}"*'])
+
+
+def formato_ms(ms):
+    segundos, ms = divmod(int(ms), 1000)
+    minutos, segundos = divmod(segundos, 60)
+    horas, minutos = divmod(minutos, 60)
+    return f"{horas:02d}:{minutos:02d}:{segundos:02d}.{ms:03d}"
+
+
+class IndiceBusqueda:
+    """Índice FTS5 de segmentos sobre el registro SQLite"""
+
+    def __init__(self, registro):
+        # Sin stemmer no se puede indexar: se avisa al crear el índice y no a mitad de un vídeo
+        cargar_stemmer()
+        self.registro = registro
+        with registro.lock, registro.conn:
+            registro.conn.executescript(ESQUEMA_BUSQUEDA)
+
+    def indexar_video(self, nombre, segmentos):
+        """Sustituye los segmentos indexados del vídeo (por su nombre sin extensión) en una sola transacción"""
+        codigo = (descomponer_codigo_video(nombre) or {}).get('codigo')
+        filas = [
+            (nombre, codigo, i, int(round(s['inicio'] * 1000)), int(round(s['fin'] * 1000)), s['texto'], terminos(s['texto']))
+            for i, s in enumerate(segmentos, 1) if s['texto']
+        ]
+        with self.registro.lock, self.registro.conn:
+            self.registro.conn.execute("DELETE FROM segmentos_busqueda WHERE video = ?", (nombre,))
+            self.registro.conn.executemany(
+                """INSERT INTO segmentos_busqueda (video, codigo_video, indice_srt, inicio_ms, fin_ms, texto, terminos)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                filas
+            )
+        return len(filas)
+
+    def quitar_otros(self, nombres):
+        """Elimina los segmentos de los vídeos que no están en `nombres` (borrados o renombrados)"""
+        nombres = set(nombres)
+        with self.registro.lock, self.registro.conn:
+            indexados = {fila[0] for fila in self.registro.conn.execute("SELECT DISTINCT video FROM segmentos_busqueda")}
+            sobrantes = sorted(indexados - nombres)
+            self.registro.conn.executemany("DELETE FROM segmentos_busqueda WHERE video = ?", [(v,) for v in sobrantes])
+        return sobrantes
+
+    def buscar(self, texto, limite=20, codigo=None):
+        """Segmentos que contienen todos los términos, ordenados por relevancia (BM25)"""
+        consulta = consulta_fts(texto)
+        if not consulta:
+            return []
+        filtro = "AND s.codigo_video LIKE ?" if codigo else ""
+        parametros = [consulta] + ([f"{codigo}%"] if codigo else []) + [limite]
+        return self.registro.consultar(
+            f"""SELECT s.video, s.codigo_video, s.indice_srt, s.inicio_ms, s.fin_ms, s.texto, bm25(busqueda) AS puntuacion
+                FROM busqueda JOIN segmentos_busqueda s ON s.id = busqueda.rowid
+                WHERE busqueda MATCH ? {filtro}
+                ORDER BY puntuacion LIMIT ?""",
+            parametros
+        )
+
+
+def reindexar(indice, carpeta_procesados):
+    """Indexa todos los vídeos de procesados/ (y del histórico) y quita los que ya no están"""
+    stems = {p.parent.name for p in carpeta_procesados.glob("*/*.srt") if p.stem == p.parent.name}
+    if (carpeta_procesados / NOMBRE_ARCHIVO).exists():
+        stems |= set(ArchivoHistorico(carpeta_procesados).indice['videos'])
+    total = 0
+    for stem in sorted(stems):
+        total += indice.indexar_video(stem, segmentos_video(carpeta_procesados, stem) or [])
+    return len(stems), total, indice.quitar_otros(stems)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Búsqueda de texto completo en las transcripciones")
+    parser.add_argument('--db', help="Ruta de la base de datos (por defecto REGISTRO_DB o registro_transcripciones.db)")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_buscar = sub.add_parser('buscar', help="Busca un término o frase")
+    p_buscar.add_argument('texto')
+    p_buscar.add_argument('--limite', type=int, default=20)
+    p_buscar.add_argument('--codigo', help="Limita a un curso, fase o vídeo (KK, KK-F1, KK-F1-v2...)")
+    p_reindexar = sub.add_parser('reindexar', help="Indexa todas las transcripciones de procesados/")
+    p_reindexar.add_argument('--procesados', default=str(pathlib.Path(__file__).parent / "procesados"))
+    args = parser.parse_args()
+
+    registro = RegistroEjecuciones(args.db)
+    try:
+        indice = IndiceBusqueda(registro)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return
+
+    if args.comando == 'buscar':
+        resultados = indice.buscar(args.texto, args.limite, args.codigo)
+        if not resultados:
+            print(f"🔍 Sin resultados para '{args.texto}'")
+        for fila in resultados:
+            print(f"🎞️ {fila['video']}  #{fila['indice_srt']}  {formato_ms(fila['inicio_ms'])} - {formato_ms(fila['fin_ms'])} "
+                  f"({fila['inicio_ms']}-{fila['fin_ms']} ms)")
+            print(f"   {fila['texto']}")
+
+    elif args.comando == 'reindexar':
+        videos, total, eliminados = reindexar(indice, pathlib.Path(args.procesados))
+        print(f"✅ {videos} vídeos reindexados ({total} segmentos)")
+        if eliminados:
+            print(f"🗑️ Quitados del índice {len(eliminados)} vídeos que ya no están: {', '.join(eliminados)}")
+
+    registro.cerrar()
+
+
+if __name__ == "__main__":
+    main()
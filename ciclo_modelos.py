@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Ciclo de vida de los modelos de Ollama: disponibilidad, descarga, precarga y keep_alive
+- Qué modelos tiene cada servidor se guarda en OLLAMA_MODELS_CACHE_FILE y se da por bueno
+  durante OLLAMA_MODELS_CACHE_SECONDS: una ejecución no vuelve a listar los modelos.
+- Las descargas (ollama pull) son un paso previo (python ciclo_modelos.py preparar); un
+  trabajo de documentación no descarga nada a mitad: si falta el modelo, avisa y termina.
+- Antes de un lote, los modelos se cargan en memoria en segundo plano (una petición vacía
+  con keep_alive) mientras se prepara el prompt, y cada llamada renueva OLLAMA_KEEP_ALIVE:
+  la primera respuesta tarda lo mismo que las siguientes.
+
+Uso:
+    python ciclo_modelos.py preparar [modelo ...]   # descarga los que falten (por defecto OLLAMA_MODEL y DEEPSEEK_MODEL)
+    python ciclo_modelos.py precargar [modelo ...]  # los deja cargados en todos los servidores
+    python ciclo_modelos.py liberar [modelo ...]    # los descarga de memoria
+    python ciclo_modelos.py estado
+"""
+import argparse
+import os
+import pathlib
+import threading
+import time
+
+import metricas
+from estado_trabajos import escribir_json_atomico, leer_json
+from pool_ollama import obtener_pool
+
+
+def cargar_config_modelos():
+    return {
+        'keep_alive': os.getenv('OLLAMA_KEEP_ALIVE', '30m'),
+        'cache_segundos': float(os.getenv('OLLAMA_MODELS_CACHE_SECONDS', '3600')),
+        'ruta_cache': pathlib.Path(os.getenv('OLLAMA_MODELS_CACHE_FILE')
+                                   or pathlib.Path(__file__).parent / "ollama_modelos.json")
+    }
+
+
+def modelos_configurados():
+    return [os.getenv('OLLAMA_MODEL', 'llama2'), os.getenv('DEEPSEEK_MODEL', 'deepseek-r1:latest')]
+
+
+class GestorModelos:
+    """Disponibilidad cacheada, descargas previas y precarga de modelos sobre el pool de Ollama"""
+
+    def __init__(self, pool, config):
+        self.pool = pool
+        self.keep_alive = config['keep_alive']
+        self.cache_segundos = config['cache_segundos']
+        self.ruta_cache = config['ruta_cache']
+        self._sembrar_desde_cache()
+
+    def _sembrar_desde_cache(self):
+        """Da a los servidores del pool los modelos de la caché si aún es vigente (sin llamar a /api/tags)"""
+        cache = leer_json(self.ruta_cache) or {}
+        ahora = time.time()
+        # Servidores cuyo estado viene de la caché (no se reescriben con una fecha nueva)
+        self.desde_cache = set()
+        for servidor in self.pool.servidores:
+            entrada = cache.get(servidor.host)
+            if entrada and ahora - entrada['comprobado'] < self.cache_segundos:
+                self.desde_cache.add(servidor.host)
+                servidor.modelos = set(entrada['modelos'])
+                servidor.sano = True
+                # Cuenta como comprobación: el pool no vuelve a listar hasta pasado su intervalo de salud
+                # (un servidor caído se detecta igualmente al fallar la conexión)
+                servidor.comprobado = time.monotonic()
+
+    def guardar_cache(self):
+        cache = leer_json(self.ruta_cache) or {}
+        for servidor in self.pool.servidores:
+            if servidor.sano and servidor.modelos is not None and servidor.host not in self.desde_cache:
+                cache[servidor.host] = {'modelos': sorted(servidor.modelos), 'comprobado': time.time()}
+        escribir_json_atomico(self.ruta_cache, cache)
+
+    def disponible(self, modelo):
+        """True si algún servidor sano tiene el modelo; si la caché dice que no, se vuelve a comprobar"""
+        encontrado = self.pool.tiene_modelo(modelo)
+        if not encontrado:
+            self.pool.sanos(forzar=True)
+            self.desde_cache.clear()
+            encontrado = self.pool.tiene_modelo(modelo)
+        if len(self.desde_cache) < len(self.pool.servidores):
+            self.guardar_cache()
+        return encontrado
+
+    def preparar(self, modelos):
+        """Descarga en cada servidor sano los modelos que le faltan (paso previo, bloqueante)"""
+        self.pool.sanos(forzar=True)
+        self.desde_cache.clear()
+        for modelo in modelos:
+            with metricas.etapa('ollama_pull', modelo=modelo):
+                self.pool.pull(modelo)
+        self.guardar_cache()
+
+    def _en_servidores(self, modelos, keep_alive, etapa):
+        hilos = []
+        for modelo in modelos:
+            for servidor in self.pool.sanos():
+                if not servidor.tiene_modelo(modelo):
+                    continue
+
+                def cargar(servidor=servidor, modelo=modelo):
+                    try:
+                        with metricas.etapa(etapa, modelo=modelo, host=servidor.host):
+                            # Una petición sin prompt solo carga (o descarga, con keep_alive=0) el modelo
+                            servidor.cliente.generate(model=modelo, prompt="", keep_alive=keep_alive)
+                    except Exception as e:
+                        print(f"⚠️ {etapa} de {modelo} en {servidor.host}: {e}")
+
+                hilo = threading.Thread(target=cargar, name=f"{etapa}-{modelo}-{servidor.host}", daemon=True)
+                hilo.start()
+                hilos.append(hilo)
+        return hilos
+
+    def precargar(self, modelos):
+        """Carga los modelos en segundo plano en todos los servidores que los tienen; devuelve los hilos"""
+        return self._en_servidores(modelos, self.keep_alive, 'ollama_precarga')
+
+    def liberar(self, modelos):
+        for hilo in self._en_servidores(modelos, 0, 'ollama_liberar'):
+            hilo.join()
+
+
+_gestor = None
+_lock_gestor = threading.Lock()
+
+
+def obtener_gestor():
+    """Gestor compartido por todo el proceso, sobre el pool de obtener_pool()"""
+    global _gestor
+    with _lock_gestor:
+        if _gestor is None:
+            _gestor = GestorModelos(obtener_pool(), cargar_config_modelos())
+        return _gestor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Descarga, precarga y libera modelos de Ollama")
+    parser.add_argument('accion', choices=['preparar', 'precargar', 'liberar', 'estado'])
+    parser.add_argument('modelos', nargs='*', help="Por defecto OLLAMA_MODEL y DEEPSEEK_MODEL")
+    args = parser.parse_args()
+
+    gestor = obtener_gestor()
+    modelos = args.modelos or modelos_configurados()
+    print(f"📶 Servidores: {gestor.pool.describir()}")
+
+    if args.accion == 'preparar':
+        gestor.preparar(modelos)
+        print(f"✅ Modelos preparados: {', '.join(modelos)}")
+    elif args.accion == 'precargar':
+        for hilo in gestor.precargar(modelos):
+            hilo.join()
+        print(f"🔥 Modelos cargados durante {gestor.keep_alive}: {', '.join(modelos)}")
+    elif args.accion == 'liberar':
+        gestor.liberar(modelos)
+        print(f"🧊 Modelos liberados: {', '.join(modelos)}")
+    elif args.accion == 'estado':
+        gestor.pool.sanos(forzar=True)
+        gestor.desde_cache.clear()
+        gestor.guardar_cache()
+        for servidor in gestor.pool.servidores:
+            if not servidor.sano:
+                print(f"❌ {servidor.host}: no responde")
+                continue
+            for modelo in modelos:
+                print(f"   {servidor.host}  {modelo:<30} {'✅' if servidor.tiene_modelo(modelo) else '❌ falta'}")
+
+
+if __name__ == "__main__":
+    main()
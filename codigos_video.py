@@ -0,0 +1,33 @@
+"""
+Códigos de vídeo de los cursos
+Reconoce las dos nomenclaturas usadas en los nombres de archivo:
+KLC-T1-v2 (curso, tema, vídeo) y KK-F1-v2 (curso, fase, vídeo)
+"""
+import re
+
+PATRON_CODIGO = re.compile(r'\b([A-Z]{2,4})-([FT])(\d+)-v(\d+)')
+
+
+def descomponer_codigo_video(nombre_archivo):
+    """Devuelve código, curso, fase/tema y número de vídeo, o None si el nombre no sigue la nomenclatura"""
+    match = PATRON_CODIGO.search(nombre_archivo)
+    if not match:
+        return None
+
+    curso, tipo, fase, video = match.groups()
+    return {
+        'codigo': match.group(0),
+        'curso': curso,
+        'fase': f"{tipo}{int(fase)}",
+        'numero_fase': int(fase),
+        'video': int(video)
+    }
+
+
+
+def clave_orden_video(nombre_archivo):
+    """Clave para ordenar vídeos por curso, fase/tema y número; los que no tienen código van al final"""
+    partes = descomponer_codigo_video(nombre_archivo)
+    if not partes:
+        return (1, '', '', 0, 0, nombre_archivo)
+    return (0, partes['curso'], partes['fase'][0], partes['numero_fase'], partes['video'], nombre_archivo)
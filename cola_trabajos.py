@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Cola persistente de trabajos de transcripción con prioridad, plazo y envejecimiento
+Los vídeos admitidos se guardan en la tabla `cola` del registro SQLite. En cada
+extracción se elige el siguiente trabajo así:
+  1. los que tienen plazo y ya no llegan con holgura (EDF: primero el plazo más cercano)
+  2. el resto por trabajo más corto primero (duración sondeada × RTF histórico),
+     dividido por 2^prioridad y rebajado según el tiempo que lleva esperando
+
+Uso:
+    python cola_trabajos.py listar
+    python cola_trabajos.py prioridad KK-F1-v2.mp4 3
+    python cola_trabajos.py plazo KK-F1-v2.mp4 "2025-01-31 18:00"
+"""
+import argparse
+import os
+from datetime import datetime
+
+from registro_db import RegistroEjecuciones, ahora
+
+ESQUEMA_COLA = """
+CREATE TABLE IF NOT EXISTS cola (
+    nombre TEXT PRIMARY KEY,
+    encolado TEXT NOT NULL,
+    prioridad INTEGER NOT NULL DEFAULT 0,
+    plazo TEXT,
+    duracion REAL,
+    tamano_mb REAL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    actualizado TEXT
+);
+"""
+
+# Duración supuesta (segundos) de un vídeo que no se pudo sondear
+DURACION_DESCONOCIDA = 600
+
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+
+
+def cargar_config_cola():
+    """Envejecimiento: segundos de trabajo estimado que se descuentan por cada segundo de espera"""
+    return {
+        'envejecimiento': float(os.getenv('QUEUE_AGING_FACTOR', '0.1')),
+        'margen_plazo': float(os.getenv('QUEUE_DEADLINE_MARGIN_SECONDS', '600'))
+    }
+
+
+def a_fecha(texto):
+    for formato in (FORMATO_FECHA, '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha no válida: {texto} (usa YYYY-MM-DD HH:MM)")
+
+
+class ColaTrabajos:
+    """Cola persistente sobre el registro SQLite"""
+
+    def __init__(self, registro, config=None):
+        self.registro = registro
+        self.config = config or cargar_config_cola()
+        with registro.lock, registro.conn:
+            registro.conn.executescript(ESQUEMA_COLA)
+
+    def sincronizar(self, candidatos, otros_presentes=()):
+        """Encola los vídeos admitidos y quita los que ya no están en la carpeta de entrada
+
+        Las entradas creadas antes con la CLI (prioridad o plazo) conservan esos valores.
+        """
+        nombres = [c['fichero'].name for c in candidatos] + list(otros_presentes)
+        for candidato in candidatos:
+            self.registro.ejecutar(
+                """INSERT INTO cola (nombre, encolado, duracion, tamano_mb, actualizado) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(nombre) DO UPDATE SET duracion = excluded.duracion, tamano_mb = excluded.tamano_mb,
+                                                     estado = 'pendiente', actualizado = excluded.actualizado""",
+                (candidato['fichero'].name, ahora(), candidato['duracion'], candidato['tamaño_mb'], ahora())
+            )
+        # Lo que ya no está en videos/ se procesó (o se retiró): sale de la cola
+        marcas = ",".join("?" * len(nombres))
+        self.registro.ejecutar(f"DELETE FROM cola WHERE nombre NOT IN ({marcas})", nombres)
+
+    def trabajos(self):
+        return {fila['nombre']: dict(fila) for fila in self.registro.consultar("SELECT * FROM cola")}
+
+    def puntuar(self, trabajo, rtf, momento):
+        """Devuelve la clave de orden del trabajo (menor = antes) y el tiempo de proceso estimado"""
+        estimado = (trabajo['duracion'] or DURACION_DESCONOCIDA) * (rtf or 1.0)
+        espera = (momento - a_fecha(trabajo['encolado'])).total_seconds()
+
+        if trabajo['plazo']:
+            holgura = (a_fecha(trabajo['plazo']) - momento).total_seconds() - estimado
+            if holgura < self.config['margen_plazo']:
+                # Urgente: va delante de todo lo demás, por plazo más cercano
+                return (0, holgura), estimado
+
+        puntuacion = estimado / 2 ** trabajo['prioridad'] - self.config['envejecimiento'] * espera
+        return (1, puntuacion), estimado
+
+    def extraer(self, lotes, rtf=None):
+        """Genera los lotes en orden de la cola, recalculando la puntuación en cada extracción
+
+        Las prioridades y plazos se releen de la base de datos cada vez, así que un cambio
+        hecho con la CLI durante la ejecución afecta a los lotes que aún no han empezado.
+        """
+        pendientes = list(lotes)
+        while pendientes:
+            trabajos = self.trabajos()
+            momento = datetime.now()
+
+            def clave(lote):
+                return min(
+                    self.puntuar(trabajos[c['fichero'].name], rtf, momento)[0]
+                    if c['fichero'].name in trabajos else (1, float('inf'))
+                    for c in lote
+                )
+
+            siguiente = min(pendientes, key=clave)
+            pendientes.remove(siguiente)
+            for candidato in siguiente:
+                self.registro.ejecutar("UPDATE cola SET estado = 'en_curso', actualizado = ? WHERE nombre = ?",
+                                       (ahora(), candidato['fichero'].name))
+            yield siguiente
+
+    def ordenar(self, candidatos, rtf=None):
+        """Candidatos en el orden actual de la cola (para agrupar clips de rango parecido)"""
+        trabajos = self.trabajos()
+        momento = datetime.now()
+        return sorted(candidatos, key=lambda c: self.puntuar(trabajos[c['fichero'].name], rtf, momento)[0])
+
+    def fijar(self, nombre, **campos):
+        """Cambia prioridad o plazo; si el vídeo aún no está en la cola se añade"""
+        self.registro.ejecutar("INSERT OR IGNORE INTO cola (nombre, encolado) VALUES (?, ?)", (nombre, ahora()))
+        asignaciones = ", ".join(f"{campo} = ?" for campo in campos)
+        self.registro.ejecutar(f"UPDATE cola SET {asignaciones}, actualizado = ? WHERE nombre = ?",
+                               (*campos.values(), ahora(), nombre))
+
+
+def rtf_historico(registro, modelo, dispositivo):
+    """Mediana del RTF registrado para el modelo y dispositivo (None si no hay historial)"""
+    for fila in registro.rtf_por_modelo():
+        if fila['modelo'] == modelo and fila['dispositivo'] == dispositivo:
+            return fila['p50']
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cola de trabajos de transcripción")
+    parser.add_argument('--db', help="Ruta de la base de datos (por defecto REGISTRO_DB o registro_transcripciones.db)")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    sub.add_parser('listar', help="Trabajos pendientes en el orden en que se procesarían")
+    p_prioridad = sub.add_parser('prioridad', help="Fija la prioridad de un vídeo (mayor = antes)")
+    p_prioridad.add_argument('nombre')
+    p_prioridad.add_argument('valor', type=int)
+    p_plazo = sub.add_parser('plazo', help="Fija el plazo de un vídeo (YYYY-MM-DD HH:MM); 'ninguno' lo quita")
+    p_plazo.add_argument('nombre')
+    p_plazo.add_argument('fecha')
+    args = parser.parse_args()
+
+    registro = RegistroEjecuciones(args.db)
+    cola = ColaTrabajos(registro)
+
+    if args.comando == 'listar':
+        momento = datetime.now()
+        trabajos = list(cola.trabajos().values())
+        filas = sorted(((cola.puntuar(t, None, momento), t) for t in trabajos), key=lambda x: x[0][0])
+        print(f"{'VÍDEO':<40} {'PRIO':>4} {'DURACIÓN':>9} {'PLAZO':<17} {'ESTADO':<10} ENCOLADO")
+        for (_, estimado), t in filas:
+            print(f"{t['nombre'][:40]:<40} {t['prioridad']:>4} {estimado:>8.0f}s {(t['plazo'] or '-')[:16]:<17} "
+                  f"{t['estado']:<10} {t['encolado']}")
+
+    elif args.comando == 'prioridad':
+        cola.fijar(args.nombre, prioridad=args.valor)
+        print(f"✅ Prioridad de {args.nombre}: {args.valor}")
+
+    elif args.comando == 'plazo':
+        plazo = None if args.fecha == 'ninguno' else a_fecha(args.fecha).strftime(FORMATO_FECHA)
+        cola.fijar(args.nombre, plazo=plazo)
+        print(f"✅ Plazo de {args.nombre}: {plazo or 'ninguno'}")
+
+    registro.cerrar()
+
+
+if __name__ == "__main__":
+    main()
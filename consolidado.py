@@ -0,0 +1,220 @@
+"""
+Escritor ordenado del consolidado transcripciones_*.txt
+Las etapas del pipeline terminan los vídeos en el orden de la cola, no en el del curso.
+El escritor recibe los bloques en cualquier orden y los emite por código de vídeo
+(curso, fase/tema, número) a través de un único fichero abierto. Los bloques que llegan
+antes de tiempo esperan en procesados/.transcripciones_<fecha>.pendientes/ (escritos de
+forma atómica, así sobreviven a un corte) y en memoria solo hasta CONSOLIDATED_BUFFER_MB
+
+Junto a cada consolidado se mantiene transcripciones_<fecha>.txt.indice.json con la
+posición en bytes, longitud, código, duración y palabras de cada bloque, para que la
+documentación y su validación lean solo los bloques (o fases) que necesitan
+"""
+import mmap
+import os
+import re
+import threading
+from datetime import datetime
+
+from codigos_video import clave_orden_video, descomponer_codigo_video
+from estado_trabajos import SEPARADOR_BLOQUE, escritura_atomica, escribir_json_atomico, leer_json
+
+PATRON_METADATOS = re.compile(r'Duración: (?:(\d+) days?, )?(\d+):(\d+):(\d+) \| 📝 Segmentos: (\d+) \| 📊 Palabras: (\d+)')
+
+
+def cargar_config_consolidado():
+    return {
+        'memoria_max': int(float(os.getenv('CONSOLIDATED_BUFFER_MB', '64')) * 1024 * 1024)
+    }
+
+
+def ruta_indice(archivo):
+    return archivo.with_name(f"{archivo.name}.indice.json")
+
+
+def entrada_indice(bloque, desplazamiento):
+    """Entrada del índice para un bloque que empieza en `desplazamiento` bytes"""
+    nombre = bloque.split('\n', 1)[0][2:]
+    partes = descomponer_codigo_video(nombre) or {}
+    entrada = {
+        'nombre': nombre,
+        'desplazamiento': desplazamiento,
+        'longitud': len(bloque.encode('utf-8')),
+        'codigo': partes.get('codigo'),
+        'curso': partes.get('curso'),
+        'fase': partes.get('fase'),
+        'video': partes.get('video'),
+        'duracion': None,
+        'segmentos': None,
+        'palabras': None
+    }
+    metadatos = PATRON_METADATOS.search(bloque[:500])
+    if metadatos:
+        dias, horas, minutos, segundos, segmentos, palabras = metadatos.groups()
+        entrada['duracion'] = int(dias or 0) * 86400 + int(horas) * 3600 + int(minutos) * 60 + int(segundos)
+        entrada['segmentos'] = int(segmentos)
+        entrada['palabras'] = int(palabras)
+    return entrada
+
+
+def reconstruir_indice(archivo):
+    """Recorre el consolidado y genera su índice (para consolidados antiguos o índices desfasados)"""
+    with open(archivo, 'rb') as f:
+        contenido = f.read()
+    cabecera = '📂 '.encode('utf-8')
+    separador = SEPARADOR_BLOQUE.encode('utf-8')
+    videos = []
+    posicion = 0
+    for match in re.finditer(b'^' + re.escape(cabecera), contenido, re.MULTILINE):
+        if match.start() < posicion:
+            continue
+        fin = contenido.find(separador, match.start())
+        if fin < 0:
+            break
+        posicion = fin + len(separador)
+        videos.append(entrada_indice(contenido[match.start():posicion].decode('utf-8'), match.start()))
+    indice = {'archivo': archivo.name, 'tamaño': len(contenido), 'videos': videos}
+    escribir_json_atomico(ruta_indice(archivo), indice)
+    return indice
+
+
+def cargar_indice(archivo):
+    """Índice del consolidado; se regenera si falta o no corresponde al tamaño actual del archivo"""
+    if not archivo.exists():
+        return {'archivo': archivo.name, 'tamaño': 0, 'videos': []}
+    indice = leer_json(ruta_indice(archivo))
+    if not indice or indice.get('tamaño') != archivo.stat().st_size:
+        indice = reconstruir_indice(archivo)
+    return indice
+
+
+def leer_bloques(archivo, entradas):
+    """Texto de los bloques indicados, leídos por su posición sin cargar el consolidado entero"""
+    entradas = list(entradas)
+    if not entradas:
+        return []
+    with open(archivo, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+        return [datos[e['desplazamiento']:e['desplazamiento'] + e['longitud']].decode('utf-8') for e in entradas]
+
+
+def bloques_de_fases(archivo, fases):
+    """Bloques de los vídeos de las fases/temas indicados (F1, T2...), en el orden del consolidado"""
+    fases = set(fases)
+    return leer_bloques(archivo, (e for e in cargar_indice(archivo)['videos'] if e['fase'] in fases))
+
+
+class EscritorConsolidado:
+    """Emite los bloques del consolidado en orden de curso a medida que llegan los que faltan"""
+
+    def __init__(self, archivo, esperados, memoria_max=64 * 1024 * 1024):
+        self.archivo = archivo
+        self.pendientes_dir = archivo.with_name(f".{archivo.stem}.pendientes")
+        self.pendientes_dir.mkdir(exist_ok=True)
+        self.memoria_max = memoria_max
+        self.memoria = {}
+        self.bytes_en_memoria = 0
+        self.indice = cargar_indice(archivo)
+        self.escritos = {entrada['nombre'] for entrada in self.indice['videos']}
+        self._lock = threading.Lock()
+        self._f = None
+
+        # Bloques que esperaban cuando se cortó la ejecución anterior
+        self.en_disco = {ruta.stem for ruta in self.pendientes_dir.glob("*.bloque")} - self.escritos
+        self.esperados = sorted(set(esperados) | self.en_disco, key=clave_orden_video)
+        self.siguiente = 0
+        with self._lock:
+            self._emitir_listos()
+
+    def _ruta_pendiente(self, nombre):
+        return self.pendientes_dir / f"{nombre}.bloque"
+
+    def _abrir(self):
+        if self._f is None:
+            nuevo = not self.archivo.exists()
+            # En binario: f.tell() da la posición en bytes que se guarda en el índice
+            self._f = open(self.archivo, 'ab')
+            if nuevo:
+                cabecera = f"TRANSCRIPCIONES CONSOLIDADAS - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n" + "=" * 80 + "\n\n"
+                self._f.write(cabecera.encode('utf-8'))
+        return self._f
+
+    def _bloque(self, nombre):
+        if nombre in self.memoria:
+            bloque = self.memoria.pop(nombre)
+            self.bytes_en_memoria -= len(bloque.encode('utf-8'))
+            return bloque
+        with open(self._ruta_pendiente(nombre), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _escribir(self, nombres):
+        if not nombres:
+            return
+        f = self._abrir()
+        for nombre in nombres:
+            bloque = self._bloque(nombre)
+            self.indice['videos'].append(entrada_indice(bloque, f.tell()))
+            f.write(bloque.encode('utf-8'))
+            self.escritos.add(nombre)
+        f.flush()
+        os.fsync(f.fileno())
+        self.indice['tamaño'] = f.tell()
+        escribir_json_atomico(ruta_indice(self.archivo), self.indice)
+        # Solo cuando el consolidado está en disco se borran los pendientes
+        for nombre in nombres:
+            self.en_disco.discard(nombre)
+            self._ruta_pendiente(nombre).unlink(missing_ok=True)
+
+    def _emitir_listos(self):
+        """Escribe los bloques disponibles desde el siguiente esperado sin saltarse ninguno"""
+        listos = []
+        while self.siguiente < len(self.esperados):
+            nombre = self.esperados[self.siguiente]
+            if nombre in self.escritos:
+                pass
+            elif nombre in self.en_disco:
+                listos.append(nombre)
+            else:
+                break
+            self.siguiente += 1
+        self._escribir(listos)
+
+    def añadir(self, nombre, bloque):
+        """Recibe el bloque de un vídeo; se escribe en cuanto le toque en el orden del curso"""
+        with self._lock:
+            if nombre in self.escritos:
+                return
+            # Primero a disco: la etapa 'salidas_escritas' se marca al volver de aquí
+            with escritura_atomica(self._ruta_pendiente(nombre)) as f:
+                f.write(bloque)
+            self.en_disco.add(nombre)
+            # El límite es en bytes, como CONSOLIDATED_BUFFER_MB (tildes y emojis ocupan más de uno)
+            tamaño = len(bloque.encode('utf-8'))
+            if self.bytes_en_memoria + tamaño <= self.memoria_max:
+                self.memoria[nombre] = bloque
+                self.bytes_en_memoria += tamaño
+            if nombre not in self.esperados[self.siguiente:]:
+                # Vídeo no previsto: se inserta en su sitio entre los que aún no se han escrito
+                restantes = sorted(self.esperados[self.siguiente:] + [nombre], key=clave_orden_video)
+                self.esperados[self.siguiente:] = restantes
+            self._emitir_listos()
+
+    def omitir(self, nombre):
+        """El vídeo no llegará en esta ejecución (error, u otro nodo lo procesa): no se le espera"""
+        with self._lock:
+            if nombre in self.esperados[self.siguiente:] and nombre not in self.en_disco:
+                self.esperados.remove(nombre)
+                self._emitir_listos()
+
+    def cerrar(self):
+        """Escribe en orden lo que quede pendiente y cierra el fichero"""
+        with self._lock:
+            self._escribir(sorted(self.en_disco, key=clave_orden_video))
+            self.esperados = []
+            self.siguiente = 0
+            if self._f:
+                self._f.close()
+                self._f = None
+        try:
+            self.pendientes_dir.rmdir()
+        except OSError:
+            pass
@@ -0,0 +1,115 @@
+"""
+Empaquetado de clips cortos en un único trabajo de transcripción
+Concatena el audio de varios clips separados por silencio, lo transcribe de una vez
+y reparte los segmentos resultantes entre los clips con los tiempos corregidos
+"""
+import bisect
+import os
+
+import numpy as np
+from faster_whisper import decode_audio
+
+import metricas
+
+SAMPLE_RATE = 16000
+
+
+def cargar_config_empaquetado():
+    """Lee la configuración del modo de empaquetado desde el entorno"""
+    return {
+        'activo': os.getenv('PACK_SHORT_CLIPS', 'false').lower() == 'true',
+        'max_duracion_clip': float(os.getenv('PACK_MAX_CLIP_SECONDS', '120')),
+        'max_duracion_paquete': float(os.getenv('PACK_MAX_BATCH_SECONDS', '1200')),
+        'silencio': float(os.getenv('PACK_SILENCE_SECONDS', '2'))
+    }
+
+
+def agrupar_candidatos(candidatos, config):
+    """Agrupa los clips cortos en paquetes; el resto de vídeos va en lotes de uno"""
+    if not config['activo']:
+        return [[candidato] for candidato in candidatos]
+
+    lotes = []
+    paquete = []
+    duracion_paquete = 0.0
+
+    for candidato in candidatos:
+        duracion = candidato['duracion']
+        # Sin duración sondeada no sabemos si es corto: se procesa solo
+        if not duracion or duracion > config['max_duracion_clip']:
+            lotes.append([candidato])
+            continue
+
+        if paquete and duracion_paquete + duracion + config['silencio'] > config['max_duracion_paquete']:
+            lotes.append(paquete)
+            paquete = []
+            duracion_paquete = 0.0
+
+        paquete.append(candidato)
+        duracion_paquete += duracion + config['silencio']
+
+    if paquete:
+        lotes.append(paquete)
+
+    return lotes
+
+
+def preparar_audio_paquete(lote, silencio):
+    """Decodifica los clips y los concatena con silencio; devuelve el audio y el tramo de cada clip"""
+    separador = np.zeros(int(silencio * SAMPLE_RATE), dtype=np.float32)
+    partes = []
+    tramos = []
+    posicion = 0
+
+    for i, candidato in enumerate(lote):
+        if i > 0:
+            partes.append(separador)
+            posicion += len(separador)
+        with metricas.etapa('decodificacion_audio', video=candidato['fichero'].name):
+            audio = decode_audio(str(candidato['fichero']), sampling_rate=SAMPLE_RATE)
+        partes.append(audio)
+        tramos.append((posicion / SAMPLE_RATE, (posicion + len(audio)) / SAMPLE_RATE))
+        posicion += len(audio)
+
+    return np.concatenate(partes), tramos
+
+
+def tramo_mas_cercano(tramos, inicios, instante):
+    """Índice del tramo que contiene el instante (o el más cercano si cae en un silencio)"""
+    idx = max(bisect.bisect_right(inicios, instante) - 1, 0)
+    if instante > tramos[idx][1] and idx + 1 < len(tramos):
+        if tramos[idx + 1][0] - instante < instante - tramos[idx][1]:
+            idx += 1
+    return idx
+
+
+def repartir_segmentos(segments, tramos):
+    """Reparte los segmentos del audio empaquetado entre los clips, con tiempos relativos a cada clip"""
+    inicios = [inicio for inicio, _ in tramos]
+    por_clip = [[] for _ in tramos]
+
+    for segment in segments:
+        palabras = getattr(segment, 'words', None)
+        if palabras:
+            # Con marcas por palabra se puede partir un segmento que cruce la frontera entre clips
+            grupos = {}
+            for palabra in palabras:
+                idx = tramo_mas_cercano(tramos, inicios, (palabra.start + palabra.end) / 2)
+                grupos.setdefault(idx, []).append(palabra)
+            piezas = [(idx, grupo[0].start, grupo[-1].end, ''.join(p.word for p in grupo)) for idx, grupo in grupos.items()]
+        else:
+            idx = tramo_mas_cercano(tramos, inicios, (segment.start + segment.end) / 2)
+            piezas = [(idx, segment.start, segment.end, segment.text)]
+
+        for idx, inicio, fin, texto in piezas:
+            texto = texto.strip()
+            if not texto:
+                continue
+            tramo_inicio, tramo_fin = tramos[idx]
+            por_clip[idx].append({
+                'inicio': round(min(max(inicio, tramo_inicio), tramo_fin) - tramo_inicio, 3),
+                'fin': round(min(max(fin, tramo_inicio), tramo_fin) - tramo_inicio, 3),
+                'texto': texto
+            })
+
+    return por_clip
@@ -0,0 +1,194 @@
+"""
+Estado persistente por vídeo para reanudar lotes interrumpidos
+Cada vídeo avanza por las etapas descubierto → transcrito → salidas_escritas →
+respaldado → movido. El estado se guarda en procesados/.estado/ con escrituras
+atómicas, de modo que al relanzar transcribir.py cada vídeo continúa desde la
+última etapa completada y el consolidado de la ejecución interrumpida se reutiliza
+"""
+import json
+import os
+import pathlib
+import socket
+from contextlib import contextmanager
+from datetime import datetime
+
+ETAPAS = ['descubierto', 'transcrito', 'salidas_escritas', 'respaldado', 'movido']
+
+SEPARADOR_BLOQUE = "\n" + "=" * 80 + "\n\n"
+
+
+def fsync_directorio(carpeta):
+    """Asegura en disco el renombrado dentro de la carpeta (no disponible en Windows)"""
+    if os.name != 'posix':
+        return
+    fd = os.open(str(carpeta), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def escritura_atomica(ruta, modo='w'):
+    """Escribe en un temporal y lo renombra sobre la ruta final al terminar sin errores"""
+    ruta = pathlib.Path(ruta)
+    temporal = ruta.with_name(f".{ruta.name}.{os.getpid()}.tmp")
+    try:
+        with open(temporal, modo, encoding=None if 'b' in modo else 'utf-8') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+        fsync_directorio(ruta.parent)
+    finally:
+        if temporal.exists():
+            temporal.unlink()
+
+
+def escribir_json_atomico(ruta, datos):
+    with escritura_atomica(ruta) as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2, default=str)
+
+
+def leer_json(ruta):
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def reparar_consolidado(archivo_transcripciones):
+    """Recorta un consolidado interrumpido hasta el final del último bloque completo"""
+    if not archivo_transcripciones.exists():
+        return
+    with open(archivo_transcripciones, 'rb') as f:
+        contenido = f.read()
+    fin = contenido.rfind(SEPARADOR_BLOQUE.encode('utf-8'))
+    if fin == -1:
+        return
+    fin += len(SEPARADOR_BLOQUE.encode('utf-8'))
+    if fin < len(contenido):
+        with open(archivo_transcripciones, 'r+b') as f:
+            f.truncate(fin)
+        print(f"🩹 Consolidado recortado al último bloque completo: {archivo_transcripciones.name}")
+
+
+class EstadoTrabajos:
+    """Estado de cada vídeo del lote y de la ejecución en curso"""
+
+    def __init__(self, carpeta_procesados):
+        self.carpeta = carpeta_procesados / ".estado"
+        self.carpeta.mkdir(parents=True, exist_ok=True)
+        # Un manifiesto por host: varios nodos pueden compartir procesados/
+        self.manifiesto = self.carpeta / f"ejecucion_{socket.gethostname()}.json"
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+
+    def iniciar_ejecucion(self, carpeta_procesados):
+        """Devuelve el consolidado de la ejecución: el de la interrumpida si la hay, o uno nuevo"""
+        anterior = leer_json(self.manifiesto)
+        if anterior and not anterior.get('finalizada'):
+            archivo = pathlib.Path(anterior['archivo_transcripciones'])
+            print(f"♻️ Reanudando ejecución interrumpida del {anterior['inicio']}")
+            reparar_consolidado(archivo)
+            return archivo, True
+
+        # Los estados de vídeos ya movidos en ejecuciones anteriores no hacen falta
+        for ruta in self.carpeta.glob("*.json"):
+            if ruta != self.manifiesto and (leer_json(ruta) or {}).get('etapa') == 'movido':
+                self.eliminar(ruta)
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        archivo = carpeta_procesados / f"transcripciones_{timestamp}.txt"
+        escribir_json_atomico(self.manifiesto, {
+            'inicio': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'archivo_transcripciones': str(archivo),
+            'finalizada': False
+        })
+        return archivo, False
+
+    def finalizar_ejecucion(self):
+        datos = leer_json(self.manifiesto) or {}
+        datos['finalizada'] = True
+        datos['fin'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        escribir_json_atomico(self.manifiesto, datos)
+
+    # ------------------------------------------------------------------
+    # Vídeos
+    # ------------------------------------------------------------------
+
+    def ruta_estado(self, nombre):
+        return self.carpeta / f"{nombre}.json"
+
+    def ruta_segmentos(self, nombre):
+        return self.carpeta / f"{nombre}.segmentos.json"
+
+    def identidad(self, fichero):
+        """Tamaño y fecha de modificación: si cambian, es otro vídeo con el mismo nombre"""
+        stat = fichero.stat()
+        return {'tamaño_bytes': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def cargar(self, fichero):
+        """Estado guardado del vídeo, o None si no hay o corresponde a otra versión del archivo"""
+        estado = leer_json(self.ruta_estado(fichero.name))
+        if not estado:
+            return None
+        if fichero.exists() and {k: estado.get(k) for k in ('tamaño_bytes', 'mtime_ns')} != self.identidad(fichero):
+            print(f"🔄 {fichero.name} ha cambiado desde la ejecución anterior: se procesa de nuevo")
+            self.eliminar(self.ruta_estado(fichero.name))
+            self.eliminar(self.ruta_segmentos(fichero.name))
+            return None
+        return estado
+
+    def descubrir(self, fichero):
+        estado = self.cargar(fichero)
+        if estado:
+            return estado
+        estado = {'nombre': fichero.name, 'etapa': 'descubierto', **self.identidad(fichero)}
+        self.guardar(estado)
+        return estado
+
+    def guardar(self, estado):
+        estado['actualizado'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        escribir_json_atomico(self.ruta_estado(estado['nombre']), estado)
+
+    def avanzar(self, nombre, etapa=None, **datos):
+        """Marca el vídeo en la etapa indicada (y/o guarda datos adicionales en su estado)"""
+        estado = leer_json(self.ruta_estado(nombre)) or {'nombre': nombre}
+        if etapa:
+            estado['etapa'] = etapa
+        estado.update(datos)
+        self.guardar(estado)
+        return estado
+
+    def guardar_resultado(self, resultado):
+        """Persiste los segmentos transcritos y pasa el vídeo a 'transcrito'"""
+        fichero = resultado['fichero']
+        escribir_json_atomico(self.ruta_segmentos(fichero.name), resultado['segmentos'])
+        metadatos = {k: v for k, v in resultado.items() if k not in ('fichero', 'segmentos')}
+        return self.avanzar(fichero.name, 'transcrito', resultado=metadatos)
+
+    def cargar_resultado(self, fichero, estado):
+        """Reconstruye el resultado de un vídeo ya transcrito en una ejecución anterior"""
+        segmentos = leer_json(self.ruta_segmentos(fichero.name))
+        if segmentos is None or 'resultado' not in estado:
+            return None
+        return {'fichero': fichero, **estado['resultado'], 'segmentos': segmentos}
+
+    def eliminar(self, ruta):
+        try:
+            ruta.unlink()
+        except FileNotFoundError:
+            pass
+
+    def limpiar(self, nombre):
+        """Borra los segmentos temporales cuando el vídeo ya se ha movido"""
+        self.eliminar(self.ruta_segmentos(nombre))
+
+
+def etapa_alcanzada(estado, etapa):
+    """True si el estado del vídeo ya ha completado la etapa indicada"""
+    return bool(estado) and ETAPAS.index(estado.get('etapa', 'descubierto')) >= ETAPAS.index(etapa)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Palabras clave, entidades y glosario del curso con spaCy, sin pasar por un LLM
+Todos los segmentos de todos los vídeos pendientes se procesan en una sola pasada de
+nlp.pipe (por lotes de NLP_BATCH_SIZE y con NLP_PROCESSES procesos). Por cada vídeo se
+guarda procesados/<vídeo>/<vídeo>.terminos.json con sus palabras clave (lemas de
+sustantivos y nombres propios y grupos nominales más frecuentes) y entidades; el archivo
+lleva la huella del texto y del modelo, así que un vídeo sin cambios no se vuelve a
+analizar. procesados/glosario.json agrega los términos por curso (en cuántos vídeos
+aparece cada uno). Requiere spaCy y su modelo de español:
+    pip install spacy && python -m spacy download es_core_news_sm
+
+Uso:
+    python glosario.py                          # analiza los vídeos de procesados/ sin análisis vigente
+    python glosario.py --curso KK               # muestra el glosario de un curso
+"""
+import argparse
+import hashlib
+import os
+import pathlib
+from collections import Counter, defaultdict
+
+from codigos_video import clave_orden_video, descomponer_codigo_video
+from estado_trabajos import escribir_json_atomico, leer_json
+from historico import NOMBRE_ARCHIVO, ArchivoHistorico, segmentos_video
+
+NOMBRE_GLOSARIO = "glosario.json"
+
+# Entidades que aportan algo al glosario (personas, organizaciones, lugares y misceláneas)
+ETIQUETAS_ENTIDADES = {'PER', 'ORG', 'LOC', 'MISC'}
+
+
+def cargar_config_glosario():
+    return {
+        'modelo': os.getenv('SPACY_MODEL', 'es_core_news_sm'),
+        'procesos': int(os.getenv('NLP_PROCESSES', '1')),
+        'tamaño_lote': int(os.getenv('NLP_BATCH_SIZE', '256')),
+        'palabras_clave': int(os.getenv('NLP_KEYWORDS_PER_VIDEO', '25')),
+        'activo': os.getenv('GLOSSARY_ENABLED', 'true').lower() == 'true'
+    }
+
+
+def cargar_spacy(modelo):
+    # Dependencia opcional: solo se necesita para el glosario
+    try:
+        import spacy
+    except ImportError:
+        raise RuntimeError("El glosario requiere spaCy: pip install spacy")
+    try:
+        # Solo hacen falta etiquetas, lemas, dependencias (grupos nominales) y entidades
+        return spacy.load(modelo, disable=['textcat'])
+    except OSError:
+        raise RuntimeError(f"Modelo de spaCy '{modelo}' no instalado: python -m spacy download {modelo}")
+
+
+def ruta_terminos(carpeta_procesados, stem):
+    return carpeta_procesados / stem / f"{stem}.terminos.json"
+
+
+def huella_texto(textos, modelo):
+    resumen = hashlib.sha1(modelo.encode('utf-8'))
+    for texto in textos:
+        resumen.update(texto.encode('utf-8'))
+        resumen.update(b"\n")
+    return resumen.hexdigest()
+
+
+def normalizar_termino(texto):
+    return " ".join(texto.lower().split()).strip(" .,;:¿?¡!\"'")
+
+
+def analizar_videos(carpeta_procesados, stems, config, forzar=False):
+    """Analiza en una sola pasada de nlp.pipe los vídeos cuyo análisis falta o ha caducado"""
+    pendientes = {}
+    for stem in stems:
+        segmentos = segmentos_video(carpeta_procesados, stem)
+        if not segmentos:
+            continue
+        textos = [s['texto'] for s in segmentos if s['texto']]
+        huella = huella_texto(textos, config['modelo'])
+        previo = leer_json(ruta_terminos(carpeta_procesados, stem))
+        if forzar or not previo or previo.get('huella') != huella:
+            pendientes[stem] = (textos, huella)
+    if not pendientes:
+        return []
+
+    nlp = cargar_spacy(config['modelo'])
+    total_segmentos = sum(len(textos) for textos, _ in pendientes.values())
+    print(f"🏷️ Analizando {total_segmentos} segmentos de {len(pendientes)} vídeos con {config['modelo']}...")
+
+    lemas = defaultdict(Counter)
+    grupos = defaultdict(Counter)
+    entidades = defaultdict(Counter)
+    # Un único flujo (texto, vídeo) para todo el lote: spaCy agrupa y reparte entre procesos
+    flujo = ((texto, stem) for stem, (textos, _) in pendientes.items() for texto in textos)
+    for doc, stem in nlp.pipe(flujo, as_tuples=True, batch_size=config['tamaño_lote'], n_process=config['procesos']):
+        for token in doc:
+            if token.pos_ in ('NOUN', 'PROPN') and not token.is_stop and len(token.lemma_) > 2:
+                lemas[stem][normalizar_termino(token.lemma_)] += 1
+        for grupo in doc.noun_chunks:
+            palabras = [t for t in grupo if not t.is_stop and not t.is_punct]
+            if len(palabras) > 1:
+                grupos[stem][normalizar_termino(" ".join(t.text for t in palabras))] += 1
+        for entidad in doc.ents:
+            if entidad.label_ in ETIQUETAS_ENTIDADES:
+                entidades[stem][(normalizar_termino(entidad.text), entidad.label_)] += 1
+
+    analizados = []
+    for stem, (_, huella) in pendientes.items():
+        # Los vídeos migrados al histórico pueden no conservar su carpeta
+        (carpeta_procesados / stem).mkdir(exist_ok=True)
+        escribir_json_atomico(ruta_terminos(carpeta_procesados, stem), {
+            'huella': huella,
+            'modelo': config['modelo'],
+            'palabras_clave': [t for t, _ in lemas[stem].most_common(config['palabras_clave'])],
+            'grupos_nominales': [t for t, n in grupos[stem].most_common(config['palabras_clave']) if n > 1],
+            'entidades': [{'texto': t, 'tipo': tipo, 'menciones': n} for (t, tipo), n in entidades[stem].most_common()]
+        })
+        analizados.append(stem)
+    return analizados
+
+
+def actualizar_glosario(carpeta_procesados):
+    """Regenera procesados/glosario.json con los términos de todos los vídeos analizados"""
+    por_curso = defaultdict(lambda: defaultdict(set))
+    for ruta in carpeta_procesados.glob("*/*.terminos.json"):
+        stem = ruta.parent.name
+        terminos = leer_json(ruta) or {}
+        curso = (descomponer_codigo_video(stem) or {}).get('curso', 'sin_curso')
+        for termino in terminos.get('palabras_clave', []) + terminos.get('grupos_nominales', []):
+            por_curso[curso][termino].add(stem)
+        for entidad in terminos.get('entidades', []):
+            por_curso[curso][entidad['texto']].add(stem)
+
+    glosario = {
+        curso: [
+            {'termino': termino, 'videos': sorted(videos, key=clave_orden_video)}
+            for termino, videos in sorted(terminos.items(), key=lambda par: (-len(par[1]), par[0]))
+        ]
+        for curso, terminos in sorted(por_curso.items())
+    }
+    escribir_json_atomico(carpeta_procesados / NOMBRE_GLOSARIO, glosario)
+    return glosario
+
+
+def terminos_video(carpeta_procesados, stem):
+    return leer_json(ruta_terminos(carpeta_procesados, stem))
+
+
+def seccion_terminos(carpeta_procesados, stems, maximo=15):
+    """Texto para el prompt con los términos precalculados de cada vídeo (vacío si no hay ninguno)"""
+    lineas = []
+    for stem in stems:
+        terminos = terminos_video(carpeta_procesados, stem)
+        if not terminos:
+            continue
+        claves = list(dict.fromkeys(terminos['grupos_nominales'] + terminos['palabras_clave']))[:maximo]
+        entidades = [e['texto'] for e in terminos['entidades']][:maximo]
+        lineas.append(f"- {stem}: {', '.join(claves)}" + (f" | Entidades: {', '.join(entidades)}" if entidades else ""))
+    if not lineas:
+        return ""
+    return ("\n\nTÉRMINOS CLAVE PRECALCULADOS POR VÍDEO (úsalos para el glosario, la navegación y las preguntas "
+            "del cuestionario):\n" + "\n".join(lineas) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Palabras clave, entidades y glosario del curso con spaCy")
+    parser.add_argument('--procesados', default=str(pathlib.Path(__file__).parent / "procesados"))
+    parser.add_argument('--forzar', action='store_true', help="Vuelve a analizar aunque el texto no haya cambiado")
+    parser.add_argument('--curso', help="Muestra el glosario de un curso en lugar de analizar")
+    args = parser.parse_args()
+
+    carpeta = pathlib.Path(args.procesados)
+    if args.curso:
+        glosario = leer_json(carpeta / NOMBRE_GLOSARIO) or {}
+        for entrada in glosario.get(args.curso, []):
+            print(f"   {entrada['termino']:<40} {len(entrada['videos'])} vídeos")
+        return
+
+    stems = {p.parent.name for p in carpeta.glob("*/*.srt") if p.stem == p.parent.name}
+    if (carpeta / NOMBRE_ARCHIVO).exists():
+        stems |= set(ArchivoHistorico(carpeta).indice['videos'])
+    try:
+        analizados = analizar_videos(carpeta, sorted(stems, key=clave_orden_video), cargar_config_glosario(), args.forzar)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return
+    glosario = actualizar_glosario(carpeta)
+    print(f"✅ {len(analizados)} vídeos analizados; glosario con {sum(len(t) for t in glosario.values())} términos "
+          f"en {len(glosario)} cursos")
+
+
+if __name__ == "__main__":
+    main()
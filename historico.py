@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Archivo comprimido de transcripciones históricas
+procesados/historico.zst guarda una trama zstd independiente por vídeo (JSON con su .txt
+y su .srt). El índice procesados/historico.zst.indice.json apunta a la posición
+y longitud de cada trama, así que leer un vídeo solo descomprime la suya. Si el índice se
+pierde, se reconstruye recorriendo las tramas. Requiere zstandard (pip install zstandard)
+
+Uso:
+    python historico.py migrar                  # archiva procesados/<vídeo>/<vídeo>.txt y .srt
+    python historico.py migrar --borrar         # y borra los originales tras comprobar la copia
+    python historico.py leer KK-F1-v2 [--srt]
+    python historico.py listar
+"""
+import argparse
+import json
+import os
+import pathlib
+import threading
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from codigos_video import clave_orden_video, descomponer_codigo_video
+from estado_trabajos import escribir_json_atomico, leer_json
+from segmentos import leer_srt, parsear_srt
+
+load_dotenv()
+
+NOMBRE_ARCHIVO = "historico.zst"
+
+
+def cargar_config_historico():
+    return {
+        'nivel': int(os.getenv('ARCHIVE_ZSTD_LEVEL', '19'))
+    }
+
+
+def importar_zstd():
+    # Dependencia opcional: solo la necesita quien archiva o lee el histórico
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("El archivo histórico requiere zstandard: pip install zstandard")
+    return zstandard
+
+
+class ArchivoHistorico:
+    """Tramas zstd por vídeo en un único fichero, con índice para acceso aleatorio"""
+
+    def __init__(self, carpeta_procesados, nivel=19):
+        self.ruta = pathlib.Path(carpeta_procesados) / NOMBRE_ARCHIVO
+        self.ruta_indice = self.ruta.with_name(f"{NOMBRE_ARCHIVO}.indice.json")
+        self.nivel = nivel
+        self._lock = threading.Lock()
+        self._indice = None
+
+    @property
+    def indice(self):
+        if self._indice is None:
+            self._indice = self.cargar_indice()
+        return self._indice
+
+    def cargar_indice(self):
+        if not self.ruta.exists():
+            return {'tamaño': 0, 'videos': {}}
+        indice = leer_json(self.ruta_indice)
+        if not indice or indice.get('tamaño') != self.ruta.stat().st_size:
+            indice = self.reconstruir_indice()
+        return indice
+
+    def reconstruir_indice(self):
+        """Recorre las tramas del archivo y regenera el índice"""
+        zstandard = importar_zstd()
+        with open(self.ruta, 'rb') as f:
+            datos = f.read()
+        videos = {}
+        posicion = 0
+        # Cada trama se descomprime sobre una vista del resto del archivo, sin copiarlo
+        vista = memoryview(datos)
+        while posicion < len(datos):
+            descompresor = zstandard.ZstdDecompressor().decompressobj()
+            try:
+                contenido = descompresor.decompress(vista[posicion:])
+                # Una trama cortada no siempre da error: devuelve lo que había sin llegar al final
+                if not descompresor.eof:
+                    raise ValueError("trama sin terminar")
+                registro = json.loads(contenido)
+            except (zstandard.ZstdError, ValueError):
+                # Trama a medio escribir al final del archivo: se descarta
+                print(f"🩹 {self.ruta.name}: trama incompleta en el byte {posicion}, se recorta")
+                with open(self.ruta, 'r+b') as f:
+                    f.truncate(posicion)
+                break
+            longitud = len(datos) - posicion - len(descompresor.unused_data)
+            videos[registro['stem']] = self._entrada(registro, posicion, longitud, len(contenido))
+            posicion += longitud
+        indice = {'tamaño': posicion, 'videos': videos}
+        escribir_json_atomico(self.ruta_indice, indice)
+        print(f"🗂️ Índice de {self.ruta.name} reconstruido: {len(videos)} vídeos")
+        return indice
+
+    def _entrada(self, registro, desplazamiento, longitud, tamaño_original):
+        partes = descomponer_codigo_video(registro['stem']) or {}
+        return {
+            'desplazamiento': desplazamiento,
+            'longitud': longitud,
+            'tamaño_original': tamaño_original,
+            'codigo': partes.get('codigo'),
+            'fase': partes.get('fase'),
+            'archivado': registro['archivado']
+        }
+
+    def contiene(self, stem):
+        return stem in self.indice['videos']
+
+    def añadir(self, stem, txt, srt):
+        """Añade (o sustituye, si ya estaba) la transcripción de un vídeo al final del archivo"""
+        zstandard = importar_zstd()
+        registro = {'stem': stem, 'archivado': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'txt': txt, 'srt': srt}
+        contenido = json.dumps(registro, ensure_ascii=False).encode('utf-8')
+        trama = zstandard.ZstdCompressor(level=self.nivel, write_content_size=True).compress(contenido)
+        with self._lock:
+            indice = self.indice
+            with open(self.ruta, 'ab') as f:
+                desplazamiento = f.tell()
+                f.write(trama)
+                f.flush()
+                os.fsync(f.fileno())
+            # Una versión anterior del mismo vídeo queda como trama huérfana (el índice apunta a la nueva)
+            indice['videos'][stem] = self._entrada(registro, desplazamiento, len(trama), len(contenido))
+            indice['tamaño'] = desplazamiento + len(trama)
+            escribir_json_atomico(self.ruta_indice, indice)
+        return indice['videos'][stem]
+
+    def leer(self, stem):
+        """Registro del vídeo ({'stem', 'archivado', 'txt', 'srt'}) o None si no está archivado"""
+        entrada = self.indice['videos'].get(stem)
+        if not entrada:
+            return None
+        with open(self.ruta, 'rb') as f:
+            f.seek(entrada['desplazamiento'])
+            trama = f.read(entrada['longitud'])
+        return json.loads(importar_zstd().ZstdDecompressor().decompress(trama))
+
+    def segmentos(self, stem):
+        registro = self.leer(stem)
+        return parsear_srt(registro['srt']) if registro and registro['srt'] else None
+
+
+def transcripcion_disponible(carpeta_procesados, stem):
+    """True si el vídeo tiene .srt en su carpeta o en el archivo histórico"""
+    if (carpeta_procesados / stem / f"{stem}.srt").exists():
+        return True
+    return (carpeta_procesados / NOMBRE_ARCHIVO).exists() and ArchivoHistorico(carpeta_procesados).contiene(stem)
+
+
+def segmentos_video(carpeta_procesados, stem):
+    """Segmentos del .srt del vídeo, leídos de su carpeta o, si se migró, del archivo histórico"""
+    ruta = carpeta_procesados / stem / f"{stem}.srt"
+    if ruta.exists():
+        return leer_srt(ruta)
+    if (carpeta_procesados / NOMBRE_ARCHIVO).exists():
+        return ArchivoHistorico(carpeta_procesados).segmentos(stem)
+    return None
+
+
+def migrar(carpeta_procesados, archivo, borrar=False):
+    """Archiva el .txt y el .srt de cada carpeta de vídeo; con borrar, elimina los originales ya comprobados"""
+    archivados = 0
+    bytes_originales = 0
+    for carpeta in sorted((p for p in carpeta_procesados.iterdir() if p.is_dir() and not p.name.startswith('.')),
+                          key=lambda p: clave_orden_video(p.name)):
+        txt = carpeta / f"{carpeta.name}.txt"
+        srt = carpeta / f"{carpeta.name}.srt"
+        if not txt.exists():
+            continue
+        contenido_txt = txt.read_text(encoding='utf-8')
+        contenido_srt = srt.read_text(encoding='utf-8') if srt.exists() else ""
+
+        registro = archivo.leer(carpeta.name)
+        if not registro or (registro['txt'], registro['srt']) != (contenido_txt, contenido_srt):
+            archivo.añadir(carpeta.name, contenido_txt, contenido_srt)
+            registro = archivo.leer(carpeta.name)
+            archivados += 1
+            bytes_originales += len(contenido_txt.encode('utf-8')) + len(contenido_srt.encode('utf-8'))
+
+        if borrar:
+            # Solo se borra lo que se ha podido releer idéntico del archivo
+            if (registro['txt'], registro['srt']) == (contenido_txt, contenido_srt):
+                txt.unlink()
+                if srt.exists():
+                    srt.unlink()
+            else:
+                print(f"⚠️ {carpeta.name}: la copia archivada no coincide, se conservan los originales")
+    return archivados, bytes_originales
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivo comprimido de transcripciones históricas")
+    parser.add_argument('--procesados', default=str(pathlib.Path(__file__).parent / "procesados"),
+                        help="Carpeta de procesados (por defecto ./procesados)")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_migrar = sub.add_parser('migrar', help="Archiva las transcripciones de procesados/<vídeo>/")
+    p_migrar.add_argument('--borrar', action='store_true', help="Borra el .txt y el .srt originales tras archivarlos")
+    p_leer = sub.add_parser('leer', help="Muestra la transcripción archivada de un vídeo")
+    p_leer.add_argument('stem', help="Nombre del vídeo sin extensión")
+    p_leer.add_argument('--srt', action='store_true', help="Muestra los subtítulos en lugar del texto")
+    sub.add_parser('listar', help="Vídeos archivados")
+    args = parser.parse_args()
+
+    carpeta = pathlib.Path(args.procesados)
+    archivo = ArchivoHistorico(carpeta, **cargar_config_historico())
+
+    try:
+        if args.comando == 'migrar':
+            archivados, bytes_originales = migrar(carpeta, archivo, borrar=args.borrar)
+            tamaño = archivo.ruta.stat().st_size if archivo.ruta.exists() else 0
+            print(f"✅ {archivados} transcripciones archivadas ({bytes_originales / 1024**2:.1f} MB sin comprimir)")
+            print(f"📦 {archivo.ruta.name}: {len(archivo.indice['videos'])} vídeos, {tamaño / 1024**2:.1f} MB")
+
+        elif args.comando == 'leer':
+            registro = archivo.leer(args.stem)
+            if not registro:
+                print(f"❌ {args.stem} no está en {archivo.ruta}")
+            else:
+                print(registro['srt'] if args.srt else registro['txt'])
+
+        elif args.comando == 'listar':
+            videos = archivo.indice['videos']
+            for stem in sorted(videos, key=clave_orden_video):
+                entrada = videos[stem]
+                print(f"   {stem:<40} {entrada['tamaño_original'] / 1024:>8.1f} KB → {entrada['longitud'] / 1024:>7.1f} KB  "
+                      f"{entrada['archivado']}")
+            originales = sum(e['tamaño_original'] for e in videos.values())
+            comprimidos = sum(e['longitud'] for e in videos.values())
+            if comprimidos:
+                print(f"📦 {len(videos)} vídeos, ratio {originales / comprimidos:.1f}x")
+    except RuntimeError as e:
+        print(f"❌ {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Huellas acústicas para detectar vídeos casi duplicados
+Se buscan picos del espectrograma (máximos locales en tiempo y frecuencia) y cada
+pico se empareja con los siguientes para formar hashes (f1, f2, Δt) que sobreviven a la
+recodificación, al cambio de contenedor y a los recortes. La huella de cada vídeo se
+guarda junto a su transcripción en procesados/<vídeo>/<vídeo>.huella.npz; un vídeo
+nuevo cuyos hashes coinciden con los de otro con un desplazamiento constante es un
+duplicado y reutiliza su transcripción
+
+Uso:
+    python huellas.py indexar     # huellas de los vídeos de videos_backup/ ya transcritos
+    python huellas.py buscar ruta/al/video.mp4
+"""
+import argparse
+import os
+import pathlib
+import threading
+
+import numpy as np
+from faster_whisper import decode_audio
+
+SAMPLE_RATE = 16000
+N_FFT = 1024
+SALTO = 512                      # 32 ms por trama
+SEGUNDOS_POR_TRAMA = SALTO / SAMPLE_RATE
+VECINDAD_TRAMAS = 5              # un pico debe ser máximo en ±5 tramas...
+VECINDAD_BINS = 8                # ...y en ±8 bins de frecuencia
+PICOS_POR_SEGUNDO = 15
+ABANICO = 5                      # parejas por pico ancla
+DT_MAX = 63                      # distancia máxima entre ancla y pareja (tramas, ~2 s)
+BLOQUE_TRAMAS = 4096             # el espectrograma se calcula por bloques para acotar memoria
+MAX_OCURRENCIAS = 200            # hashes demasiado comunes (silencio, tonos) no aportan
+
+VIDEO_EXTS = [".mp4", ".mkv", ".avi", ".mov", ".m4a", ".mp3", ".wav"]
+
+
+def cargar_config_duplicados():
+    return {
+        'activo': os.getenv('DEDUP_ENABLED', 'true').lower() == 'true',
+        'min_coincidencias': int(os.getenv('DEDUP_MIN_MATCHES', '50')),
+        'min_proporcion': float(os.getenv('DEDUP_MIN_RATIO', '0.2')),
+        # Una sintonía o una cortinilla compartida coincide muy bien, pero solo unos segundos
+        'min_segundos': float(os.getenv('DEDUP_MIN_COVERED_SECONDS', '30'))
+    }
+
+
+def ruta_huella(carpeta_procesados, stem):
+    return carpeta_procesados / stem / f"{stem}.huella.npz"
+
+
+def _desplazar(matriz, eje, paso):
+    """Copia de la matriz desplazada `paso` posiciones, rellenando con -inf"""
+    resultado = np.full_like(matriz, -np.inf)
+    if paso > 0:
+        indice_origen = [slice(None)] * 2
+        indice_destino = [slice(None)] * 2
+        indice_origen[eje] = slice(None, -paso)
+        indice_destino[eje] = slice(paso, None)
+    else:
+        indice_origen = [slice(None)] * 2
+        indice_destino = [slice(None)] * 2
+        indice_origen[eje] = slice(-paso, None)
+        indice_destino[eje] = slice(None, paso)
+    resultado[tuple(indice_destino)] = matriz[tuple(indice_origen)]
+    return resultado
+
+
+def _maximo_local(matriz, eje, radio):
+    """Máximo en una ventana de ±radio a lo largo del eje (por duplicación, O(log radio) pasadas)"""
+    resultado = matriz.copy()
+    alcance = 0
+    while alcance < radio:
+        paso = min(alcance + 1, radio - alcance)
+        resultado = np.maximum(resultado, np.maximum(_desplazar(resultado, eje, paso), _desplazar(resultado, eje, -paso)))
+        alcance += paso
+    return resultado
+
+
+def espectrograma(audio):
+    """Genera (trama inicial, log-magnitud) por bloques de BLOQUE_TRAMAS tramas"""
+    ventana = np.hanning(N_FFT).astype(np.float32)
+    total = max(0, (len(audio) - N_FFT) // SALTO + 1)
+    for inicio in range(0, total, BLOQUE_TRAMAS):
+        n = min(BLOQUE_TRAMAS, total - inicio)
+        tramas = np.lib.stride_tricks.as_strided(
+            audio[inicio * SALTO:],
+            shape=(n, N_FFT),
+            strides=(audio.strides[0] * SALTO, audio.strides[0])
+        )
+        magnitud = np.abs(np.fft.rfft(tramas * ventana, axis=1))
+        yield inicio, np.log1p(magnitud * 100).astype(np.float32)
+
+
+def picos(audio):
+    """Tramas y bins de los picos espectrales más fuertes (constelación)"""
+    audio = np.ascontiguousarray(audio, dtype=np.float32)
+    tiempos = []
+    frecuencias = []
+    for inicio, bloque in espectrograma(audio):
+        maximos = _maximo_local(_maximo_local(bloque, 0, VECINDAD_TRAMAS), 1, VECINDAD_BINS)
+        t, f = np.nonzero((bloque == maximos) & (bloque > bloque.mean()))
+        # Densidad acotada: solo los picos más fuertes del bloque
+        limite = int(PICOS_POR_SEGUNDO * len(bloque) * SEGUNDOS_POR_TRAMA)
+        if len(t) > limite:
+            mejores = np.argpartition(bloque[t, f], -limite)[-limite:]
+            t, f = t[mejores], f[mejores]
+        tiempos.append(t + inicio)
+        frecuencias.append(f)
+
+    if not tiempos:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+    tiempos = np.concatenate(tiempos).astype(np.int32)
+    frecuencias = np.concatenate(frecuencias).astype(np.int32)
+    orden = np.lexsort((frecuencias, tiempos))
+    return tiempos[orden], frecuencias[orden]
+
+
+def calcular_huella(audio):
+    """Huella del audio: hashes de parejas de picos y la trama del ancla de cada uno"""
+    t, f = picos(audio)
+    hashes = []
+    anclas = []
+    for k in range(1, ABANICO + 1):
+        if len(t) <= k:
+            break
+        dt = t[k:] - t[:-k]
+        validos = (dt > 0) & (dt <= DT_MAX)
+        # f1 y f2 ocupan 10 bits cada uno (hasta 512 bins) y Δt 6 bits
+        h = (f[:-k][validos].astype(np.uint32) << 16) | (f[k:][validos].astype(np.uint32) << 6) | dt[validos].astype(np.uint32)
+        hashes.append(h)
+        anclas.append(t[:-k][validos])
+
+    return {
+        'hashes': np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint32),
+        'tiempos': np.concatenate(anclas).astype(np.int32) if anclas else np.empty(0, dtype=np.int32),
+        'duracion': len(audio) / SAMPLE_RATE
+    }
+
+
+def guardar_huella(ruta, huella, nombre):
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(f".{ruta.stem}.{os.getpid()}.tmp.npz")
+    np.savez_compressed(temporal, hashes=huella['hashes'], tiempos=huella['tiempos'],
+                        duracion=huella['duracion'], nombre=nombre)
+    os.replace(temporal, ruta)
+
+
+def cargar_huella(ruta):
+    with np.load(ruta) as datos:
+        return {
+            'hashes': datos['hashes'],
+            'tiempos': datos['tiempos'],
+            'duracion': float(datos['duracion']),
+            'nombre': str(datos['nombre'])
+        }
+
+
+def emparejar_hashes(hashes_ordenados, hashes):
+    """Todas las parejas (posición en `hashes`, posición en `hashes_ordenados`) con el mismo valor"""
+    izquierda = np.searchsorted(hashes_ordenados, hashes, 'left')
+    derecha = np.searchsorted(hashes_ordenados, hashes, 'right')
+    cuentas = derecha - izquierda
+    cuentas[cuentas > MAX_OCURRENCIAS] = 0
+
+    consulta = np.repeat(np.arange(len(cuentas)), cuentas)
+    inicio_grupo = np.repeat(np.cumsum(cuentas) - cuentas, cuentas)
+    posiciones = np.arange(cuentas.sum()) - inicio_grupo + np.repeat(izquierda, cuentas)
+    return consulta, posiciones
+
+
+class IndiceHuellas:
+    """Índice invertido en memoria de todas las huellas de procesados/"""
+
+    def __init__(self, carpeta_procesados, config=None):
+        self.carpeta = carpeta_procesados
+        self.config = config or cargar_config_duplicados()
+        self.videos = []
+        # Huellas añadidas que aún no están en el índice ordenado (se ordenan en la siguiente búsqueda)
+        self._pendientes = []
+        # Varios hilos de transcripción pueden buscar y añadir a la vez
+        self._lock = threading.Lock()
+        partes = []
+        for ruta in sorted(carpeta_procesados.glob("*/*.huella.npz")):
+            try:
+                partes.append(self._registrar(ruta.parent.name, cargar_huella(ruta)))
+            except Exception as e:
+                print(f"⚠️ Huella ilegible {ruta.name}: {e}")
+        self._construir(partes)
+
+    def _registrar(self, stem, huella):
+        ident = len(self.videos)
+        self.videos.append({'stem': stem, 'nombre': huella['nombre'], 'duracion': huella['duracion']})
+        return huella['hashes'], huella['tiempos'], np.full(len(huella['hashes']), ident, dtype=np.int32)
+
+    def _construir(self, partes):
+        if not partes:
+            self.hashes = np.empty(0, dtype=np.uint32)
+            self.tiempos = np.empty(0, dtype=np.int32)
+            self.ids = np.empty(0, dtype=np.int32)
+            return
+        hashes, tiempos, ids = (np.concatenate(p) for p in zip(*partes))
+        orden = np.argsort(hashes, kind='stable')
+        self.hashes, self.tiempos, self.ids = hashes[orden], tiempos[orden], ids[orden]
+
+    def _incorporar_pendientes(self):
+        """Ordena de una vez las huellas añadidas desde la última búsqueda (con el lock tomado)"""
+        if self._pendientes:
+            self._construir([(self.hashes, self.tiempos, self.ids), *self._pendientes])
+            self._pendientes = []
+
+    def añadir(self, nombre, stem, huella):
+        """Guarda la huella del vídeo en su carpeta y la deja lista para la siguiente búsqueda"""
+        guardar_huella(ruta_huella(self.carpeta, stem), huella, nombre)
+        with self._lock:
+            self._pendientes.append(self._registrar(stem, {**huella, 'nombre': nombre}))
+
+    def total_hashes(self):
+        with self._lock:
+            return len(self.hashes) + sum(len(hashes) for hashes, _, _ in self._pendientes)
+
+    def buscar(self, huella, excluir=None):
+        """Vídeo indexado que contiene el mismo audio, o None
+
+        Devuelve el desplazamiento (segundos de la referencia menos segundos del vídeo
+        nuevo) y el tramo del vídeo nuevo que cubre la referencia: del primer al último
+        ancla que coincide con ese desplazamiento.
+        """
+        with self._lock:
+            self._incorporar_pendientes()
+            indice_hashes, indice_tiempos, indice_ids, videos = self.hashes, self.tiempos, self.ids, list(self.videos)
+        if not len(indice_hashes) or not len(huella['hashes']):
+            return None
+
+        consulta, posiciones = emparejar_hashes(indice_hashes, huella['hashes'])
+        if not len(consulta):
+            return None
+
+        ids = indice_ids[posiciones].astype(np.int64)
+        deltas = indice_tiempos[posiciones].astype(np.int64) - huella['tiempos'][consulta]
+
+        claves, votos = np.unique((ids << 32) | (deltas + 2 ** 31), return_counts=True)
+        mejores = np.argsort(votos)[::-1][:10]
+
+        mejor = None
+        for i in mejores:
+            ident = int(claves[i] >> 32)
+            delta = int(claves[i] & 0xFFFFFFFF) - 2 ** 31
+            if excluir and videos[ident]['nombre'] == excluir:
+                continue
+            # Tolerancia de ±1 trama por el desfase entre tramas de las dos codificaciones
+            cercanos = (ids == ident) & (np.abs(deltas - delta) <= 1)
+            # Un hash del vídeo nuevo cuenta una vez aunque aparezca varias veces en la referencia
+            anclas = np.unique(consulta[cercanos])
+            if not mejor or len(anclas) > mejor['coincidencias']:
+                mejor = {'ident': ident, 'delta': delta, 'coincidencias': len(anclas), 'anclas': anclas}
+
+        if not mejor or mejor['coincidencias'] < self.config['min_coincidencias']:
+            return None
+
+        referencia = videos[mejor['ident']]
+        desplazamiento = mejor['delta'] * SEGUNDOS_POR_TRAMA
+        # Tramo respaldado por las coincidencias, no todo el solapamiento de las dos líneas de tiempo:
+        # una sintonía compartida solo cubre sus propios segundos
+        tiempos_anclas = huella['tiempos'][mejor['anclas']]
+        primera, ultima = int(tiempos_anclas.min()), int(tiempos_anclas.max())
+        cubierto = (max(0.0, primera * SEGUNDOS_POR_TRAMA, -desplazamiento),
+                    min(huella['duracion'], ultima * SEGUNDOS_POR_TRAMA, referencia['duracion'] - desplazamiento))
+        if cubierto[1] - cubierto[0] < self.config['min_segundos']:
+            return None
+
+        # Proporción de hashes del tramo cubierto que coinciden (los picos no sobreviven todos a la recodificación)
+        en_tramo = ((huella['tiempos'] >= primera) & (huella['tiempos'] <= ultima)).sum()
+        proporcion = mejor['coincidencias'] / max(int(en_tramo), 1)
+        if proporcion < self.config['min_proporcion']:
+            return None
+
+        return {
+            'nombre': referencia['nombre'],
+            'stem': referencia['stem'],
+            'desplazamiento': round(desplazamiento, 3),
+            'cubierto': (round(cubierto[0], 3), round(cubierto[1], 3)),
+            'coincidencias': mejor['coincidencias'],
+            'proporcion': round(proporcion, 3)
+        }
+
+
+def tramos_sin_cubrir(duracion, cubierto, minimo=1.0):
+    """Partes del vídeo nuevo fuera del tramo cubierto por la referencia"""
+    tramos = []
+    if cubierto[0] >= minimo:
+        tramos.append((0.0, cubierto[0]))
+    if duracion - cubierto[1] >= minimo:
+        tramos.append((cubierto[1], duracion))
+    return tramos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice de huellas acústicas para detectar duplicados")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    sub.add_parser('indexar', help="Calcula las huellas de los vídeos de videos_backup/ ya transcritos")
+    p_buscar = sub.add_parser('buscar', help="Busca un vídeo en el índice")
+    p_buscar.add_argument('video', type=pathlib.Path)
+    args = parser.parse_args()
+
+    base = pathlib.Path(__file__).parent
+    carpeta_procesados = base / "procesados"
+    indice = IndiceHuellas(carpeta_procesados)
+
+    if args.comando == 'indexar':
+        conocidos = {v['nombre'] for v in indice.videos}
+        for fichero in sorted((base / "videos_backup").iterdir()):
+            if fichero.suffix.lower() not in VIDEO_EXTS or fichero.name in conocidos:
+                continue
+            if not (carpeta_procesados / fichero.stem).is_dir():
+                continue
+            print(f"🔎 {fichero.name}")
+            indice.añadir(fichero.name, fichero.stem, calcular_huella(decode_audio(str(fichero), sampling_rate=SAMPLE_RATE)))
+        print(f"✅ Índice con {len(indice.videos)} vídeos y {indice.total_hashes():,} hashes")
+
+    elif args.comando == 'buscar':
+        huella = calcular_huella(decode_audio(str(args.video), sampling_rate=SAMPLE_RATE))
+        resultado = indice.buscar(huella, excluir=args.video.name)
+        if not resultado:
+            print("📭 Sin duplicados en el índice")
+        else:
+            print(f"♊ Coincide con {resultado['nombre']} (desplazamiento {resultado['desplazamiento']:+.2f}s, "
+                  f"tramo {resultado['cubierto'][0]:.1f}-{resultado['cubierto'][1]:.1f}s, "
+                  f"{resultado['coincidencias']} coincidencias, {resultado['proporcion']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Retranscripción incremental de vídeos reeditados
+Cuando llega una nueva versión de un vídeo con el mismo código (KLC-T1-v2, KK-F1-v2...),
+su huella se compara por trozos con la de la versión anterior guardada en
+procesados/<vídeo>/<vídeo>.huella.npz. Los trozos cuyo audio sigue ahí (aunque se haya
+desplazado por un corte o una inserción anterior) reutilizan los segmentos del .srt
+anterior; solo los tramos cambiados se transcriben y se empalman en su sitio
+"""
+import os
+
+import numpy as np
+
+from codigos_video import descomponer_codigo_video
+from historico import transcripcion_disponible
+from huellas import SEGUNDOS_POR_TRAMA, cargar_huella, emparejar_hashes, guardar_huella, ruta_huella
+
+# Coincidencias mínimas para dar un trozo por reconocido
+MIN_COINCIDENCIAS_TROZO = 8
+
+
+def cargar_config_incremental():
+    return {
+        'activo': os.getenv('INCREMENTAL_ENABLED', 'true').lower() == 'true',
+        'segundos_trozo': float(os.getenv('INCREMENTAL_CHUNK_SECONDS', '10')),
+        'max_proporcion_cambiada': float(os.getenv('INCREMENTAL_MAX_CHANGED_RATIO', '0.5'))
+    }
+
+
+def buscar_version_anterior(carpeta_procesados, fichero):
+    """Carpeta de la versión ya transcrita más reciente con el mismo código de vídeo, o None"""
+    partes = descomponer_codigo_video(fichero.name)
+    if not partes:
+        return None
+
+    anteriores = []
+    for huella in carpeta_procesados.glob(f"*{partes['codigo']}*/*.huella.npz"):
+        carpeta = huella.parent
+        codigo = descomponer_codigo_video(carpeta.name)
+        if codigo and codigo['codigo'] == partes['codigo'] and transcripcion_disponible(carpeta_procesados, carpeta.name):
+            anteriores.append((huella.stat().st_mtime, carpeta))
+    return max(anteriores)[1] if anteriores else None
+
+
+def guardar_huella_video(carpeta_procesados, fichero, huella, indice_huellas=None):
+    """Guarda la huella del vídeo para que su próxima versión la encuentre, haya o no detección de duplicados"""
+    if indice_huellas:
+        indice_huellas.añadir(fichero.name, fichero.stem, huella)
+    else:
+        guardar_huella(ruta_huella(carpeta_procesados, fichero.stem), huella, fichero.name)
+
+
+def comparar_trozos(huella_nueva, huella_anterior, segundos_trozo):
+    """Tramos (inicio, fin, desplazamiento) del audio nuevo reconocidos en la versión anterior
+
+    En cada trozo se vota el desplazamiento más repetido entre los hashes coincidentes y
+    el tramo reconocido abarca solo desde la primera hasta la última coincidencia con ese
+    desplazamiento: un trozo que mezcla audio nuevo y antiguo no se reutiliza entero.
+    """
+    tramas_trozo = max(1, int(round(segundos_trozo / SEGUNDOS_POR_TRAMA)))
+
+    orden = np.argsort(huella_anterior['hashes'], kind='stable')
+    hashes_anteriores = huella_anterior['hashes'][orden]
+    tiempos_anteriores = huella_anterior['tiempos'][orden]
+
+    consulta, posiciones = emparejar_hashes(hashes_anteriores, huella_nueva['hashes'])
+    if not len(consulta):
+        return []
+
+    tiempos = huella_nueva['tiempos'][consulta].astype(np.int64)
+    trozos = tiempos // tramas_trozo
+    deltas = tiempos_anteriores[posiciones].astype(np.int64) - tiempos
+
+    reconocidos = []
+    for trozo in np.unique(trozos):
+        en_trozo = trozos == trozo
+        valores, votos = np.unique(deltas[en_trozo], return_counts=True)
+        if votos.max() < MIN_COINCIDENCIAS_TROZO:
+            continue
+        delta = int(valores[votos.argmax()])
+        # ±1 trama de tolerancia por el redondeo de los picos
+        coinciden = tiempos[en_trozo][np.abs(deltas[en_trozo] - delta) <= 1]
+        reconocidos.append((float(coinciden.min() * SEGUNDOS_POR_TRAMA),
+                            float((coinciden.max() + 1) * SEGUNDOS_POR_TRAMA), delta))
+    return reconocidos
+
+
+def planificar(huella_nueva, huella_anterior, segundos_trozo, hueco_minimo=1.0):
+    """Divide el vídeo nuevo en tramos reutilizables (con su desplazamiento en segundos) y tramos cambiados
+
+    Los huecos de menos de `hueco_minimo` segundos entre tramos reconocidos (silencios o
+    zonas sin picos) se consideran sin cambios; entre tramos con el mismo desplazamiento
+    se tolera el doble.
+    """
+    duracion = huella_nueva['duracion']
+    reutilizados = []
+    for inicio, fin, delta in comparar_trozos(huella_nueva, huella_anterior, segundos_trozo):
+        segundos = delta * SEGUNDOS_POR_TRAMA
+        # Tramos seguidos con el mismo desplazamiento (±2 tramas) forman uno solo
+        if (reutilizados and inicio - reutilizados[-1][1] < 2 * hueco_minimo
+                and abs(reutilizados[-1][2] - segundos) <= 2 * SEGUNDOS_POR_TRAMA):
+            reutilizados[-1] = (reutilizados[-1][0], fin, reutilizados[-1][2])
+        else:
+            reutilizados.append((inicio, fin, segundos))
+
+    cambiados = []
+    anterior_fin = 0.0
+    for i, (inicio, fin, segundos) in enumerate(reutilizados + [(duracion, duracion, 0.0)]):
+        if inicio - anterior_fin >= hueco_minimo:
+            cambiados.append((anterior_fin, inicio))
+        elif i < len(reutilizados):
+            # Hueco pequeño: el tramo reutilizado se estira hasta el final del anterior
+            reutilizados[i] = (anterior_fin, fin, segundos)
+        elif reutilizados:
+            reutilizados[-1] = (reutilizados[-1][0], duracion, reutilizados[-1][2])
+        anterior_fin = fin
+
+    cambiado = sum(fin - inicio for inicio, fin in cambiados)
+    return {
+        'reutilizados': reutilizados,
+        'cambiados': cambiados,
+        'proporcion_cambiada': cambiado / duracion if duracion else 1.0
+    }
+
+
+def segmentos_reutilizados(segmentos_anteriores, tramo):
+    """Segmentos de la versión anterior que caen en el tramo, llevados a la línea de tiempo nueva"""
+    inicio, fin, desplazamiento = tramo
+    resultado = []
+    for segmento in segmentos_anteriores:
+        mitad = (segmento['inicio'] + segmento['fin']) / 2 - desplazamiento
+        if inicio <= mitad < fin:
+            resultado.append({
+                **segmento,
+                'inicio': round(max(segmento['inicio'] - desplazamiento, 0.0), 3),
+                'fin': round(segmento['fin'] - desplazamiento, 3)
+            })
+    return resultado
+
+
+def plan_incremental(carpeta_procesados, fichero, huella, config):
+    """(carpeta de la versión anterior, plan) si merece la pena retranscribir solo lo cambiado, o None"""
+    anterior = buscar_version_anterior(carpeta_procesados, fichero)
+    if not anterior:
+        return None
+    huella_anterior = cargar_huella(ruta_huella(carpeta_procesados, anterior.name))
+
+    plan = planificar(huella, huella_anterior, config['segundos_trozo'])
+    if not plan['reutilizados'] or plan['proporcion_cambiada'] > config['max_proporcion_cambiada']:
+        print(f"✂️ {fichero.name}: ha cambiado el {plan['proporcion_cambiada']:.0%} respecto a {anterior.name}, "
+              f"se transcribe entero")
+        return None
+    return anterior, plan
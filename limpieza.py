@@ -0,0 +1,106 @@
+"""
+Limpieza determinista de transcripciones antes de enviarlas a los prompts
+Whisper a veces entra en bucle (la misma frase o palabra muchas veces), inventa créditos
+en los silencios ("Subtítulos realizados por…", "Gracias.") y transcribe muletillas. Sobre
+la lista de segmentos se aplican, en orden:
+  1. bucles de repetición: n-gramas de hasta 8 palabras repetidos seguidos dentro de un
+     segmento se dejan una vez, se descartan los segmentos que aun así superan el ratio de
+     compresión zlib de Whisper (bucles más largos) y los segmentos idénticos seguidos
+  2. alucinaciones conocidas y muletillas
+  3. normalización de espacios y puntuación
+Solo afecta al texto del consolidado (lo que se envía a los modelos); el .txt y el .srt de
+cada vídeo se guardan tal cual
+"""
+import os
+import re
+import zlib
+
+# Frases que Whisper inventa en silencios o música (se comparan sin puntuación y en minúsculas)
+ALUCINACIONES = [
+    r"subt[ií]tulos (realizados|hechos|creados) por .*",
+    r"subt[ií]tulos por la comunidad de amara\.org",
+    r".*amara\.org.*",
+    r"gracias por ver el v[ií]deo",
+    r"(no olvides )?suscr[ií]bete( al canal)?.*",
+    r"gracias( a todos)?",
+    r"m[uú]sica",
+]
+
+# Muletillas e interjecciones sin contenido, como palabra suelta
+MULETILLAS = ["eh+", "e+m+", "mm+", "ah+", "uh+", "um+", "hm+", "este+\\.\\.\\.", "o sea,"]
+
+PATRON_ALUCINACION = re.compile(r"^(?:" + "|".join(ALUCINACIONES) + r")$")
+PATRON_MULETILLA = re.compile(r"(?<!\w)(?:" + "|".join(MULETILLAS) + r")(?!\w)[,.]?\s*", re.IGNORECASE)
+PATRON_NO_PALABRA = re.compile(r"[^\w\s.]")
+
+# Hasta 8 palabras repetidas 3 o más veces seguidas ("vale, vale, vale, vale")
+PATRON_BUCLE = re.compile(r"\b(\w+(?:\W+\w+){0,7}?)(?:\W+\1\b){2,}", re.IGNORECASE)
+
+
+def cargar_config_limpieza():
+    return {
+        'activo': os.getenv('TRANSCRIPT_CLEANUP_ENABLED', 'true').lower() == 'true',
+        'ratio_compresion': float(os.getenv('CLEANUP_MAX_COMPRESSION_RATIO', '2.4')),
+        'muletillas': os.getenv('CLEANUP_REMOVE_FILLERS', 'true').lower() == 'true'
+    }
+
+
+def ratio_compresion(texto):
+    """Tamaño del texto entre su tamaño comprimido: los bucles comprimen mucho (Whisper usa 2.4)"""
+    datos = texto.encode('utf-8')
+    return len(datos) / len(zlib.compress(datos)) if datos else 0.0
+
+
+def estimar_tokens(texto):
+    """Estimación de tokens (~4 caracteres por token), suficiente para comparar antes y después"""
+    return (len(texto) + 3) // 4
+
+
+def quitar_bucles(texto):
+    """Deja una sola vez cada secuencia de palabras repetida tres o más veces seguidas"""
+    anterior = None
+    while anterior != texto:
+        anterior = texto
+        texto = PATRON_BUCLE.sub(r"\1", texto)
+    return texto
+
+
+def normalizar(texto):
+    """Espacios y puntuación: sin espacios antes de signos, signos repetidos reducidos a uno"""
+    texto = re.sub(r"\s+", " ", texto).strip()
+    texto = re.sub(r"\s+([,.;:!?])", r"\1", texto)
+    texto = re.sub(r"([,;:!?¡¿])\1+", r"\1", texto)
+    texto = re.sub(r"\.{4,}", "...", texto)
+    texto = re.sub(r"([,;:])(?=\w)", r"\1 ", texto)
+    texto = re.sub(r"^[,.;:\s]+", "", texto)
+    return texto
+
+
+def limpiar_segmentos(segmentos, config):
+    """Segmentos limpios (los vacíos se descartan) e informe {'eliminados', 'tokens_antes', 'tokens_despues'}"""
+    limpios = []
+    previo = None
+    for segmento in segmentos:
+        texto = segmento['texto']
+        texto = quitar_bucles(texto)
+        # Lo que sigue comprimiendo tanto tras quitar los n-gramas es un bucle más largo: fuera
+        if ratio_compresion(texto) > config['ratio_compresion']:
+            continue
+        if config['muletillas']:
+            texto = PATRON_MULETILLA.sub("", texto)
+        texto = normalizar(texto)
+
+        clave = PATRON_NO_PALABRA.sub("", texto.lower()).strip(" .")
+        # Vacío, crédito inventado o la misma línea que el segmento anterior
+        if not clave or PATRON_ALUCINACION.match(clave) or clave == previo:
+            continue
+        previo = clave
+        limpios.append({**segmento, 'texto': texto})
+
+    tokens_antes = estimar_tokens("".join(f"{s['texto']}\n" for s in segmentos))
+    tokens_despues = estimar_tokens("".join(f"{s['texto']}\n" for s in limpios))
+    return limpios, {
+        'eliminados': len(segmentos) - len(limpios),
+        'tokens_antes': tokens_antes,
+        'tokens_despues': tokens_despues
+    }
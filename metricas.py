@@ -0,0 +1,170 @@
+"""
+Instrumentación por etapas del pipeline
+Cada etapa medida se añade como una línea JSON a metricas.jsonl y se agrega
+en memoria para exportarla en formato de texto Prometheus/OpenMetrics
+(compatible con el textfile collector de node-exporter)
+"""
+import json
+import os
+import pathlib
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+# Límites superiores (segundos) de los buckets del histograma de duración
+BUCKETS = [0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600]
+
+# Etiquetas que se exportan a Prometheus (el resto solo va al JSONL para no disparar la cardinalidad)
+ETIQUETAS_EXPORTADAS = ('motor',)
+
+_lock = threading.Lock()
+_estado = {
+    'carpeta': None,
+    'ejecucion': uuid.uuid4().hex[:12],
+    'agregados': {},
+    'indicadores': {},
+    'suscriptores': []
+}
+
+
+def carpeta_metricas():
+    """Carpeta donde se guardan las métricas (METRICS_DIR o procesados/metricas)"""
+    if _estado['carpeta'] is None:
+        carpeta = os.getenv('METRICS_DIR') or pathlib.Path(__file__).parent / "procesados" / "metricas"
+        _estado['carpeta'] = pathlib.Path(carpeta)
+    return _estado['carpeta']
+
+
+def configurar(carpeta):
+    """Cambia la carpeta de métricas (por defecto METRICS_DIR o procesados/metricas)"""
+    with _lock:
+        _estado['carpeta'] = pathlib.Path(carpeta)
+
+
+def registrar(nombre, segundos, ok=True, **etiquetas):
+    """Registra la duración de una etapa en el JSONL y en los agregados"""
+    evento = {
+        'ts': datetime.now().isoformat(timespec='milliseconds'),
+        'ejecucion': _estado['ejecucion'],
+        'host': socket.gethostname(),
+        'etapa': nombre,
+        'segundos': round(segundos, 6),
+        'ok': ok,
+        **etiquetas
+    }
+
+    clave = (nombre,) + tuple((k, str(etiquetas[k])) for k in ETIQUETAS_EXPORTADAS if k in etiquetas)
+
+    with _lock:
+        agregado = _estado['agregados'].setdefault(clave, {
+            'count': 0, 'sum': 0.0, 'errores': 0, 'buckets': [0] * len(BUCKETS)
+        })
+        agregado['count'] += 1
+        agregado['sum'] += segundos
+        if not ok:
+            agregado['errores'] += 1
+        for i, limite in enumerate(BUCKETS):
+            if segundos <= limite:
+                agregado['buckets'][i] += 1
+
+        carpeta = carpeta_metricas()
+        carpeta.mkdir(parents=True, exist_ok=True)
+        with open(carpeta / "metricas.jsonl", 'a', encoding='utf-8') as f:
+            f.write(json.dumps(evento, ensure_ascii=False, default=str) + "\n")
+        suscriptores = list(_estado['suscriptores'])
+
+    for funcion in suscriptores:
+        try:
+            funcion(evento)
+        except Exception as e:
+            print(f"⚠️ Error al reenviar la métrica '{nombre}': {e}")
+
+    return evento
+
+
+def suscribir(funcion):
+    """Registra una función que recibirá cada evento de etapa (p. ej. para el registro SQLite)"""
+    with _lock:
+        _estado['suscriptores'].append(funcion)
+
+
+def cancelar_suscripcion(funcion):
+    with _lock:
+        if funcion in _estado['suscriptores']:
+            _estado['suscriptores'].remove(funcion)
+
+
+def fijar_indicador(nombre, valor, **etiquetas):
+    """Fija el valor actual de un indicador (gauge), p. ej. la profundidad de una cola"""
+    clave = (nombre,) + tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+    with _lock:
+        _estado['indicadores'][clave] = valor
+
+
+@contextmanager
+def etapa(nombre, **etiquetas):
+    """Mide el bloque como una etapa del pipeline; marca ok=False si lanza una excepción"""
+    inicio = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        registrar(nombre, time.perf_counter() - inicio, ok=ok, **etiquetas)
+
+
+def formatear_etiquetas(clave, extra=None):
+    """Construye el bloque {etapa="...",...} de una serie"""
+    pares = [('etapa', clave[0])] + list(clave[1:]) + (extra or [])
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pares) + "}"
+
+
+def exportar_openmetrics(nombre="transcripcion"):
+    """Escribe los agregados en transcriptor_<nombre>.prom de forma atómica"""
+    carpeta = pathlib.Path(os.getenv('METRICS_TEXTFILE_DIR') or carpeta_metricas())
+    carpeta.mkdir(parents=True, exist_ok=True)
+    archivo = carpeta / f"transcriptor_{nombre}.prom"
+
+    lineas = [
+        "# HELP transcriptor_etapa_duracion_segundos Duración de cada etapa del pipeline",
+        "# TYPE transcriptor_etapa_duracion_segundos histogram"
+    ]
+    with _lock:
+        agregados = {clave: dict(valor, buckets=list(valor['buckets'])) for clave, valor in _estado['agregados'].items()}
+        indicadores = dict(_estado['indicadores'])
+
+    for clave, agregado in sorted(agregados.items()):
+        for limite, cuenta in zip(BUCKETS, agregado['buckets']):
+            lineas.append(f"transcriptor_etapa_duracion_segundos_bucket{formatear_etiquetas(clave, [('le', limite)])} {cuenta}")
+        lineas.append(f"transcriptor_etapa_duracion_segundos_bucket{formatear_etiquetas(clave, [('le', '+Inf')])} {agregado['count']}")
+        lineas.append(f"transcriptor_etapa_duracion_segundos_sum{formatear_etiquetas(clave)} {agregado['sum']:.6f}")
+        lineas.append(f"transcriptor_etapa_duracion_segundos_count{formatear_etiquetas(clave)} {agregado['count']}")
+
+    lineas.append("# HELP transcriptor_etapa_errores_total Ejecuciones de etapa que terminaron con error")
+    lineas.append("# TYPE transcriptor_etapa_errores_total counter")
+    for clave, agregado in sorted(agregados.items()):
+        lineas.append(f"transcriptor_etapa_errores_total{formatear_etiquetas(clave)} {agregado['errores']}")
+
+    for nombre in sorted({clave[0] for clave in indicadores}):
+        lineas.append(f"# TYPE transcriptor_{nombre} gauge")
+        for clave, valor in sorted(indicadores.items()):
+            if clave[0] == nombre:
+                etiquetas = "{" + ",".join(f'{k}="{v}"' for k, v in clave[1:]) + "}" if len(clave) > 1 else ""
+                lineas.append(f"transcriptor_{nombre}{etiquetas} {valor:g}")
+
+    lineas.append("# HELP transcriptor_ultima_exportacion_timestamp_segundos Momento de la última exportación")
+    lineas.append("# TYPE transcriptor_ultima_exportacion_timestamp_segundos gauge")
+    lineas.append(f"transcriptor_ultima_exportacion_timestamp_segundos {time.time():.0f}")
+
+    # node-exporter puede leer el archivo en cualquier momento: escribir en temporal y renombrar
+    temporal = archivo.with_suffix(f".prom.{os.getpid()}.tmp")
+    with open(temporal, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lineas) + "\n")
+    os.replace(temporal, archivo)
+
+    return archivo
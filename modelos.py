@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Caché local de modelos CTranslate2 en MODELS_CACHE_DIR
+Cada modelo se guarda ya convertido en <MODELS_CACHE_DIR>/<modelo>/ (y su variante
+precuantizada en <modelo>-int8/) con un manifiesto de sumas SHA-256. Al arrancar,
+transcribir.py carga el modelo desde la caché sin consultar el hub; con
+MODELS_OFFLINE=true nunca se descarga nada
+
+Uso:
+    python modelos.py preparar small            # descarga el modelo convertido a la caché
+    python modelos.py preparar small --int8     # además genera la variante int8 (requiere transformers)
+    python modelos.py verificar                 # recalcula las sumas de todos los modelos
+    python modelos.py listar
+"""
+import argparse
+import hashlib
+import os
+import pathlib
+import shutil
+from datetime import datetime
+
+from dotenv import load_dotenv
+from faster_whisper import download_model
+
+from estado_trabajos import escribir_json_atomico, leer_json
+
+load_dotenv()
+
+MANIFIESTO = "manifiesto.json"
+
+# Archivos auxiliares que faster-whisper necesita junto al model.bin
+ARCHIVOS_AUXILIARES = ["tokenizer.json", "preprocessor_config.json"]
+
+
+class ModeloNoDisponible(Exception):
+    """El modelo no está en la caché y no se puede descargar (modo offline)"""
+
+
+def carpeta_cache():
+    carpeta = os.getenv('MODELS_CACHE_DIR') or "models_cache"
+    carpeta = pathlib.Path(carpeta)
+    if not carpeta.is_absolute():
+        carpeta = pathlib.Path(__file__).parent / carpeta
+    return carpeta
+
+
+def modo_offline():
+    return os.getenv('MODELS_OFFLINE', 'false').lower() == 'true'
+
+
+def nombre_variante(modelo, cuantizacion=None):
+    # Los identificadores del hub (org/modelo) se guardan en una sola carpeta
+    nombre = modelo.replace('/', '--')
+    return f"{nombre}-{cuantizacion}" if cuantizacion else nombre
+
+
+def suma_sha256(ruta, bloque=8 * 1024 * 1024):
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        while True:
+            datos = f.read(bloque)
+            if not datos:
+                break
+            h.update(datos)
+    return h.hexdigest()
+
+
+def escribir_manifiesto(carpeta, modelo, origen, cuantizacion=None):
+    """Calcula la suma de cada archivo del modelo y la guarda en manifiesto.json"""
+    archivos = {}
+    for ruta in sorted(carpeta.iterdir()):
+        if ruta.is_file() and ruta.name != MANIFIESTO:
+            stat = ruta.stat()
+            archivos[ruta.name] = {'sha256': suma_sha256(ruta), 'tamaño': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    escribir_json_atomico(carpeta / MANIFIESTO, {
+        'modelo': modelo,
+        'cuantizacion': cuantizacion,
+        'origen': origen,
+        'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'archivos': archivos
+    })
+
+
+def verificar_modelo(carpeta, completa=False):
+    """Devuelve la lista de problemas del modelo en caché (vacía si está íntegro)
+
+    La verificación rápida compara tamaño y fecha con el manifiesto y solo recalcula la
+    suma de los archivos que han cambiado; la completa recalcula todas.
+    """
+    manifiesto = leer_json(carpeta / MANIFIESTO)
+    if not manifiesto:
+        return ["sin manifiesto"]
+
+    problemas = []
+    for nombre, esperado in manifiesto['archivos'].items():
+        ruta = carpeta / nombre
+        if not ruta.exists():
+            problemas.append(f"falta {nombre}")
+            continue
+        stat = ruta.stat()
+        if stat.st_size != esperado['tamaño']:
+            problemas.append(f"tamaño distinto en {nombre}")
+            continue
+        if completa or stat.st_mtime_ns != esperado['mtime_ns']:
+            if suma_sha256(ruta) != esperado['sha256']:
+                problemas.append(f"suma SHA-256 distinta en {nombre}")
+    return problemas
+
+
+def preparar_modelo(modelo):
+    """Descarga el modelo convertido de faster-whisper a la caché (si no está ya)"""
+    destino = carpeta_cache() / nombre_variante(modelo)
+    if (destino / MANIFIESTO).exists() and not verificar_modelo(destino):
+        return destino
+    if modo_offline():
+        raise ModeloNoDisponible(f"'{modelo}' no está en {carpeta_cache()} y MODELS_OFFLINE=true "
+                                 f"(prepáralo con: python modelos.py preparar {modelo})")
+
+    print(f"⬇️ Descargando modelo '{modelo}' a {destino}...")
+    destino.mkdir(parents=True, exist_ok=True)
+    download_model(modelo, output_dir=str(destino))
+    escribir_manifiesto(destino, modelo, origen=f"faster-whisper:{modelo}")
+    return destino
+
+
+def preparar_variante_int8(modelo):
+    """Convierte el modelo original de OpenAI a CTranslate2 precuantizado en int8"""
+    # Dependencias solo necesarias para convertir, no para transcribir
+    try:
+        from ctranslate2.converters import TransformersConverter
+    except ImportError:
+        raise ModeloNoDisponible("Para generar la variante int8 instala transformers: pip install transformers")
+
+    destino = carpeta_cache() / nombre_variante(modelo, 'int8')
+    temporal = destino.with_name(f".{destino.name}.tmp")
+    shutil.rmtree(temporal, ignore_errors=True)
+
+    print(f"🔧 Convirtiendo openai/whisper-{modelo} a int8 en {destino}...")
+    TransformersConverter(f"openai/whisper-{modelo}", copy_files=ARCHIVOS_AUXILIARES).convert(
+        str(temporal), quantization='int8'
+    )
+    escribir_manifiesto(temporal, modelo, origen=f"openai/whisper-{modelo}", cuantizacion='int8')
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(temporal, destino)
+    return destino
+
+
+def resolver_modelo(modelo, compute_type):
+    """Ruta local del modelo a cargar en WhisperModel
+
+    Con compute_type int8* se usa la variante precuantizada si existe en la caché
+    (carga más rápida y menos memoria). Si el modelo no está en la caché se descarga
+    a ella, salvo en modo offline. Una ruta a una carpeta existente se usa tal cual.
+    """
+    if modo_offline():
+        # Ninguna dependencia (tokenizer incluido) debe intentar llegar al hub
+        os.environ['HF_HUB_OFFLINE'] = '1'
+
+    if pathlib.Path(modelo).is_dir():
+        return str(modelo)
+
+    if compute_type.startswith('int8'):
+        variante = carpeta_cache() / nombre_variante(modelo, 'int8')
+        if (variante / MANIFIESTO).exists():
+            problemas = verificar_modelo(variante)
+            if not problemas:
+                return str(variante)
+            print(f"⚠️ Variante int8 de '{modelo}' dañada ({', '.join(problemas)}): se usa la normal")
+
+    carpeta = carpeta_cache() / nombre_variante(modelo)
+    if (carpeta / MANIFIESTO).exists():
+        problemas = verificar_modelo(carpeta, completa=os.getenv('MODELS_VERIFY_CHECKSUM', 'false').lower() == 'true')
+        if not problemas:
+            return str(carpeta)
+        print(f"⚠️ Modelo '{modelo}' dañado en la caché ({', '.join(problemas)})")
+        if modo_offline():
+            raise ModeloNoDisponible(f"'{modelo}' está dañado en {carpeta_cache()} y MODELS_OFFLINE=true")
+        shutil.rmtree(carpeta)
+
+    return str(preparar_modelo(modelo))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gestión de la caché local de modelos Whisper")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_preparar = sub.add_parser('preparar', help="Descarga (y opcionalmente cuantiza) un modelo en la caché")
+    p_preparar.add_argument('modelo')
+    p_preparar.add_argument('--int8', action='store_true', help="Genera también la variante precuantizada int8")
+    sub.add_parser('verificar', help="Recalcula las sumas SHA-256 de todos los modelos")
+    sub.add_parser('listar', help="Modelos en la caché")
+    args = parser.parse_args()
+
+    cache = carpeta_cache()
+
+    try:
+        if args.comando == 'preparar':
+            print(f"✅ Modelo listo: {preparar_modelo(args.modelo)}")
+            if args.int8:
+                print(f"✅ Variante int8 lista: {preparar_variante_int8(args.modelo)}")
+
+        elif args.comando == 'verificar':
+            for carpeta in sorted(p for p in cache.iterdir() if p.is_dir()) if cache.exists() else []:
+                problemas = verificar_modelo(carpeta, completa=True)
+                print(f"{'✅' if not problemas else '❌'} {carpeta.name}" + (f": {', '.join(problemas)}" if problemas else ""))
+
+        elif args.comando == 'listar':
+            print(f"📦 Caché: {cache}")
+            for carpeta in sorted(p for p in cache.iterdir() if p.is_dir()) if cache.exists() else []:
+                manifiesto = leer_json(carpeta / MANIFIESTO) or {}
+                tamaño = sum(a['tamaño'] for a in manifiesto.get('archivos', {}).values()) / 1024**2
+                print(f"   {carpeta.name:<20} {tamaño:>9.1f} MB  {manifiesto.get('origen', '¿sin manifiesto?')}  {manifiesto.get('fecha', '')}")
+    except ModeloNoDisponible as e:
+        print(f"❌ {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Estadísticas acumuladas y panel HTML incremental
+Cada vídeo procesado se guarda (o actualiza) en la tabla `estadisticas` del registro
+SQLite, así que el panel refleja todo el histórico y no solo la última ejecución. Los
+agregados (totales, medias, cursos/fases, tendencia diaria) se calculan con SQL.
+
+El panel vive en procesados/estadisticas/: index.html es una plantilla fija que se
+escribe una sola vez y carga los datos de ficheros .js por sección (resumen, cursos,
+tendencia y una página por cada STATS_PAGE_SIZE vídeos). Al regenerar, solo se
+reescriben las secciones cuyo contenido ha cambiado; la tabla de vídeos se pagina en el
+navegador cargando cada página bajo demanda
+
+Uso:
+    python panel_estadisticas.py                # regenera el panel con lo que hay en el registro
+"""
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+from datetime import datetime, timedelta
+
+from codigos_video import clave_orden_video, descomponer_codigo_video
+from estado_trabajos import escritura_atomica, escribir_json_atomico, leer_json
+from registro_db import RegistroEjecuciones
+
+ESQUEMA_ESTADISTICAS = """
+CREATE TABLE IF NOT EXISTS estadisticas (
+    nombre TEXT PRIMARY KEY,
+    codigo_video TEXT,
+    curso TEXT,
+    fase TEXT,
+    video INTEGER,
+    tamano_mb REAL,
+    duracion REAL,
+    caracteres INTEGER,
+    palabras INTEGER,
+    fecha TEXT NOT NULL,
+    trabajo_id INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_estadisticas_curso ON estadisticas(curso, fase, video);
+CREATE INDEX IF NOT EXISTS idx_estadisticas_fecha ON estadisticas(fecha);
+"""
+
+# Cambiar al modificar PLANTILLA: fuerza a reescribir index.html
+VERSION_PLANTILLA = 1
+
+COLUMNAS_VIDEOS = ['codigo', 'nombre', 'duracion', 'tamano_mb', 'palabras', 'caracteres', 'velocidad', 'fecha']
+
+
+def cargar_config_panel():
+    return {
+        'filas_por_pagina': int(os.getenv('STATS_PAGE_SIZE', '500')),
+        'dias_tendencia': int(os.getenv('STATS_TREND_DAYS', '90'))
+    }
+
+
+class EstadisticasAcumuladas:
+    """Estadísticas por vídeo de todas las ejecuciones, en el registro SQLite"""
+
+    def __init__(self, registro):
+        self.registro = registro
+        with registro.lock, registro.conn:
+            registro.conn.executescript(ESQUEMA_ESTADISTICAS)
+
+    def registrar(self, estadisticas, trabajo_id=None):
+        """Guarda las estadísticas de un vídeo (las de recopilar_estadisticas_video); si ya estaba, las sustituye"""
+        codigo = descomponer_codigo_video(estadisticas['nombre_archivo']) or {}
+        self.registro.ejecutar(
+            """INSERT OR REPLACE INTO estadisticas (nombre, codigo_video, curso, fase, video, tamano_mb, duracion,
+                                                    caracteres, palabras, fecha, trabajo_id)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (estadisticas['nombre_archivo'], codigo.get('codigo'), codigo.get('curso'), codigo.get('fase'),
+             codigo.get('video'), estadisticas['tamaño_mb'], estadisticas['duracion_segundos'],
+             estadisticas['caracteres_transcripcion'], estadisticas['palabras_transcripcion'],
+             estadisticas['fecha_procesamiento'], trabajo_id)
+        )
+
+    def resumen(self):
+        fila = self.registro.consultar(
+            """SELECT COUNT(*) AS videos, COALESCE(SUM(duracion), 0) AS duracion, COALESCE(SUM(tamano_mb), 0) AS tamano_mb,
+                      COALESCE(SUM(palabras), 0) AS palabras, COALESCE(SUM(caracteres), 0) AS caracteres,
+                      SUM(palabras) * 60.0 / NULLIF(SUM(duracion), 0) AS velocidad,
+                      AVG(duracion) AS duracion_media, MAX(fecha) AS ultima
+               FROM estadisticas"""
+        )[0]
+        return dict(fila)
+
+    def por_curso(self):
+        filas = self.registro.consultar(
+            """SELECT COALESCE(curso, '-') AS curso, COALESCE(fase, '-') AS fase, COUNT(*) AS videos,
+                      SUM(duracion) AS duracion, SUM(palabras) AS palabras, SUM(tamano_mb) AS tamano_mb,
+                      SUM(palabras) * 60.0 / NULLIF(SUM(duracion), 0) AS velocidad
+               FROM estadisticas GROUP BY curso, fase"""
+        )
+        # F2 antes que F10: el orden lo da el código, no el texto
+        return sorted((dict(f) for f in filas), key=lambda f: clave_orden_video(f"{f['curso']}-{f['fase']}-v0"))
+
+    def tendencia(self, dias=90):
+        desde = (datetime.now() - timedelta(days=dias)).strftime('%Y-%m-%d')
+        return [dict(f) for f in self.registro.consultar(
+            """SELECT substr(fecha, 1, 10) AS dia, COUNT(*) AS videos, SUM(duracion) / 3600.0 AS horas,
+                      SUM(palabras) AS palabras
+               FROM estadisticas WHERE fecha >= ? GROUP BY dia ORDER BY dia""",
+            (desde,)
+        )]
+
+    def videos(self):
+        """Filas compactas (listas en el orden de COLUMNAS_VIDEOS), de la más antigua a la más reciente"""
+        return [list(f) for f in self.registro.consultar(
+            """SELECT COALESCE(codigo_video, 'Sin código'), nombre, duracion, tamano_mb, palabras, caracteres,
+                      ROUND(palabras * 60.0 / NULLIF(duracion, 0), 1), fecha
+               FROM estadisticas ORDER BY fecha, nombre"""
+        )]
+
+
+class PanelEstadisticas:
+    """Panel en procesados/estadisticas/ que solo reescribe las secciones que cambian"""
+
+    def __init__(self, carpeta, filas_por_pagina=500, dias_tendencia=90):
+        self.carpeta = pathlib.Path(carpeta)
+        self.carpeta.mkdir(parents=True, exist_ok=True)
+        self.filas_por_pagina = filas_por_pagina
+        self.dias_tendencia = dias_tendencia
+        self.ruta_manifiesto = self.carpeta / "manifiesto.json"
+        self.manifiesto = leer_json(self.ruta_manifiesto) or {'plantilla': None, 'secciones': {}}
+
+    def _seccion(self, nombre, datos):
+        """Escribe la sección como JS si su contenido ha cambiado; devuelve True si se reescribió"""
+        contenido = f"PANEL.cargado({json.dumps(nombre)}, {json.dumps(datos, ensure_ascii=False, separators=(',', ':'))});\n"
+        huella = hashlib.sha1(contenido.encode('utf-8')).hexdigest()[:12]
+        if self.manifiesto['secciones'].get(nombre) == huella and (self.carpeta / f"{nombre}.js").exists():
+            return False
+        with escritura_atomica(self.carpeta / f"{nombre}.js") as f:
+            f.write(contenido)
+        self.manifiesto['secciones'][nombre] = huella
+        return True
+
+    def renderizar(self, estadisticas):
+        """Regenera el panel y devuelve (index.html, secciones reescritas)"""
+        index = self.carpeta / "index.html"
+        if self.manifiesto.get('plantilla') != VERSION_PLANTILLA or not index.exists():
+            with escritura_atomica(index) as f:
+                f.write(PLANTILLA)
+            self.manifiesto['plantilla'] = VERSION_PLANTILLA
+
+        videos = estadisticas.videos()
+        paginas = [videos[i:i + self.filas_por_pagina] for i in range(0, len(videos), self.filas_por_pagina)]
+        reescritas = []
+
+        resumen = estadisticas.resumen()
+        resumen.update({'paginas': len(paginas), 'columnas': COLUMNAS_VIDEOS,
+                        'generado': datetime.now().strftime('%Y-%m-%d %H:%M')})
+        secciones = [('resumen', resumen), ('cursos', estadisticas.por_curso()),
+                     ('tendencia', estadisticas.tendencia(self.dias_tendencia))]
+        # Las filas se añaden por fecha: en una ejecución normal solo cambia la última página
+        secciones += [(f"videos_{n:04d}", pagina) for n, pagina in enumerate(paginas, 1)]
+        for nombre, datos in secciones:
+            if self._seccion(nombre, datos):
+                reescritas.append(nombre)
+
+        # Páginas que sobran si se han borrado filas
+        for nombre in [n for n in self.manifiesto['secciones'] if n.startswith('videos_')]:
+            if int(nombre.split('_')[1]) > len(paginas):
+                (self.carpeta / f"{nombre}.js").unlink(missing_ok=True)
+                del self.manifiesto['secciones'][nombre]
+
+        # El manifiesto también se publica como JS: la plantilla lo usa para no servir secciones cacheadas
+        with escritura_atomica(self.carpeta / "manifiesto.js") as f:
+            f.write(f"PANEL.versiones = {json.dumps(self.manifiesto['secciones'])};\n")
+        escribir_json_atomico(self.ruta_manifiesto, self.manifiesto)
+        return index, reescritas
+
+
+def actualizar_panel(registro, carpeta_procesados):
+    """Regenera procesados/estadisticas/ con todo el histórico del registro"""
+    config = cargar_config_panel()
+    panel = PanelEstadisticas(carpeta_procesados / "estadisticas", **config)
+    return panel.renderizar(EstadisticasAcumuladas(registro))
+
+
+PLANTILLA = """<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Estadísticas de Procesamiento - Klinikare Transcriptor</title>
+    <style>
+        body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 0; padding: 20px; background-color: #f5f7fa; color: #333; }
+        .container { max-width: 1400px; margin: 0 auto; background: white; border-radius: 12px; box-shadow: 0 4px 20px rgba(0,0,0,0.1); overflow: hidden; }
+        .header { background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%); color: white; padding: 30px; text-align: center; }
+        .header h1 { margin: 0; font-size: 2.2rem; font-weight: 700; }
+        .header p { margin: 10px 0 0 0; opacity: 0.9; font-size: 1.1rem; }
+        .stats-summary { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; padding: 30px; background-color: #f8fafc; border-bottom: 2px solid #e2e8f0; }
+        .stat-card { background: white; padding: 20px; border-radius: 10px; text-align: center; box-shadow: 0 2px 8px rgba(0,0,0,0.08); border: 1px solid #e2e8f0; }
+        .stat-card h3 { margin: 0 0 10px 0; color: #1e40af; font-size: 0.9rem; text-transform: uppercase; font-weight: 600; letter-spacing: 0.5px; }
+        .stat-card .number { font-size: 2rem; font-weight: 700; color: #1f2937; margin: 0; }
+        .stat-card .unit { color: #6b7280; font-size: 0.9rem; margin-top: 5px; }
+        .table-container { padding: 30px; overflow-x: auto; }
+        .table-title { font-size: 1.5rem; font-weight: 600; color: #1f2937; margin-bottom: 20px; display: flex; align-items: center; gap: 10px; }
+        table { width: 100%; border-collapse: collapse; background: white; border-radius: 8px; overflow: hidden; box-shadow: 0 2px 8px rgba(0,0,0,0.06); }
+        th { background: linear-gradient(135deg, #1e40af 0%, #1d4ed8 100%); color: white; padding: 15px 12px; text-align: left; font-weight: 600; font-size: 0.9rem; text-transform: uppercase; letter-spacing: 0.5px; }
+        td { padding: 12px; border-bottom: 1px solid #e5e7eb; vertical-align: top; }
+        tr:nth-child(even) { background-color: #f8fafc; }
+        tr:hover { background-color: #f1f5f9; }
+        .codigo { font-family: 'Courier New', monospace; background: #f3f4f6; padding: 4px 8px; border-radius: 4px; font-weight: 600; color: #1f2937; }
+        .numero { text-align: right; font-weight: 600; }
+        .fecha { font-size: 0.85rem; color: #6b7280; }
+        .duracion { font-family: 'Courier New', monospace; font-weight: 600; }
+        .tamaño-grande { color: #dc2626; }
+        .tamaño-medio { color: #f59e0b; }
+        .tamaño-pequeño { color: #16a34a; }
+        .barra { background: #2563eb; height: 10px; border-radius: 5px; }
+        .paginacion { display: flex; gap: 10px; align-items: center; margin-top: 15px; }
+        .paginacion button { padding: 6px 14px; border: 1px solid #cbd5e1; border-radius: 6px; background: white; cursor: pointer; }
+        .paginacion input { padding: 6px; border: 1px solid #cbd5e1; border-radius: 6px; min-width: 240px; }
+        .footer { text-align: center; padding: 20px; background-color: #f8fafc; color: #6b7280; font-size: 0.9rem; border-top: 1px solid #e2e8f0; }
+        @media (max-width: 768px) {
+            .stats-summary { grid-template-columns: 1fr 1fr; }
+            .table-container { padding: 15px; }
+            th, td { padding: 8px 6px; font-size: 0.85rem; }
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>📊 Estadísticas de Procesamiento</h1>
+            <p>Klinikare Video Whisper-Transcriptor | <span id="generado"></span></p>
+        </div>
+        <div class="stats-summary" id="resumen"></div>
+        <div class="table-container">
+            <h2 class="table-title">📚 Por curso y fase</h2>
+            <table><thead><tr><th>Curso</th><th>Fase</th><th>Vídeos</th><th>Duración</th><th>Palabras</th><th>Tamaño (MB)</th><th>Vel. (pal/min)</th></tr></thead>
+            <tbody id="cursos"></tbody></table>
+        </div>
+        <div class="table-container">
+            <h2 class="table-title">📈 Tendencia diaria</h2>
+            <table><thead><tr><th>Día</th><th>Vídeos</th><th>Horas de audio</th><th style="width:50%"></th></tr></thead>
+            <tbody id="tendencia"></tbody></table>
+        </div>
+        <div class="table-container">
+            <h2 class="table-title">📋 Detalles por Vídeo</h2>
+            <table>
+                <thead><tr><th>Código</th><th>Archivo</th><th>Duración</th><th>Tamaño (MB)</th><th>Palabras</th><th>Caracteres</th><th>Vel. (pal/min)</th><th>Procesado</th></tr></thead>
+                <tbody id="videos"></tbody>
+            </table>
+            <div class="paginacion">
+                <button id="anterior">◀</button><span id="pagina"></span><button id="siguiente">▶</button>
+                <input id="filtro" placeholder="Filtrar esta página por código o archivo">
+            </div>
+        </div>
+        <div class="footer"><p>Generado automáticamente por Klinikare Video Whisper-Transcriptor</p></div>
+    </div>
+    <script>
+        // Cada sección es un .js que llama a PANEL.cargado(); se piden con su versión para no leer copias cacheadas
+        var PANEL = {versiones: {}, datos: {}, paginas: {}, actual: 0};
+        function duracion(s) {
+            s = Math.round(s || 0);
+            var h = Math.floor(s / 3600), m = Math.floor(s % 3600 / 60), r = s % 60;
+            return [h, m, r].map(function (n) { return String(n).padStart(2, '0'); }).join(':');
+        }
+        function numero(n, d) { return n == null ? '-' : Number(n).toLocaleString('es-ES', {maximumFractionDigits: d || 0}); }
+        function texto(t) { var e = document.createElement('span'); e.textContent = t == null ? '' : t; return e.innerHTML; }
+        function cargar(nombre) {
+            var script = document.createElement('script');
+            script.src = nombre + '.js?v=' + (PANEL.versiones[nombre] || Date.now());
+            document.body.appendChild(script);
+        }
+        PANEL.cargado = function (nombre, datos) {
+            if (nombre.indexOf('videos_') === 0) { PANEL.paginas[parseInt(nombre.slice(7), 10)] = datos; mostrarPagina(); return; }
+            PANEL.datos[nombre] = datos;
+            if (nombre === 'resumen') mostrarResumen(datos);
+            if (nombre === 'cursos') mostrarCursos(datos);
+            if (nombre === 'tendencia') mostrarTendencia(datos);
+        };
+        function mostrarResumen(r) {
+            document.getElementById('generado').textContent = r.generado;
+            var tarjetas = [['Total Vídeos', numero(r.videos), 'archivos procesados'], ['Duración Total', duracion(r.duracion), 'horas:minutos:segundos'],
+                            ['Tamaño Total', numero(r.tamano_mb, 1), 'MB'], ['Palabras Totales', numero(r.palabras), 'palabras transcritas'],
+                            ['Caracteres Totales', numero(r.caracteres), 'caracteres'], ['Velocidad Promedio', numero(r.velocidad, 1), 'palabras/minuto']];
+            document.getElementById('resumen').innerHTML = tarjetas.map(function (t) {
+                return '<div class="stat-card"><h3>' + t[0] + '</h3><div class="number">' + t[1] + '</div><div class="unit">' + t[2] + '</div></div>';
+            }).join('');
+            PANEL.actual = PANEL.actual || r.paginas;
+            mostrarPagina();
+        }
+        function mostrarCursos(filas) {
+            document.getElementById('cursos').innerHTML = filas.map(function (f) {
+                return '<tr><td><span class="codigo">' + texto(f.curso) + '</span></td><td>' + texto(f.fase) + '</td><td class="numero">' + numero(f.videos) +
+                       '</td><td class="duracion numero">' + duracion(f.duracion) + '</td><td class="numero">' + numero(f.palabras) +
+                       '</td><td class="numero">' + numero(f.tamano_mb, 1) + '</td><td class="numero">' + numero(f.velocidad, 1) + '</td></tr>';
+            }).join('');
+        }
+        function mostrarTendencia(filas) {
+            var maximo = Math.max.apply(null, filas.map(function (f) { return f.horas; }).concat([0.0001]));
+            document.getElementById('tendencia').innerHTML = filas.map(function (f) {
+                return '<tr><td class="fecha">' + f.dia + '</td><td class="numero">' + numero(f.videos) + '</td><td class="numero">' + numero(f.horas, 2) +
+                       '</td><td><div class="barra" style="width:' + (100 * f.horas / maximo) + '%"></div></td></tr>';
+            }).join('');
+        }
+        function mostrarPagina() {
+            var r = PANEL.datos.resumen;
+            if (!r || !r.paginas) { document.getElementById('pagina').textContent = 'Sin vídeos'; return; }
+            document.getElementById('pagina').textContent = 'Página ' + PANEL.actual + ' de ' + r.paginas;
+            var filas = PANEL.paginas[PANEL.actual];
+            if (!filas) { cargar('videos_' + String(PANEL.actual).padStart(4, '0')); return; }
+            var filtro = document.getElementById('filtro').value.toLowerCase();
+            document.getElementById('videos').innerHTML = filas.filter(function (f) {
+                return !filtro || (f[0] + ' ' + f[1]).toLowerCase().indexOf(filtro) >= 0;
+            }).map(function (f) {
+                var clase = f[3] > 100 ? 'tamaño-grande' : (f[3] > 50 ? 'tamaño-medio' : 'tamaño-pequeño');
+                return '<tr><td><span class="codigo">' + texto(f[0]) + '</span></td><td>' + texto(f[1]) + '</td><td class="duracion numero">' + duracion(f[2]) +
+                       '</td><td class="numero ' + clase + '">' + numero(f[3], 2) + '</td><td class="numero">' + numero(f[4]) + '</td><td class="numero">' +
+                       numero(f[5]) + '</td><td class="numero">' + numero(f[6], 1) + '</td><td class="fecha">' + texto(f[7]) + '</td></tr>';
+            }).join('');
+        }
+        document.getElementById('anterior').onclick = function () { if (PANEL.actual > 1) { PANEL.actual--; mostrarPagina(); } };
+        document.getElementById('siguiente').onclick = function () { if (PANEL.actual < PANEL.datos.resumen.paginas) { PANEL.actual++; mostrarPagina(); } };
+        document.getElementById('filtro').oninput = mostrarPagina;
+        var manifiesto = document.createElement('script');
+        manifiesto.src = 'manifiesto.js?t=' + Date.now();
+        manifiesto.onload = function () { ['resumen', 'cursos', 'tendencia'].forEach(cargar); };
+        document.body.appendChild(manifiesto);
+    </script>
+</body>
+</html>
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenera el panel de estadísticas acumuladas")
+    parser.add_argument('--db', help="Ruta de la base de datos (por defecto REGISTRO_DB o registro_transcripciones.db)")
+    parser.add_argument('--procesados', default=str(pathlib.Path(__file__).parent / "procesados"))
+    args = parser.parse_args()
+
+    registro = RegistroEjecuciones(args.db)
+    index, reescritas = actualizar_panel(registro, pathlib.Path(args.procesados))
+    print(f"📊 Panel: {index} ({len(reescritas)} secciones actualizadas)")
+    registro.cerrar()
+
+
+if __name__ == "__main__":
+    main()
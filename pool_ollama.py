@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Pool de clientes Ollama para uno o varios servidores
+OLLAMA_HOST admite una lista separada por comas (http://gpu1:11434,http://gpu2:11434). Por
+cada servidor se mantiene un ollama.Client (con su conexión HTTP keep-alive) y cada llamada
+va al servidor sano con menos peticiones en curso que tenga el modelo. La salud se comprueba
+con /api/tags como mucho cada OLLAMA_HEALTH_INTERVAL_SECONDS; un servidor que falla al
+conectar se marca caído y la llamada se reintenta en otro
+
+Uso:
+    python pool_ollama.py                       # estado de cada servidor y sus modelos
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+import ollama
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ERRORES_CONEXION = (ConnectionError, httpx.TransportError)
+
+
+def cargar_config_ollama():
+    hosts = [h.strip() for h in os.getenv('OLLAMA_HOST', 'http://localhost:11434').split(',') if h.strip()]
+    return {
+        'hosts': hosts or ['http://localhost:11434'],
+        'timeout': float(os.getenv('OLLAMA_TIMEOUT_SECONDS', '1800')),
+        'intervalo_salud': float(os.getenv('OLLAMA_HEALTH_INTERVAL_SECONDS', '30'))
+    }
+
+
+class ServidorOllama:
+    """Un servidor del pool: su cliente, peticiones en curso y último estado conocido"""
+
+    def __init__(self, host, timeout):
+        self.host = host
+        self.cliente = ollama.Client(host=host, timeout=timeout)
+        self.en_curso = 0
+        self.sano = True
+        self.modelos = None
+        self.comprobado = 0.0
+
+    def comprobar(self):
+        try:
+            self.modelos = {modelo.model for modelo in self.cliente.list().models}
+            self.sano = True
+        except Exception:
+            self.sano = False
+        self.comprobado = time.monotonic()
+        return self.sano
+
+    def tiene_modelo(self, modelo):
+        # Sin etiqueta, cualquier versión del modelo vale (gpt-oss → gpt-oss:20b)
+        return self.modelos is not None and any(m == modelo or m.startswith(f"{modelo}:") for m in self.modelos)
+
+
+class PoolOllama:
+    """Reparte las llamadas entre servidores Ollama por menor número de peticiones en curso"""
+
+    def __init__(self, hosts, timeout=1800, intervalo_salud=30):
+        self.servidores = [ServidorOllama(host, timeout) for host in hosts]
+        self.intervalo_salud = intervalo_salud
+        self._lock = threading.Lock()
+
+    def describir(self):
+        return ", ".join(servidor.host for servidor in self.servidores)
+
+    def _actualizar_salud(self, forzar=False):
+        ahora = time.monotonic()
+        with self._lock:
+            # Cada comprobación vencida la hace un solo hilo; los demás siguen con el último estado
+            vencidos = [s for s in self.servidores if forzar or ahora - s.comprobado >= self.intervalo_salud]
+            for servidor in vencidos:
+                servidor.comprobado = ahora
+        # Las llamadas a /api/tags, fuera del lock: no bloquean el reparto de las demás peticiones
+        for servidor in vencidos:
+            servidor.comprobar()
+
+    def sanos(self, forzar=False):
+        self._actualizar_salud(forzar)
+        return [s for s in self.servidores if s.sano]
+
+    def tiene_modelo(self, modelo):
+        return any(s.tiene_modelo(modelo) for s in self.sanos())
+
+    def modelos(self):
+        """Modelos disponibles en algún servidor sano"""
+        return sorted(set().union(*(s.modelos or set() for s in self.sanos())))
+
+    def _elegir(self, modelo, excluidos):
+        """Servidor para la petición según el último estado conocido (se llama con el lock tomado)"""
+        candidatos = [s for s in self.servidores if s.sano and s not in excluidos]
+        if modelo:
+            # Mejor un servidor que ya tiene el modelo; si ninguno lo tiene, cualquiera sano
+            candidatos = [s for s in candidatos if s.tiene_modelo(modelo)] or candidatos
+        if not candidatos:
+            raise RuntimeError(f"Ningún servidor Ollama disponible ({self.describir()})")
+        servidor = min(candidatos, key=lambda s: s.en_curso)
+        servidor.en_curso += 1
+        return servidor
+
+    @contextmanager
+    def cliente(self, modelo=None, excluidos=()):
+        """Cliente del servidor elegido; la petición cuenta como en curso hasta salir del bloque"""
+        self._actualizar_salud()
+        with self._lock:
+            servidor = self._elegir(modelo, excluidos)
+        try:
+            yield servidor
+        except ERRORES_CONEXION:
+            servidor.sano = False
+            raise
+        finally:
+            with self._lock:
+                servidor.en_curso -= 1
+
+    def _llamar(self, metodo, modelo, **kwargs):
+        """Llama a metodo en el mejor servidor; si no se puede conectar, lo reintenta en los demás"""
+        fallidos = []
+        while True:
+            try:
+                with self.cliente(modelo, excluidos=fallidos) as servidor:
+                    return getattr(servidor.cliente, metodo)(model=modelo, **kwargs)
+            except ERRORES_CONEXION as e:
+                fallidos.append(servidor)
+                print(f"⚠️ Ollama {servidor.host} no responde ({e}); se reintenta en otro servidor")
+                if len(fallidos) >= len(self.servidores):
+                    raise
+
+    def chat(self, model, **kwargs):
+        return self._llamar('chat', model, **kwargs)
+
+    def embed(self, model, **kwargs):
+        return self._llamar('embed', model, **kwargs)
+
+    def pull(self, model):
+        """Descarga el modelo en los servidores sanos que no lo tienen"""
+        for servidor in self.sanos():
+            if not servidor.tiene_modelo(model):
+                print(f"📥 Descargando modelo {model} en {servidor.host}...")
+                servidor.cliente.pull(model)
+                servidor.comprobar()
+
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def obtener_pool():
+    """Pool compartido por todo el proceso (se crea al primer uso con la configuración del .env)"""
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            _pool = PoolOllama(**cargar_config_ollama())
+        return _pool
+
+
+def main():
+    pool = obtener_pool()
+    for servidor in pool.servidores:
+        if servidor.comprobar():
+            print(f"✅ {servidor.host}: {len(servidor.modelos)} modelos ({', '.join(sorted(servidor.modelos))})")
+        else:
+            print(f"❌ {servidor.host}: no responde")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Puntos de control dentro de un vídeo largo
+Mientras se consumen los segmentos de faster-whisper se guardan periódicamente
+en procesados/<vídeo>/<vídeo>.checkpoint.json junto con el desplazamiento de audio
+alcanzado. Si el proceso cae, la siguiente ejecución decodifica el audio, lo recorta
+desde ese desplazamiento y une los segmentos nuevos a los ya guardados
+"""
+import os
+import time
+
+from estado_trabajos import escribir_json_atomico, leer_json
+
+# Caracteres del final del texto ya transcrito que se pasan como contexto al reanudar
+CONTEXTO_REANUDACION = 200
+
+
+def cargar_config_puntos_control():
+    """Intervalo (segundos de reloj) entre puntos de control; 0 los desactiva"""
+    return {
+        'intervalo': float(os.getenv('CHECKPOINT_INTERVAL_SECONDS', '60'))
+    }
+
+
+class PuntoControl:
+    """Punto de control de la transcripción de un vídeo"""
+
+    def __init__(self, carpeta_procesados, fichero, intervalo):
+        self.fichero = fichero
+        self.intervalo = intervalo
+        self.ruta = carpeta_procesados / fichero.stem / f"{fichero.stem}.checkpoint.json"
+        self.ultimo_guardado = time.time()
+
+    def identidad(self):
+        stat = self.fichero.stat()
+        return {'tamaño_bytes': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def cargar(self):
+        """Devuelve el punto de control guardado, o None si no hay o es de otra versión del archivo"""
+        if self.intervalo <= 0:
+            return None
+        datos = leer_json(self.ruta)
+        if not datos:
+            return None
+        if {k: datos.get(k) for k in ('tamaño_bytes', 'mtime_ns')} != self.identidad():
+            self.eliminar()
+            return None
+        return datos
+
+    def guardar(self, segmentos, desplazamiento, idioma, confianza, tiempo_proc, forzar=False):
+        """Guarda los segmentos y el desplazamiento si ha pasado el intervalo (o si se fuerza)"""
+        if self.intervalo <= 0 or not segmentos:
+            return False
+        if not forzar and time.time() - self.ultimo_guardado < self.intervalo:
+            return False
+
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        escribir_json_atomico(self.ruta, {
+            **self.identidad(),
+            'desplazamiento': desplazamiento,
+            'idioma': idioma,
+            'confianza': confianza,
+            'tiempo_proc': tiempo_proc,
+            'segmentos': segmentos
+        })
+        self.ultimo_guardado = time.time()
+        return True
+
+    def eliminar(self):
+        try:
+            self.ruta.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def contexto_previo(segmentos):
+    """Final del texto ya transcrito, para que el modelo continúe con el mismo estilo"""
+    if not segmentos:
+        return None
+    texto = " ".join(segmento['texto'] for segmento in segmentos)
+    return texto[-CONTEXTO_REANUDACION:]
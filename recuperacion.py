@@ -0,0 +1,145 @@
+"""
+Recuperación de fragmentos relevantes para los prompts de documentación
+El texto de cada vídeo del consolidado se trocea y se convierte en embeddings con Ollama
+(OLLAMA_EMBED_MODEL). Los vectores, normalizados, se guardan como matriz NumPy junto al
+consolidado (transcripciones_<fecha>.txt.embeddings.npz) y solo se calculan los de los
+vídeos nuevos. Al documentar, de cada vídeo se envían los DOC_RAG_TOP_K trozos más
+parecidos (similitud coseno) a lo que piden los bloques del prompt, en su orden original:
+el tamaño del prompt deja de depender de la duración de los vídeos
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from consolidado import cargar_indice, leer_bloques
+from pool_ollama import obtener_pool
+
+# Lo que el prompt maestro pide de cada vídeo: análisis, resúmenes, fases y cuestionario
+CONSULTAS_DOCUMENTACION = [
+    "objetivo del vídeo y qué aprenderá el usuario",
+    "conceptos clave e ideas principales explicadas",
+    "pasos de un procedimiento o cómo se hace en la plataforma",
+    "errores típicos, malos usos y advertencias",
+    "ejemplo práctico o caso real",
+    "definición importante que podría preguntarse en un examen"
+]
+
+SEPARADOR_TROZOS = "\n[...]\n"
+
+
+def cargar_config_recuperacion():
+    return {
+        'activo': os.getenv('DOC_RAG_ENABLED', 'false').lower() == 'true',
+        'modelo': os.getenv('OLLAMA_EMBED_MODEL', 'nomic-embed-text'),
+        'palabras_trozo': int(os.getenv('DOC_RAG_CHUNK_WORDS', '150')),
+        'top_k': int(os.getenv('DOC_RAG_TOP_K', '8'))
+    }
+
+
+def separar_bloque(bloque):
+    """Cabecera (nombre, métricas y línea de guiones) y texto de un bloque del consolidado"""
+    cabecera, _, cuerpo = bloque.partition("-" * 80 + "\n")
+    return cabecera + "-" * 80 + "\n", cuerpo.rstrip().rstrip("=").rstrip()
+
+
+def trocear(texto, palabras_trozo):
+    """Agrupa las líneas (segmentos) del texto en trozos de unas `palabras_trozo` palabras"""
+    trozos = []
+    actual = []
+    cuenta = 0
+    for linea in texto.splitlines():
+        if not linea.strip():
+            continue
+        actual.append(linea.strip())
+        cuenta += len(linea.split())
+        if cuenta >= palabras_trozo:
+            trozos.append(" ".join(actual))
+            actual, cuenta = [], 0
+    if actual:
+        trozos.append(" ".join(actual))
+    return trozos
+
+
+def embeber(textos, modelo, lote=32):
+    """Matriz de embeddings normalizados (una fila por texto); los lotes se reparten entre los servidores del pool"""
+    pool = obtener_pool()
+    lotes = [textos[i:i + lote] for i in range(0, len(textos), lote)]
+    with ThreadPoolExecutor(max_workers=max(1, min(len(pool.servidores), len(lotes)))) as ejecutor:
+        respuestas = list(ejecutor.map(lambda trozo: pool.embed(model=modelo, input=trozo), lotes))
+    vectores = [vector for respuesta in respuestas for vector in respuesta['embeddings']]
+    matriz = np.asarray(vectores, dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    return matriz / np.maximum(normas, 1e-12)
+
+
+class IndiceEmbeddings:
+    """Embeddings de los trozos de un consolidado, guardados junto a él"""
+
+    def __init__(self, archivo, config):
+        self.archivo = archivo
+        self.ruta = archivo.with_name(f"{archivo.name}.embeddings.npz")
+        self.config = config
+        self.matriz = None
+        self.videos = np.empty(0, dtype=str)
+        self.trozos = np.empty(0, dtype=str)
+        if self.ruta.exists():
+            with np.load(self.ruta) as datos:
+                # Con otro modelo o tamaño de trozo los vectores no son comparables: se rehace
+                if (str(datos['modelo']) == config['modelo']
+                        and int(datos['palabras_trozo']) == config['palabras_trozo']):
+                    self.matriz = datos['matriz']
+                    self.videos = datos['videos']
+                    self.trozos = datos['trozos']
+
+    def actualizar(self):
+        """Calcula los embeddings de los vídeos del consolidado que aún no los tienen"""
+        con_embeddings = set(self.videos)
+        entradas = [e for e in cargar_indice(self.archivo)['videos'] if e['nombre'] not in con_embeddings]
+        if not entradas:
+            return 0
+        videos, trozos = [], []
+        for entrada, bloque in zip(entradas, leer_bloques(self.archivo, entradas)):
+            for trozo in trocear(separar_bloque(bloque)[1], self.config['palabras_trozo']):
+                videos.append(entrada['nombre'])
+                trozos.append(trozo)
+        if not trozos:
+            return 0
+
+        print(f"🧭 Calculando embeddings de {len(trozos)} trozos ({len(entradas)} vídeos) con {self.config['modelo']}...")
+        matriz = embeber(trozos, self.config['modelo'])
+        self.matriz = matriz if self.matriz is None else np.vstack([self.matriz, matriz])
+        self.videos = np.concatenate([self.videos, np.array(videos)])
+        self.trozos = np.concatenate([self.trozos, np.array(trozos)])
+
+        temporal = self.ruta.with_name(f".{self.ruta.name}.tmp.npz")
+        np.savez(temporal, matriz=self.matriz, videos=self.videos, trozos=self.trozos,
+                 modelo=self.config['modelo'], palabras_trozo=self.config['palabras_trozo'])
+        os.replace(temporal, self.ruta)
+        return len(trozos)
+
+    def mejores(self, consultas, video, k):
+        """Posiciones (en orden original) de los k trozos del vídeo más parecidos a alguna consulta"""
+        posiciones = np.flatnonzero(self.videos == video)
+        if len(posiciones) <= k:
+            return posiciones
+        similitud = (self.matriz[posiciones] @ consultas.T).max(axis=1)
+        return np.sort(posiciones[np.argsort(-similitud)[:k]])
+
+
+def transcripciones_recuperadas(archivo, config):
+    """Texto para el prompt: cada bloque del consolidado con solo sus trozos más relevantes"""
+    indice = IndiceEmbeddings(archivo, config)
+    indice.actualizar()
+    consultas = embeber(CONSULTAS_DOCUMENTACION, config['modelo'])
+
+    entradas = cargar_indice(archivo)['videos']
+    partes = [
+        f"(Fragmentos más relevantes de cada vídeo, en su orden original; '{SEPARADOR_TROZOS.strip()}' "
+        f"marca texto omitido)\n\n"
+    ]
+    for entrada, bloque in zip(entradas, leer_bloques(archivo, entradas)):
+        cabecera, _ = separar_bloque(bloque)
+        seleccion = indice.mejores(consultas, entrada['nombre'], config['top_k'])
+        partes.append(cabecera + SEPARADOR_TROZOS.join(indice.trozos[seleccion]) + "\n" + "=" * 80 + "\n\n")
+    return "".join(partes)
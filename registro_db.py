@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Registro de ejecuciones en SQLite (modo WAL)
+Sustituye al log de texto registro_transcripciones.txt: guarda trabajos, archivos
+transcritos y duración de cada etapa, y ofrece consultas agregadas desde la línea de comandos
+
+Uso:
+    python registro_db.py rtf                 # p50/p95 de RTF por modelo y dispositivo
+    python registro_db.py diario --dias 30    # throughput por día
+    python registro_db.py cursos              # totales por curso y fase
+    python registro_db.py etapas              # tiempo por etapa del pipeline
+    python registro_db.py importar registro_transcripciones.txt
+"""
+import argparse
+import os
+import pathlib
+import re
+import socket
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from codigos_video import descomponer_codigo_video
+
+RUTA_POR_DEFECTO = pathlib.Path(__file__).parent / "registro_transcripciones.db"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id INTEGER PRIMARY KEY,
+    inicio TEXT NOT NULL,
+    fin TEXT,
+    host TEXT,
+    dispositivo TEXT,
+    modelo TEXT,
+    compute_type TEXT,
+    videos INTEGER,
+    duracion_total REAL,
+    tiempo_total REAL,
+    origen TEXT NOT NULL DEFAULT 'pipeline'
+);
+
+CREATE TABLE IF NOT EXISTS archivos (
+    id INTEGER PRIMARY KEY,
+    trabajo_id INTEGER REFERENCES trabajos(id),
+    fecha TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    codigo_video TEXT,
+    curso TEXT,
+    fase TEXT,
+    video INTEGER,
+    tamano_mb REAL,
+    duracion REAL,
+    tiempo_proc REAL,
+    rtf REAL,
+    segmentos INTEGER,
+    palabras INTEGER,
+    idioma TEXT,
+    confianza REAL,
+    dispositivo TEXT,
+    modelo TEXT
+);
+
+CREATE TABLE IF NOT EXISTS etapas (
+    id INTEGER PRIMARY KEY,
+    trabajo_id INTEGER REFERENCES trabajos(id),
+    fecha TEXT NOT NULL,
+    etapa TEXT NOT NULL,
+    archivo TEXT,
+    segundos REAL NOT NULL,
+    ok INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE INDEX IF NOT EXISTS idx_trabajos_inicio ON trabajos(inicio);
+CREATE INDEX IF NOT EXISTS idx_archivos_fecha ON archivos(fecha);
+CREATE INDEX IF NOT EXISTS idx_archivos_curso ON archivos(curso, fase, video);
+CREATE INDEX IF NOT EXISTS idx_archivos_codigo ON archivos(codigo_video);
+CREATE INDEX IF NOT EXISTS idx_archivos_modelo ON archivos(modelo, dispositivo);
+CREATE INDEX IF NOT EXISTS idx_etapas_trabajo ON etapas(trabajo_id, etapa);
+"""
+
+
+def ahora():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def percentil(valores, p):
+    """Percentil con interpolación lineal sobre una lista de valores"""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+class RegistroEjecuciones:
+    """Acceso al registro SQLite; seguro para usar desde varios hilos del pipeline"""
+
+    def __init__(self, ruta=None):
+        self.ruta = pathlib.Path(ruta or os.getenv('REGISTRO_DB') or RUTA_POR_DEFECTO)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.ruta), timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(ESQUEMA)
+
+    def cerrar(self):
+        with self.lock:
+            self.conn.close()
+
+    def ejecutar(self, sql, parametros=()):
+        with self.lock, self.conn:
+            return self.conn.execute(sql, parametros)
+
+    def consultar(self, sql, parametros=()):
+        with self.lock:
+            return self.conn.execute(sql, parametros).fetchall()
+
+    def iniciar_trabajo(self, dispositivo, modelo, compute_type=None, origen='pipeline', inicio=None):
+        """Crea un trabajo (una ejecución del pipeline) y devuelve su id"""
+        cursor = self.ejecutar(
+            "INSERT INTO trabajos (inicio, host, dispositivo, modelo, compute_type, origen) VALUES (?, ?, ?, ?, ?, ?)",
+            (inicio or ahora(), socket.gethostname(), dispositivo, modelo, compute_type, origen)
+        )
+        return cursor.lastrowid
+
+    def cerrar_trabajo(self, trabajo_id, videos, duracion_total, tiempo_total, fin=None):
+        self.ejecutar(
+            "UPDATE trabajos SET fin = ?, videos = ?, duracion_total = ?, tiempo_total = ? WHERE id = ?",
+            (fin or ahora(), videos, duracion_total, tiempo_total, trabajo_id)
+        )
+
+    def registrar_archivo(self, trabajo_id, nombre, duracion, tiempo_proc, segmentos, palabras,
+                          tamaño_mb, idioma, confianza, dispositivo, modelo, fecha=None):
+        """Registra un vídeo transcrito; el RTF es tiempo de proceso / duración del audio"""
+        codigo = descomponer_codigo_video(nombre) or {}
+        rtf = tiempo_proc / duracion if duracion else None
+        self.ejecutar(
+            """INSERT INTO archivos (trabajo_id, fecha, nombre, codigo_video, curso, fase, video, tamano_mb,
+                                     duracion, tiempo_proc, rtf, segmentos, palabras, idioma, confianza,
+                                     dispositivo, modelo)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (trabajo_id, fecha or ahora(), nombre, codigo.get('codigo'), codigo.get('curso'), codigo.get('fase'),
+             codigo.get('video'), tamaño_mb, duracion, tiempo_proc, rtf, segmentos, palabras, idioma, confianza,
+             dispositivo, modelo)
+        )
+
+    def registrar_etapa(self, trabajo_id, evento):
+        """Guarda un evento de metricas.etapa() asociado al trabajo"""
+        self.ejecutar(
+            "INSERT INTO etapas (trabajo_id, fecha, etapa, archivo, segundos, ok) VALUES (?, ?, ?, ?, ?, ?)",
+            (trabajo_id, evento['ts'].replace('T', ' '), evento['etapa'], evento.get('video'), evento['segundos'], int(evento['ok']))
+        )
+
+    # ------------------------------------------------------------------
+    # Consultas agregadas
+    # ------------------------------------------------------------------
+
+    def rtf_por_modelo(self, desde=None):
+        """p50/p95 del RTF agrupado por modelo y dispositivo"""
+        filas = self.consultar(
+            "SELECT COALESCE(modelo, 'desconocido') AS modelo, COALESCE(dispositivo, '?') AS dispositivo, rtf "
+            "FROM archivos WHERE rtf IS NOT NULL AND fecha >= ?",
+            (desde or '0000',)
+        )
+        grupos = {}
+        for fila in filas:
+            grupos.setdefault((fila['modelo'], fila['dispositivo']), []).append(fila['rtf'])
+
+        return [
+            {'modelo': modelo, 'dispositivo': dispositivo, 'videos': len(valores),
+             'p50': percentil(valores, 50), 'p95': percentil(valores, 95)}
+            for (modelo, dispositivo), valores in sorted(grupos.items())
+        ]
+
+    def throughput_diario(self, dias=30):
+        """Vídeos, horas de audio y factor de velocidad por día"""
+        desde = (datetime.now() - timedelta(days=dias)).strftime('%Y-%m-%d')
+        return self.consultar(
+            """SELECT substr(fecha, 1, 10) AS dia, COUNT(*) AS videos,
+                      SUM(duracion) / 3600.0 AS horas_audio, SUM(tiempo_proc) / 3600.0 AS horas_proceso,
+                      SUM(duracion) / NULLIF(SUM(tiempo_proc), 0) AS velocidad, SUM(palabras) AS palabras
+               FROM archivos WHERE fecha >= ? GROUP BY dia ORDER BY dia""",
+            (desde,)
+        )
+
+    def totales_por_curso(self):
+        return self.consultar(
+            """SELECT COALESCE(curso, '-') AS curso, COALESCE(fase, '-') AS fase, COUNT(*) AS videos,
+                      SUM(duracion) / 3600.0 AS horas_audio, SUM(palabras) AS palabras, AVG(rtf) AS rtf_medio
+               FROM archivos GROUP BY curso, fase ORDER BY curso, fase"""
+        )
+
+    def tiempo_por_etapa(self):
+        filas = self.consultar("SELECT etapa, segundos, ok FROM etapas")
+        grupos = {}
+        for fila in filas:
+            grupos.setdefault(fila['etapa'], []).append(fila)
+        return [
+            {'etapa': etapa, 'veces': len(eventos), 'total': sum(e['segundos'] for e in eventos),
+             'p95': percentil([e['segundos'] for e in eventos], 95), 'errores': sum(1 for e in eventos if not e['ok'])}
+            for etapa, eventos in sorted(grupos.items(), key=lambda item: -sum(e['segundos'] for e in item[1]))
+        ]
+
+    # ------------------------------------------------------------------
+    # Importación del log de texto antiguo
+    # ------------------------------------------------------------------
+
+    def importar_log_texto(self, log_file):
+        """Importa registro_transcripciones.txt; cada RESUMEN DE SESIÓN cierra un trabajo"""
+        patron_campo = re.compile(r'^\S+\s+(FECHA|ARCHIVO|TAMAÑO|DURACIÓN|IDIOMA|TIEMPO PROC|SEGMENTOS|PALABRAS|DISPOSITIVO):\s*(.*)$')
+        patron_resumen = re.compile(r'RESUMEN DE SESIÓN - (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')
+
+        entradas = []
+        actual = {}
+        importados = 0
+        omitidos = 0
+
+        def a_segundos(texto):
+            partes = [int(p) for p in re.findall(r'\d+', texto)]
+            dias = 0
+            if 'day' in texto:
+                dias, partes = partes[0], partes[1:]
+            h, m, s = ([0, 0, 0] + partes)[-3:]
+            return dias * 86400 + h * 3600 + m * 60 + s
+
+        def guardar_sesion(fin):
+            nonlocal importados, omitidos
+            nuevas = [
+                e for e in entradas
+                if 'FECHA' in e and 'ARCHIVO' in e and not self.consultar(
+                    "SELECT 1 FROM archivos WHERE fecha = ? AND nombre = ?", (e['FECHA'], e['ARCHIVO']))
+            ]
+            omitidos += len(entradas) - len(nuevas)
+            entradas.clear()
+            if not nuevas:
+                return
+            trabajo_id = self.iniciar_trabajo(nuevas[0].get('DISPOSITIVO', '').lower() or None, None,
+                                              origen='importado', inicio=nuevas[0]['FECHA'])
+            for entrada in nuevas:
+                idioma = re.match(r'(\S+)\s*\(confianza:\s*([\d.]+)%\)', entrada.get('IDIOMA', ''))
+                self.registrar_archivo(
+                    trabajo_id, entrada['ARCHIVO'],
+                    a_segundos(entrada.get('DURACIÓN', '0')),
+                    float(re.sub(r'[^\d.]', '', entrada.get('TIEMPO PROC', '0')) or 0),
+                    int(entrada.get('SEGMENTOS', 0) or 0), int(entrada.get('PALABRAS', 0) or 0),
+                    float(re.sub(r'[^\d.]', '', entrada.get('TAMAÑO', '0')) or 0),
+                    idioma.group(1) if idioma else None,
+                    float(idioma.group(2)) / 100 if idioma else None,
+                    entrada.get('DISPOSITIVO', '').lower() or None, None, fecha=entrada['FECHA']
+                )
+                importados += 1
+            total_duracion = sum(a_segundos(e.get('DURACIÓN', '0')) for e in nuevas)
+            self.cerrar_trabajo(trabajo_id, len(nuevas), total_duracion, None, fin=fin)
+
+        with open(log_file, 'r', encoding='utf-8') as f:
+            for linea in f:
+                linea = linea.strip()
+                resumen = patron_resumen.search(linea)
+                if resumen:
+                    guardar_sesion(resumen.group(1))
+                    continue
+                campo = patron_campo.match(linea)
+                if campo:
+                    clave, valor = campo.groups()
+                    if clave == 'FECHA' and actual:
+                        entradas.append(actual)
+                        actual = {}
+                    actual[clave] = valor.strip()
+                elif linea.startswith('-----') and actual:
+                    entradas.append(actual)
+                    actual = {}
+
+        if actual:
+            entradas.append(actual)
+        guardar_sesion(None)
+
+        return importados, omitidos
+
+
+def formatear(valor, decimales=2):
+    if valor is None:
+        return "-"
+    if isinstance(valor, float):
+        return f"{valor:.{decimales}f}"
+    return str(valor)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas sobre el registro SQLite de transcripciones")
+    parser.add_argument('--db', help="Ruta de la base de datos (por defecto REGISTRO_DB o registro_transcripciones.db)")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_rtf = sub.add_parser('rtf', help="p50/p95 de RTF por modelo")
+    p_rtf.add_argument('--desde', help="Fecha mínima (YYYY-MM-DD)")
+    p_diario = sub.add_parser('diario', help="Throughput por día")
+    p_diario.add_argument('--dias', type=int, default=30)
+    sub.add_parser('cursos', help="Totales por curso y fase")
+    sub.add_parser('etapas', help="Tiempo acumulado por etapa")
+    p_importar = sub.add_parser('importar', help="Importa un registro_transcripciones.txt antiguo")
+    p_importar.add_argument('log_file', type=pathlib.Path)
+
+    args = parser.parse_args()
+    registro = RegistroEjecuciones(args.db)
+
+    if args.comando == 'rtf':
+        print(f"{'MODELO':<16} {'DISP.':<6} {'VÍDEOS':>7} {'RTF p50':>9} {'RTF p95':>9}")
+        for fila in registro.rtf_por_modelo(args.desde):
+            print(f"{fila['modelo']:<16} {fila['dispositivo']:<6} {fila['videos']:>7} "
+                  f"{formatear(fila['p50'], 3):>9} {formatear(fila['p95'], 3):>9}")
+
+    elif args.comando == 'diario':
+        print(f"{'DÍA':<11} {'VÍDEOS':>7} {'H AUDIO':>8} {'H PROC':>8} {'VELOC.':>7} {'PALABRAS':>10}")
+        for fila in registro.throughput_diario(args.dias):
+            print(f"{fila['dia']:<11} {fila['videos']:>7} {formatear(fila['horas_audio']):>8} "
+                  f"{formatear(fila['horas_proceso']):>8} {formatear(fila['velocidad'], 1):>6}x {fila['palabras'] or 0:>10,}")
+
+    elif args.comando == 'cursos':
+        print(f"{'CURSO':<6} {'FASE':<5} {'VÍDEOS':>7} {'H AUDIO':>8} {'PALABRAS':>10} {'RTF MEDIO':>10}")
+        for fila in registro.totales_por_curso():
+            print(f"{fila['curso']:<6} {fila['fase']:<5} {fila['videos']:>7} {formatear(fila['horas_audio']):>8} "
+                  f"{fila['palabras'] or 0:>10,} {formatear(fila['rtf_medio'], 3):>10}")
+
+    elif args.comando == 'etapas':
+        print(f"{'ETAPA':<24} {'VECES':>6} {'TOTAL (s)':>10} {'p95 (s)':>9} {'ERRORES':>8}")
+        for fila in registro.tiempo_por_etapa():
+            print(f"{fila['etapa']:<24} {fila['veces']:>6} {formatear(fila['total'], 1):>10} "
+                  f"{formatear(fila['p95'], 3):>9} {fila['errores']:>8}")
+
+    elif args.comando == 'importar':
+        if not args.log_file.exists():
+            print(f"❌ No existe {args.log_file}")
+            return
+        importados, omitidos = registro.importar_log_texto(args.log_file)
+        print(f"✅ Importadas {importados} transcripciones ({omitidos} ya estaban en el registro)")
+
+    registro.cerrar()
+
+
+if __name__ == "__main__":
+    main()
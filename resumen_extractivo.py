@@ -0,0 +1,136 @@
+"""
+Resumen extractivo local de las transcripciones para los prompts de documentación
+Cada vídeo del consolidado se reduce a sus frases más representativas, sin llamar a ningún
+modelo: las frases se representan con TF-IDF sobre las raíces de sus palabras (las mismas
+que indexa busqueda.py), se puntúan con TextRank (PageRank sobre la matriz de similitud
+coseno) y se eligen con MMR (relevancia menos parecido a lo ya elegido) hasta llegar a
+DOC_SUMMARY_RATIO de las palabras originales. Los términos más característicos de cada
+vídeo frente al resto del curso puntúan extra hasta que alguna frase elegida los cubre, y
+las frases se devuelven en su orden original
+"""
+import math
+import os
+import re
+
+import numpy as np
+
+from busqueda import terminos
+from consolidado import cargar_indice, leer_bloques
+from recuperacion import separar_bloque
+
+PATRON_FRASE = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+# Frases más largas que esto se trocean por palabras: Whisper a veces no puntúa
+MAX_PALABRAS_FRASE = 60
+
+
+def cargar_config_resumen():
+    return {
+        'activo': os.getenv('DOC_SUMMARY_ENABLED', 'false').lower() == 'true',
+        'proporcion': float(os.getenv('DOC_SUMMARY_RATIO', '0.3')),
+        'terminos_clave': int(os.getenv('DOC_SUMMARY_KEY_TERMS', '15')),
+        'lambda_mmr': float(os.getenv('DOC_SUMMARY_MMR_LAMBDA', '0.7'))
+    }
+
+
+def separar_frases(texto):
+    frases = []
+    for frase in PATRON_FRASE.split(texto):
+        palabras = frase.split()
+        for i in range(0, len(palabras), MAX_PALABRAS_FRASE):
+            frases.append(" ".join(palabras[i:i + MAX_PALABRAS_FRASE]))
+    return [f for f in frases if f]
+
+
+def matriz_tfidf(documentos, vocabulario=None):
+    """Matriz TF-IDF normalizada (filas = documentos, ya convertidos en listas de raíces) y su vocabulario"""
+    if vocabulario is None:
+        vocabulario = {}
+        for documento in documentos:
+            for termino in documento:
+                vocabulario.setdefault(termino, len(vocabulario))
+    filas = np.repeat(np.arange(len(documentos)), [len(d) for d in documentos])
+    columnas = np.fromiter((vocabulario[t] for d in documentos for t in d), dtype=np.int64, count=len(filas))
+    matriz = np.zeros((len(documentos), len(vocabulario)), dtype=np.float32)
+    np.add.at(matriz, (filas, columnas), 1.0)
+    frecuencia_documentos = np.count_nonzero(matriz, axis=0)
+    matriz *= np.log((1 + len(documentos)) / (1 + frecuencia_documentos)) + 1
+    matriz /= np.maximum(np.linalg.norm(matriz, axis=1, keepdims=True), 1e-12)
+    return matriz, vocabulario
+
+
+def textrank(similitud, amortiguacion=0.85, iteraciones=50):
+    """Centralidad de cada frase (PageRank sobre el grafo de similitudes)"""
+    pesos = similitud.copy()
+    np.fill_diagonal(pesos, 0.0)
+    pesos /= np.maximum(pesos.sum(axis=1, keepdims=True), 1e-12)
+    n = len(pesos)
+    puntuacion = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iteraciones):
+        nueva = (1 - amortiguacion) / n + amortiguacion * (pesos.T @ puntuacion)
+        if np.abs(nueva - puntuacion).sum() < 1e-6:
+            return nueva
+        puntuacion = nueva
+    return puntuacion
+
+
+def resumir(texto, config, terminos_clave=()):
+    """Frases elegidas del texto (en su orden) hasta `proporcion` de sus palabras"""
+    frases = separar_frases(texto)
+    total_palabras = sum(len(f.split()) for f in frases)
+    objetivo = math.ceil(total_palabras * config['proporcion'])
+    raices = [terminos(f).split() for f in frases]
+    if len(frases) <= 3 or objetivo >= total_palabras or not any(raices):
+        return texto.strip()
+
+    matriz, vocabulario = matriz_tfidf(raices)
+    similitud = matriz @ matriz.T
+    centralidad = textrank(similitud)
+    centralidad /= centralidad.max()
+
+    # Qué términos clave contiene cada frase (frases × términos)
+    clave = [vocabulario[t] for t in terminos_clave if t in vocabulario]
+    cubre = matriz[:, clave] > 0 if clave else np.zeros((len(frases), 0), dtype=bool)
+    pendientes = np.ones(len(clave), dtype=bool)
+
+    longitudes = np.array([len(f.split()) for f in frases])
+    elegidas = np.zeros(len(frases), dtype=bool)
+    parecido = np.zeros(len(frases), dtype=np.float32)
+    palabras = 0
+    while palabras < objetivo and not elegidas.all():
+        cobertura = (cubre[:, pendientes].sum(axis=1) / max(len(clave), 1)) if clave else 0.0
+        puntuacion = config['lambda_mmr'] * (centralidad + cobertura) - (1 - config['lambda_mmr']) * parecido
+        puntuacion[elegidas] = -np.inf
+        mejor = int(np.argmax(puntuacion))
+        elegidas[mejor] = True
+        palabras += longitudes[mejor]
+        parecido = np.maximum(parecido, similitud[mejor])
+        if clave:
+            pendientes &= ~cubre[mejor]
+    return " ".join(f for f, elegida in zip(frases, elegidas) if elegida)
+
+
+def terminos_caracteristicos(textos, cuantos):
+    """Para cada texto, sus `cuantos` raíces con más TF-IDF frente al resto de textos"""
+    raices = [terminos(t).split() for t in textos]
+    if not any(raices):
+        return [[] for _ in textos]
+    matriz, vocabulario = matriz_tfidf(raices)
+    inverso = np.array(list(vocabulario))
+    resultado = []
+    for fila in matriz:
+        mejores = np.argsort(-fila)[:cuantos]
+        resultado.append(list(inverso[mejores[fila[mejores] > 0]]))
+    return resultado
+
+
+def transcripciones_resumidas(archivo, config):
+    """Texto para el prompt: cada bloque del consolidado con su cabecera y el resumen de su transcripción"""
+    entradas = cargar_indice(archivo)['videos']
+    bloques = [separar_bloque(b) for b in leer_bloques(archivo, entradas)]
+    claves = terminos_caracteristicos([texto for _, texto in bloques], config['terminos_clave'])
+    partes = [f"(Resumen extractivo de cada vídeo: frases literales de la transcripción, en su orden, "
+              f"~{config['proporcion']:.0%} del texto original)\n\n"]
+    for (cabecera, texto), clave in zip(bloques, claves):
+        partes.append(cabecera + resumir(texto, config, clave) + "\n" + "=" * 80 + "\n\n")
+    return "".join(partes)
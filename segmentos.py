@@ -0,0 +1,47 @@
+"""
+Utilidades para segmentos de transcripción normalizados
+Los segmentos de faster-whisper se convierten en diccionarios simples
+({'inicio', 'fin', 'texto'}) para poder repartirlos, desplazarlos y guardarlos
+"""
+
+
+def segmento_a_dict(segment, desplazamiento=0.0):
+    """Convierte un segmento de faster-whisper en diccionario, desplazando sus tiempos"""
+    return {
+        'inicio': round(segment.start + desplazamiento, 3),
+        'fin': round(segment.end + desplazamiento, 3),
+        'texto': segment.text.strip()
+    }
+
+
+def a_segundos_srt(marca):
+    """Convierte HH:MM:SS,mmm en segundos"""
+    horas, minutos, resto = marca.strip().split(':')
+    segundos, milisegundos = resto.split(',')
+    return int(horas) * 3600 + int(minutos) * 60 + int(segundos) + int(milisegundos) / 1000
+
+
+def leer_srt(ruta):
+    """Lee un .srt generado por el pipeline y devuelve sus segmentos normalizados"""
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return parsear_srt(f.read())
+
+
+def parsear_srt(contenido):
+    """Segmentos normalizados del texto de un .srt"""
+    segmentos = []
+    for bloque in contenido.strip().split("\n\n"):
+        lineas = bloque.strip().split("\n")
+        if len(lineas) < 3 or '-->' not in lineas[1]:
+            continue
+        inicio, fin = lineas[1].split('-->')
+        segmentos.append({'inicio': a_segundos_srt(inicio), 'fin': a_segundos_srt(fin), 'texto': " ".join(lineas[2:]).strip()})
+    return segmentos
+
+
+def desplazar_segmentos(segmentos, desplazamiento):
+    """Devuelve una copia de los segmentos con los tiempos desplazados"""
+    return [
+        {**seg, 'inicio': round(seg['inicio'] + desplazamiento, 3), 'fin': round(seg['fin'] + desplazamiento, 3)}
+        for seg in segmentos
+    ]
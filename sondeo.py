@@ -0,0 +1,99 @@
+"""
+Sondeo rápido de vídeos a partir de los metadatos del contenedor
+Lee duración y pistas con ffprobe sin decodificar el audio, y aplica
+los límites de admisión MAX_VIDEO_DURATION y MAX_FILE_SIZE_MB
+"""
+import os
+
+import ffmpeg
+
+import metricas
+
+
+def sondear_video(fichero):
+    """Lee duración, formato y pistas desde la cabecera del contenedor (sin decodificar)"""
+    info = {
+        'fichero': fichero,
+        'tamaño_mb': fichero.stat().st_size / (1024 * 1024),
+        'duracion': None,
+        'formato': None,
+        'pistas_audio': 0,
+        'pistas_video': 0,
+        'error': None
+    }
+
+    try:
+        probe = ffmpeg.probe(str(fichero))
+    except ffmpeg.Error as e:
+        stderr = e.stderr.decode('utf-8', errors='ignore').strip() if e.stderr else str(e)
+        info['error'] = stderr.splitlines()[-1] if stderr else "ffprobe falló"
+        return info
+    except Exception as e:
+        # Normalmente ffprobe no está instalado o no está en el PATH
+        info['error'] = str(e)
+        return info
+
+    formato = probe.get('format', {})
+    info['formato'] = formato.get('format_name')
+
+    duraciones = []
+    if formato.get('duration'):
+        duraciones.append(float(formato['duration']))
+
+    for stream in probe.get('streams', []):
+        if stream.get('codec_type') == 'audio':
+            info['pistas_audio'] += 1
+        elif stream.get('codec_type') == 'video':
+            info['pistas_video'] += 1
+        if stream.get('duration'):
+            duraciones.append(float(stream['duration']))
+
+    if duraciones:
+        info['duracion'] = max(duraciones)
+
+    return info
+
+
+def cargar_limites_admision():
+    """Lee los límites de admisión del entorno (0 = sin límite)"""
+    return {
+        'max_duracion': float(os.getenv('MAX_VIDEO_DURATION', '0') or 0),
+        'max_tamaño_mb': float(os.getenv('MAX_FILE_SIZE_MB', '0') or 0)
+    }
+
+
+def evaluar_admision(info, limites):
+    """Devuelve el motivo de rechazo del vídeo, o None si se admite"""
+    if limites['max_tamaño_mb'] and info['tamaño_mb'] > limites['max_tamaño_mb']:
+        return f"tamaño {info['tamaño_mb']:.1f} MB supera MAX_FILE_SIZE_MB={limites['max_tamaño_mb']:g}"
+
+    if info['error']:
+        # Sin metadatos no podemos aplicar el límite de duración: se deja pasar
+        return None
+
+    if info['pistas_audio'] == 0:
+        return "el contenedor no tiene pista de audio"
+
+    if limites['max_duracion'] and info['duracion'] and info['duracion'] > limites['max_duracion']:
+        return f"duración {info['duracion']:.0f}s supera MAX_VIDEO_DURATION={limites['max_duracion']:g}"
+
+    return None
+
+
+def descubrir_videos(videos, extensiones, limites):
+    """Sondea todos los vídeos de la carpeta y los separa en admitidos y diferidos"""
+    admitidos = []
+    diferidos = []
+
+    for ext in extensiones:
+        for fichero in videos.glob(f"*{ext}"):
+            with metricas.etapa('sondeo', video=fichero.name):
+                info = sondear_video(fichero)
+            motivo = evaluar_admision(info, limites)
+            if motivo:
+                info['motivo'] = motivo
+                diferidos.append(info)
+            else:
+                admitidos.append(info)
+
+    return admitidos, diferidos
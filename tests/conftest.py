@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# Los módulos del proyecto están en la raíz del repositorio (sin paquete)
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
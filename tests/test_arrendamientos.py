@@ -0,0 +1,43 @@
+import os
+import time
+
+from arrendamientos import Arrendamientos
+
+
+def test_renovar_tolera_un_arrendamiento_liberado_a_la_vez(tmp_path, monkeypatch):
+    arrendamientos = Arrendamientos(tmp_path, ttl=60, latido=30)
+    assert arrendamientos.adquirir("KK-F1-v1.mp4") and arrendamientos.adquirir("KK-F1-v2.mp4")
+    antes = time.time() - 100
+    os.utime(arrendamientos.ruta("KK-F1-v2.mp4"), (antes, antes))
+
+    # El fichero desaparece justo después de comprobar que sigue siendo propio
+    vigente = arrendamientos.vigente
+
+    def vigente_y_borrado(nombre):
+        resultado = vigente(nombre)
+        if nombre == "KK-F1-v1.mp4":
+            arrendamientos.ruta(nombre).unlink()
+        return resultado
+
+    monkeypatch.setattr(arrendamientos, 'vigente', vigente_y_borrado)
+    arrendamientos.renovar_todos()
+
+    assert arrendamientos.propios == {"KK-F1-v2.mp4"}
+    assert arrendamientos.ruta("KK-F1-v2.mp4").stat().st_mtime > antes + 50
+
+
+def test_el_latido_sigue_tras_un_error(tmp_path, monkeypatch):
+    arrendamientos = Arrendamientos(tmp_path, ttl=60, latido=0.01)
+    llamadas = []
+
+    def renovar_con_fallo():
+        llamadas.append(1)
+        if len(llamadas) == 1:
+            raise OSError("recurso compartido no disponible")
+
+    monkeypatch.setattr(arrendamientos, 'renovar_todos', renovar_con_fallo)
+    arrendamientos.iniciar_latidos()
+    time.sleep(0.2)
+    arrendamientos.detener()
+
+    assert len(llamadas) > 1
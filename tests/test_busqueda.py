@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("nltk")
+
+from busqueda import IndiceBusqueda, reindexar
+from registro_db import RegistroEjecuciones
+
+
+def escribir_srt(carpeta, stem, texto):
+    (carpeta / stem).mkdir(parents=True, exist_ok=True)
+    (carpeta / stem / f"{stem}.srt").write_text(f"1\n00:00:01,000 --> 00:00:04,500\n{texto}\n\n", encoding='utf-8')
+
+
+@pytest.fixture
+def indice(tmp_path):
+    registro = RegistroEjecuciones(tmp_path / "registro.db")
+    yield IndiceBusqueda(registro)
+    registro.cerrar()
+
+
+def test_busqueda_por_raiz_y_sin_tildes(indice):
+    indice.indexar_video("KK-F1-v1", [{'inicio': 1.0, 'fin': 4.5, 'texto': "Hoy vemos la programación con bucles"}])
+
+    resultados = indice.buscar("programar")
+
+    assert [(r['video'], r['inicio_ms'], r['fin_ms']) for r in resultados] == [("KK-F1-v1", 1000, 4500)]
+    assert indice.buscar("programacion") and indice.buscar("buc")
+
+
+def test_reindexar_quita_los_videos_que_ya_no_estan(tmp_path, indice):
+    procesados = tmp_path / "procesados"
+    escribir_srt(procesados, "KK-F1-v1", "variables y tipos")
+    escribir_srt(procesados, "KK-F1-v2", "funciones recursivas")
+    assert reindexar(indice, procesados) == (2, 2, [])
+
+    # El vídeo se renombra: la versión antigua no debe seguir apareciendo en las búsquedas
+    (procesados / "KK-F1-v2").rename(procesados / "KK-F1-v3")
+    (procesados / "KK-F1-v3" / "KK-F1-v2.srt").rename(procesados / "KK-F1-v3" / "KK-F1-v3.srt")
+
+    assert reindexar(indice, procesados) == (2, 2, ["KK-F1-v2"])
+    assert [r['video'] for r in indice.buscar("recursivas")] == ["KK-F1-v3"]
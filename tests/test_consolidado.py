@@ -0,0 +1,67 @@
+from consolidado import EscritorConsolidado, bloques_de_fases, cargar_indice, leer_bloques, ruta_indice
+
+
+def bloque(nombre, texto="Hola, ¿qué tal? Programación 🎬\n"):
+    return (f"📂 {nombre}\n⏱️ Duración: 0:01:05 | 📝 Segmentos: 1 | 📊 Palabras: {len(texto.split())}\n"
+            + "-" * 80 + "\n" + texto + "\n" + "=" * 80 + "\n\n")
+
+
+def nombres_escritos(archivo):
+    return [entrada['nombre'] for entrada in cargar_indice(archivo)['videos']]
+
+
+def test_escribe_en_orden_de_curso_y_no_espera_a_los_omitidos(tmp_path):
+    archivo = tmp_path / "transcripciones_prueba.txt"
+    esperados = ["KK-F1-v3.mp4", "KK-F1-v1.mp4", "KK-F1-v2.mp4", "KK-F2-v1.mp4"]
+    escritor = EscritorConsolidado(archivo, esperados)
+
+    escritor.añadir("KK-F1-v3.mp4", bloque("KK-F1-v3.mp4"))
+    escritor.añadir("KK-F1-v2.mp4", bloque("KK-F1-v2.mp4"))
+    assert nombres_escritos(archivo) == []
+
+    # El primero falla: los siguientes ya no lo esperan
+    escritor.omitir("KK-F1-v1.mp4")
+    assert nombres_escritos(archivo) == ["KK-F1-v2.mp4", "KK-F1-v3.mp4"]
+
+    # Omitir un vídeo ya entregado no lo quita
+    escritor.añadir("KK-F2-v1.mp4", bloque("KK-F2-v1.mp4"))
+    escritor.omitir("KK-F2-v1.mp4")
+    escritor.cerrar()
+
+    assert nombres_escritos(archivo) == ["KK-F1-v2.mp4", "KK-F1-v3.mp4", "KK-F2-v1.mp4"]
+    indice = cargar_indice(archivo)
+    assert indice['tamaño'] == archivo.stat().st_size
+    assert leer_bloques(archivo, indice['videos']) == [bloque(n) for n in nombres_escritos(archivo)]
+    assert indice['videos'][0]['duracion'] == 65 and indice['videos'][0]['palabras'] == 5
+    assert bloques_de_fases(archivo, ["F2"]) == [bloque("KK-F2-v1.mp4")]
+    assert not escritor.pendientes_dir.exists()
+
+
+def test_bloques_pendientes_sobreviven_a_un_corte(tmp_path):
+    archivo = tmp_path / "transcripciones_prueba.txt"
+    escritor = EscritorConsolidado(archivo, ["KK-T1-v1.mp4", "KK-T1-v2.mp4"])
+    escritor.añadir("KK-T1-v2.mp4", bloque("KK-T1-v2.mp4"))
+    # Corte: el escritor no llega a cerrarse y el índice se pierde
+
+    reanudado = EscritorConsolidado(archivo, ["KK-T1-v1.mp4"])
+    reanudado.añadir("KK-T1-v1.mp4", bloque("KK-T1-v1.mp4"))
+    reanudado.cerrar()
+
+    ruta_indice(archivo).unlink()
+    assert nombres_escritos(archivo) == ["KK-T1-v1.mp4", "KK-T1-v2.mp4"]
+
+
+def test_limite_de_memoria_en_bytes(tmp_path):
+    texto = "ñ" * 1000 + "\n"
+    tamaño = len(bloque("KK-F1-v2.mp4", texto).encode('utf-8'))
+    escritor = EscritorConsolidado(tmp_path / "transcripciones_prueba.txt", ["KK-F1-v1.mp4", "KK-F1-v2.mp4", "KK-F1-v3.mp4"],
+                                   memoria_max=tamaño + 10)
+
+    escritor.añadir("KK-F1-v2.mp4", bloque("KK-F1-v2.mp4", texto))
+    escritor.añadir("KK-F1-v3.mp4", bloque("KK-F1-v3.mp4", texto))
+
+    assert list(escritor.memoria) == ["KK-F1-v2.mp4"]
+    assert escritor.bytes_en_memoria == tamaño
+    escritor.añadir("KK-F1-v1.mp4", bloque("KK-F1-v1.mp4"))
+    assert escritor.bytes_en_memoria == 0
+    escritor.cerrar()
@@ -0,0 +1,118 @@
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+for modulo in ("torch", "faster_whisper", "openai"):
+    pytest.importorskip(modulo)
+
+# transcribir.py crea el cliente de OpenAI al importarse y exige una clave (las pruebas no llaman a la API)
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+import metricas
+import transcribir
+from consolidado import EscritorConsolidado
+
+VIDEOS = ["KK-F1-v1.mp4", "KK-F1-v2.mp4", "KK-F2-v1.mp4", "KK-T1-v1.mp4"]
+
+
+def html(titulo):
+    return f"<html><body><h1>{titulo}</h1></body></html>"
+
+
+def archivo(nombre, codigo, cerrado=True):
+    return f"[ARCHIVO: {nombre}]\n```html\n{codigo}\n" + ("```" if cerrado else "")
+
+
+class ClienteFalso:
+    """Cliente de OpenAI que responde con lo preparado para cada llamada y guarda los prompts"""
+
+    def __init__(self, principal, finish_reason='length'):
+        self.principal = principal
+        self.finish_reason = finish_reason
+        self.prompts = []
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        prompt = messages[-1]['content']
+        with self._lock:
+            self.prompts.append(prompt)
+            primera = len(self.prompts) == 1
+        if primera:
+            contenido, finish_reason = self.principal, self.finish_reason
+        else:
+            # La continuación pide un único archivo: se devuelve ese (y, como a veces hace el modelo, otro repetido)
+            pedido = prompt.split("Genera ÚNICAMENTE el archivo ", 1)[1].split(",", 1)[0]
+            contenido = archivo("index.html", html("repetido")) + "\n" + archivo(pedido, html(f"continuación {pedido}"))
+            finish_reason = 'stop'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=contenido),
+                                                        finish_reason=finish_reason)])
+
+
+@pytest.fixture
+def consolidado(tmp_path, monkeypatch):
+    carpeta = tmp_path / "transcripciones"
+    carpeta.mkdir()
+    ruta = carpeta / "transcripciones_20260101_120000.txt"
+    escritor = EscritorConsolidado(ruta, VIDEOS)
+    for nombre in VIDEOS:
+        escritor.añadir(nombre, transcribir.bloque_consolidado(transcribir.pathlib.Path(nombre), f"Texto de {nombre}\n",
+                                                               60, 1, 3))
+    escritor.cerrar()
+
+    previa = metricas.carpeta_metricas()
+    metricas.configurar(tmp_path / "metricas")
+    monkeypatch.setenv('METRICS_TEXTFILE_DIR', str(tmp_path / "metricas"))
+    monkeypatch.setenv('DOC_RAG_ENABLED', 'false')
+    monkeypatch.setenv('DOC_SUMMARY_ENABLED', 'false')
+    yield ruta
+    metricas.configurar(previa)
+
+
+def test_archivos_esperados_y_faltantes(consolidado):
+    respuesta = ("BLOQUE 1: análisis\n\n"
+                 + archivo("index.html", html("inicio")) + "\n"
+                 + archivo("www/Fase-f1.html", html("F1")) + "\n"
+                 + archivo("fase-F2.html", "<html><body>cortad", cerrado=False))
+
+    # El prompt maestro solo pide index.html y una página por fase: los temas (T1) no se esperan
+    assert transcribir.archivos_esperados(consolidado) == ["index.html", "fase-F1.html", "fase-F2.html"]
+    assert sorted(transcribir.archivos_completos(respuesta)) == ["fase-F1.html", "index.html"]
+    assert transcribir.archivos_faltantes(respuesta, consolidado) == ["fase-F2.html"]
+    assert transcribir.recortar_archivo_incompleto(respuesta).endswith(html("F1") + "\n```")
+
+
+def test_respuesta_cortada_pide_solo_los_archivos_que_faltan(consolidado, monkeypatch):
+    principal = ("BLOQUE 1: análisis del curso\n\n"
+                 + archivo("index.html", html("inicio")) + "\n"
+                 + archivo("fase-F1.html", html("F1")) + "\n"
+                 + archivo("fase-F2.html", "<html><body>cortad", cerrado=False))
+    cliente = ClienteFalso(principal, finish_reason='length')
+    monkeypatch.setattr(transcribir, 'client', cliente)
+
+    documentacion = transcribir.generar_documentacion_con_openai(consolidado)
+
+    assert documentacion is not None
+    continuaciones = cliente.prompts[1:]
+    assert [p.split("Genera ÚNICAMENTE el archivo ", 1)[1].split(",", 1)[0] for p in continuaciones] == ["fase-F2.html"]
+    # Cada continuación lleva el análisis ya hecho y solo las transcripciones de su fase
+    prompt_f2 = next(p for p in continuaciones if "ÚNICAMENTE el archivo fase-F2.html" in p)
+    assert "BLOQUE 1: análisis del curso" in prompt_f2
+    assert "KK-F2-v1.mp4" in prompt_f2 and "KK-F1-v1.mp4" not in prompt_f2
+
+    carpeta_base = consolidado.parent.parent
+    assert (carpeta_base / "index-openai.html").read_text(encoding='utf-8').strip() == html("inicio")
+    paginas = {p.name: p.read_text(encoding='utf-8') for p in (carpeta_base / "www" / "openai").glob("*.html")}
+    assert "continuación fase-F2.html" in paginas["fase-F2.html"] and "cortad" not in paginas["fase-F2.html"]
+    assert "F1" in paginas["fase-F1.html"]
+
+
+def test_respuesta_completa_no_pide_continuaciones(consolidado, monkeypatch):
+    principal = "\n".join(archivo(nombre, html(nombre)) for nombre in transcribir.archivos_esperados(consolidado))
+    cliente = ClienteFalso(principal, finish_reason='stop')
+    monkeypatch.setattr(transcribir, 'client', cliente)
+
+    assert transcribir.generar_documentacion_con_openai(consolidado) is not None
+    assert len(cliente.prompts) == 1
@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("zstandard")
+
+from historico import ArchivoHistorico
+
+
+def srt(texto):
+    return f"1\n00:00:00,000 --> 00:00:05,000\n{texto}\n\n"
+
+
+@pytest.fixture
+def archivo(tmp_path):
+    archivo = ArchivoHistorico(tmp_path, nivel=3)
+    for stem in ("KLC-T1-v1", "KLC-T1-v2", "KLC-T1-v3"):
+        archivo.añadir(stem, f"texto de {stem} " * 200, srt(stem))
+    return archivo
+
+
+@pytest.mark.parametrize("recorte", [1, 10, "mitad"])
+def test_reconstruir_indice_recorta_la_ultima_trama_cortada(tmp_path, archivo, recorte):
+    ultima = archivo.indice['videos']["KLC-T1-v3"]
+    corte = ultima['longitud'] // 2 if recorte == "mitad" else recorte
+    with open(archivo.ruta, 'r+b') as f:
+        f.truncate(ultima['desplazamiento'] + ultima['longitud'] - corte)
+    archivo.ruta_indice.unlink()
+
+    reabierto = ArchivoHistorico(tmp_path)
+
+    assert sorted(reabierto.indice['videos']) == ["KLC-T1-v1", "KLC-T1-v2"]
+    assert archivo.ruta.stat().st_size == ultima['desplazamiento']
+    assert reabierto.leer("KLC-T1-v2")['txt'].startswith("texto de KLC-T1-v2")
+    # Tras recortar, el archivo admite nuevas tramas
+    reabierto.añadir("KLC-T1-v3", "otra vez", srt("otra vez"))
+    assert ArchivoHistorico(tmp_path).leer("KLC-T1-v3")['txt'] == "otra vez"
+
+
+def test_indice_desfasado_se_reconstruye(tmp_path, archivo):
+    archivo.ruta_indice.write_text('{"tamaño": 1, "videos": {}}', encoding='utf-8')
+
+    assert sorted(ArchivoHistorico(tmp_path).indice['videos']) == ["KLC-T1-v1", "KLC-T1-v2", "KLC-T1-v3"]
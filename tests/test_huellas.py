@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("faster_whisper")
+
+from huellas import SAMPLE_RATE, IndiceHuellas, calcular_huella, cargar_config_duplicados
+
+
+def ruido(segundos, semilla):
+    return np.random.default_rng(semilla).standard_normal(int(segundos * SAMPLE_RATE)).astype(np.float32) * 0.1
+
+
+@pytest.fixture
+def indice(tmp_path):
+    return IndiceHuellas(tmp_path, cargar_config_duplicados())
+
+
+def test_sintonia_compartida_no_es_duplicado(indice):
+    sintonia = ruido(8, 1)
+    indice.añadir("KLC-T1.mp4", "KLC-T1", calcular_huella(np.concatenate([sintonia, ruido(120, 2)])))
+
+    otro = calcular_huella(np.concatenate([sintonia, ruido(120, 3)]))
+
+    assert indice.buscar(otro) is None
+
+
+def test_duplicado_desplazado_cubre_el_tramo_comun(indice):
+    original = ruido(90, 4)
+    indice.añadir("KLC-T2.mp4", "KLC-T2", calcular_huella(original))
+
+    # El mismo audio con 160 tramas (5.12 s) nuevas delante y un poco de ruido encima (recodificación)
+    copia = np.concatenate([ruido(5.12, 5), original]) + ruido(95.12, 6) * 0.05
+    resultado = indice.buscar(calcular_huella(copia))
+
+    assert resultado['stem'] == "KLC-T2"
+    assert resultado['desplazamiento'] == pytest.approx(-5.12, abs=0.1)
+    assert resultado['cubierto'][0] == pytest.approx(5.12, abs=1.0)
+    assert resultado['cubierto'][1] == pytest.approx(95.12, abs=3.0)
+    assert resultado['proporcion'] >= 0.2
+
+
+def test_añadir_se_ordena_en_la_siguiente_busqueda(indice, tmp_path):
+    huellas = {f"KLC-F1-{i}": calcular_huella(ruido(40, 10 + i)) for i in range(3)}
+    for stem, huella in huellas.items():
+        indice.añadir(f"{stem}.mp4", stem, huella)
+
+    assert (tmp_path / "KLC-F1-1" / "KLC-F1-1.huella.npz").exists()
+    assert indice.buscar(huellas["KLC-F1-1"])['stem'] == "KLC-F1-1"
+    assert np.all(np.diff(indice.hashes.astype(np.int64)) >= 0)
+    # Un índice nuevo lee las huellas guardadas
+    assert len(IndiceHuellas(tmp_path).videos) == 3
@@ -0,0 +1,35 @@
+import pathlib
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faster_whisper")
+
+from huellas import SAMPLE_RATE, calcular_huella, ruta_huella
+from incremental import cargar_config_incremental, guardar_huella_video, plan_incremental
+
+
+def ruido(segundos, semilla):
+    return np.random.default_rng(semilla).standard_normal(int(segundos * SAMPLE_RATE)).astype(np.float32) * 0.1
+
+
+def test_sin_deteccion_de_duplicados_la_nueva_version_encuentra_la_anterior(tmp_path):
+    original = ruido(60, 1)
+    anterior = pathlib.Path("KLC-T1-v2.mp4")
+    # DEDUP_ENABLED=false: no hay índice de huellas, pero la huella se guarda igual
+    guardar_huella_video(tmp_path, anterior, calcular_huella(original), indice_huellas=None)
+    (tmp_path / "KLC-T1-v2" / "KLC-T1-v2.srt").write_text(
+        "1\n00:00:00,000 --> 00:00:30,000\nhola\n\n2\n00:00:30,000 --> 00:01:00,000\nadiós\n\n", encoding='utf-8')
+    assert ruta_huella(tmp_path, "KLC-T1-v2").exists()
+
+    # Nueva versión: los últimos 10 s se sustituyen por audio nuevo
+    nueva = np.concatenate([original[:50 * SAMPLE_RATE], ruido(10, 2)])
+    resultado = plan_incremental(tmp_path, pathlib.Path("KLC-T1-v2 revisado.mp4"), calcular_huella(nueva),
+                                 cargar_config_incremental())
+
+    assert resultado is not None
+    carpeta, plan = resultado
+    assert carpeta.name == "KLC-T1-v2"
+    assert plan['reutilizados'][0][0] == pytest.approx(0.0, abs=1.0)
+    assert plan['cambiados'][-1][1] == pytest.approx(60.0, abs=0.5)
+    assert plan['proporcion_cambiada'] == pytest.approx(10 / 60, abs=0.05)
@@ -0,0 +1,52 @@
+import threading
+
+from tuberia import Tuberia
+
+
+def test_el_elemento_que_falla_se_entrega_a_al_fallar():
+    tuberia = Tuberia(tamaño_cola=2)
+    cola = tuberia.cola('numeros')
+    fallidos = []
+    recibidos = []
+
+    def dividir(n):
+        return 10 // n
+
+    tuberia.etapa('producir', lambda n: n, iter([5, 0, 2]), cola)
+    tuberia.etapa('dividir', lambda n: recibidos.append(dividir(n)), cola, al_fallar=fallidos.append)
+    tuberia.ejecutar()
+
+    assert sorted(recibidos) == [2, 5]
+    assert fallidos == [0]
+    assert tuberia.etapas[1].errores == 1
+
+
+def test_si_falla_el_generador_de_entrada_las_etapas_siguientes_terminan():
+    tuberia = Tuberia(tamaño_cola=1)
+    cola = tuberia.cola('numeros')
+    recibidos = []
+
+    def origen():
+        yield 1
+        raise OSError("registro bloqueado")
+
+    tuberia.etapa('producir', lambda n: n, origen(), cola)
+    tuberia.etapa('consumir', recibidos.append, cola)
+
+    errores = []
+
+    def ejecutar():
+        try:
+            tuberia.ejecutar()
+        except RuntimeError as e:
+            errores.append(e)
+
+    # En un hilo aparte: si la marca de fin no llegara, la prueba fallaría en vez de colgarse
+    hilo = threading.Thread(target=ejecutar, daemon=True)
+    hilo.start()
+    hilo.join(5)
+
+    assert not hilo.is_alive()
+    assert recibidos == [1]
+    assert "registro bloqueado" in str(errores[0])
+    assert isinstance(tuberia.etapas[0].fallo, OSError)
@@ -3,11 +3,37 @@ import torch
 import shutil
 import time
 import os
+import re
 from datetime import datetime, timedelta
-from faster_whisper import WhisperModel
+from concurrent.futures import ThreadPoolExecutor
+from faster_whisper import WhisperModel, decode_audio
 from openai import OpenAI
 from dotenv import load_dotenv
-import ollama
+from sondeo import cargar_limites_admision, descubrir_videos
+from registro_db import RegistroEjecuciones
+from codigos_video import descomponer_codigo_video
+from estado_trabajos import EstadoTrabajos, etapa_alcanzada, escritura_atomica
+from consolidado import EscritorConsolidado, bloques_de_fases, cargar_config_consolidado, cargar_indice
+from segmentos import segmento_a_dict, desplazar_segmentos
+from historico import segmentos_video, transcripcion_disponible
+from busqueda import IndiceBusqueda
+from panel_estadisticas import EstadisticasAcumuladas, actualizar_panel
+from limpieza import cargar_config_limpieza, limpiar_segmentos
+from pool_ollama import obtener_pool
+from ciclo_modelos import obtener_gestor
+from recuperacion import cargar_config_recuperacion, transcripciones_recuperadas
+from glosario import actualizar_glosario, analizar_videos, cargar_config_glosario, seccion_terminos
+from resumen_extractivo import cargar_config_resumen, transcripciones_resumidas
+from huellas import IndiceHuellas, calcular_huella, cargar_config_duplicados, tramos_sin_cubrir
+from incremental import cargar_config_incremental, guardar_huella_video, plan_incremental, segmentos_reutilizados
+from puntos_control import PuntoControl, cargar_config_puntos_control, contexto_previo
+from tuberia import Tuberia, cargar_config_tuberia
+from autoajuste import cargar_config_whisper
+from modelos import resolver_modelo, ModeloNoDisponible
+from cola_trabajos import ColaTrabajos, rtf_historico
+from arrendamientos import Arrendamientos, cargar_config_arrendamientos
+from empaquetado import cargar_config_empaquetado, agrupar_candidatos, preparar_audio_paquete, repartir_segmentos
+import metricas
 
 # Configurar OpenAI
 load_dotenv()
@@ -18,11 +44,25 @@ VIDEO_EXTS = [".mp4", ".mkv", ".avi", ".mov", ".m4a", ".mp3", ".wav"]
 def transcribir_archivos(videos: pathlib.Path, carpeta_procesados: pathlib.Path):
     # Crear carpeta procesados si no existe
     carpeta_procesados.mkdir(exist_ok=True)
+    metricas.configurar(carpeta_procesados / "metricas")
     
     # Crear carpeta backup si no existe
     carpeta_backup = carpeta_procesados.parent / "videos_backup"
     carpeta_backup.mkdir(exist_ok=True)
     
+    # Sondear metadatos del contenedor y aplicar límites antes de decodificar nada
+    limites = cargar_limites_admision()
+    candidatos, diferidos = descubrir_videos(videos, VIDEO_EXTS, limites)
+    duracion_estimada = sum(c['duracion'] or 0 for c in candidatos)
+    print(f"🔎 Vídeos admitidos: {len(candidatos)} ({format_duration(duracion_estimada)} de contenido según cabeceras)")
+    
+    for diferido in diferidos:
+        print(f"⏸️ Diferido: {diferido['fichero'].name} → {diferido['motivo']}")
+    
+    if not candidatos:
+        print(f"\n📭 No se encontraron videos para procesar en la carpeta 'videos'")
+        return
+    
     # Detectar si CUDA está disponible
     device = "cuda" if torch.cuda.is_available() else "cpu"
     print(f"🚀 Usando dispositivo: {device}")
@@ -30,15 +70,38 @@ def transcribir_archivos(videos: pathlib.Path, carpeta_procesados: pathlib.Path)
     if device == "cuda":
         print(f"🎮 GPU detectada: {torch.cuda.get_device_name(0)}")
         print(f"💾 Memoria GPU disponible: {torch.cuda.get_device_properties(0).total_memory / 1024**3:.1f} GB")
-        # Para RTX 5090, usamos compute_type optimizado
-        compute_type = "float16"
-    else:
-        compute_type = "int8"
     
-    # Inicializar el modelo Whisper
-    print(f"🤖 Cargando modelo Whisper (small) en {device}...")
+    # compute_type, cpu_threads y num_workers: .env > autoajuste del host (python autoajuste.py) > por defecto
+    config_whisper = cargar_config_whisper(device)
+    modelo_whisper = config_whisper['modelo']
+    compute_type = config_whisper['compute_type']
+    print(f"⚙️ compute_type={compute_type}, cpu_threads={config_whisper['cpu_threads']}, "
+          f"num_workers={config_whisper['num_workers']} ({config_whisper['origen']})")
+    
+    # Registro SQLite de la ejecución (las etapas medidas se guardan también ahí)
+    registro = RegistroEjecuciones()
+    trabajo_id = registro.iniciar_trabajo(device, modelo_whisper, compute_type)
+    reenviar_etapa = lambda evento: registro.registrar_etapa(trabajo_id, evento)
+    metricas.suscribir(reenviar_etapa)
+    
+    # Cola persistente: prioridad, plazo y trabajo más corto primero (python cola_trabajos.py)
+    cola = ColaTrabajos(registro)
+    cola.sincronizar(candidatos, [d['fichero'].name for d in diferidos])
+    rtf = rtf_historico(registro, modelo_whisper, device)
+    
+    # Inicializar el modelo Whisper desde la caché local (MODELS_CACHE_DIR), sin consultar el hub
+    print(f"🤖 Cargando modelo Whisper ({modelo_whisper}) en {device}...")
     model_start = time.time()
-    model = WhisperModel("small", device=device, compute_type=compute_type)
+    try:
+        ruta_modelo = resolver_modelo(modelo_whisper, compute_type)
+    except ModeloNoDisponible as e:
+        print(f"❌ {e}")
+        registro.cerrar_trabajo(trabajo_id, 0, 0, 0)
+        return
+    print(f"📦 Modelo en caché: {ruta_modelo}")
+    with metricas.etapa('carga_modelo', modelo=modelo_whisper, dispositivo=device):
+        model = WhisperModel(ruta_modelo, device=device, compute_type=compute_type,
+                             cpu_threads=config_whisper['cpu_threads'], num_workers=config_whisper['num_workers'])
     model_load_time = time.time() - model_start
     print(f"✅ Modelo cargado en {model_load_time:.2f}s")
     print(f"💾 Backup configurado en: {carpeta_backup}")
@@ -49,149 +112,151 @@ def transcribir_archivos(videos: pathlib.Path, carpeta_procesados: pathlib.Path)
     tiempo_total_inicio = time.time()
     tiempo_total_video = 0
     
-    # Archivo de log general
-    log_file = carpeta_procesados.parent / "registro_transcripciones.txt"
+    # Arrendamientos en procesados/.leases: varios hosts pueden compartir videos/ y procesados/
+    arrendamientos = Arrendamientos(carpeta_procesados / ".leases", **cargar_config_arrendamientos())
+    arrendamientos.iniciar_latidos()
     
-    # Archivo de transcripciones consolidadas de esta ejecución
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    archivo_transcripciones = carpeta_procesados / f"transcripciones_{timestamp}.txt"
+    # Estado por vídeo: una ejecución interrumpida se reanuda desde la última etapa completada
+    estado = EstadoTrabajos(carpeta_procesados)
+    archivo_transcripciones, reanudada = estado.iniciar_ejecucion(carpeta_procesados)
+    timestamp = archivo_transcripciones.stem.replace('transcripciones_', '')
     
-    for ext in VIDEO_EXTS:
-        for fichero in videos.glob(f"*{ext}"):
-            print(f"\n{'='*60}")
-            print(f"🎬 Procesando: {fichero.name}")
-            print(f"📅 Inicio: {datetime.now().strftime('%H:%M:%S')}")
-            
-            # Obtener tamaño del archivo
-            tamaño_mb = fichero.stat().st_size / (1024 * 1024)
-            print(f"📦 Tamaño archivo: {tamaño_mb:.2f} MB")
-            
-            try:
-                # Crear carpeta específica para este video
-                carpeta_video = carpeta_procesados / fichero.stem
-                carpeta_video.mkdir(exist_ok=True)
-                
-                # Tiempo de inicio de transcripción
-                transcripcion_inicio = time.time()
-                
-                # Transcribir con faster-whisper
-                segments, info = model.transcribe(
-                    str(fichero), 
-                    language="es",
-                    beam_size=5,
-                    word_timestamps=True
-                )
-                
-                # Métricas del video
-                duracion_video = info.duration
-                tiempo_total_video += duracion_video
-                
-                print(f"⏱️ Duración video: {format_duration(duracion_video)}")
-                print(f"🌐 Idioma detectado: {info.language} (confianza: {info.language_probability:.1%})")
-                
-                # Guardar transcripción en texto
-                output_file = carpeta_video / f"{fichero.stem}.txt"
-                segmentos_count = 0
-                palabras_count = 0
-                transcripcion_completa = ""  # Para el archivo consolidado
-                
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(f"=== MÉTRICAS DEL VIDEO ===\n")
-                    f.write(f"Archivo: {fichero.name}\n")
-                    f.write(f"Tamaño: {tamaño_mb:.2f} MB\n")
-                    f.write(f"Duración: {format_duration(duracion_video)}\n")
-                    f.write(f"Idioma detectado: {info.language} (confianza: {info.language_probability:.1%})\n")
-                    f.write(f"Fecha procesamiento: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    f.write(f"Dispositivo usado: {device.upper()}\n\n")
-                    f.write(f"=== TRANSCRIPCIÓN ===\n\n")
-                    
-                    for segment in segments:
-                        texto = segment.text.strip()
-                        f.write(f"{texto}\n")
-                        transcripcion_completa += f"{texto}\n"
-                        segmentos_count += 1
-                        palabras_count += len(texto.split())
-                
-                # Agregar transcripción al archivo consolidado de la ejecución
-                agregar_transcripcion_consolidada(archivo_transcripciones, fichero, transcripcion_completa, duracion_video, segmentos_count, palabras_count)
-                
-                # Guardar también en formato SRT
-                srt_file = carpeta_video / f"{fichero.stem}.srt"
-                with open(srt_file, 'w', encoding='utf-8') as f:
-                    segments, _ = model.transcribe(str(fichero), language="es")
-                    for i, segment in enumerate(segments, 1):
-                        start = format_time(segment.start)
-                        end = format_time(segment.end)
-                        f.write(f"{i}\n")
-                        f.write(f"{start} --> {end}\n")
-                        f.write(f"{segment.text.strip()}\n\n")
-                
-                # Calcular métricas de rendimiento
-                transcripcion_tiempo = time.time() - transcripcion_inicio
-                velocidad_procesamiento = duracion_video / transcripcion_tiempo
-                
-                # Crear backup del video original
-                backup_destino = carpeta_backup / fichero.name
-                print(f"💾 Creando backup...")
-                shutil.copy2(str(fichero), str(backup_destino))
-                
-                # Mover el video procesado a su carpeta
-                video_destino = carpeta_video / fichero.name
-                shutil.move(str(fichero), str(video_destino))
-                videos_procesados.append(fichero.name)
-                
-                # Recopilar estadísticas detalladas para la tabla
-                estadisticas_video = recopilar_estadisticas_video(fichero, duracion_video, transcripcion_completa)
-                if estadisticas_video:
-                    estadisticas_videos.append(estadisticas_video)
-                
-                # Almacenar información detallada del video para el resumen
-                videos_info.append({
-                    'nombre': fichero.name,
-                    'carpeta': fichero.stem,
-                    'tamaño_mb': tamaño_mb,
-                    'duracion': duracion_video,
-                    'tiempo_proc': transcripcion_tiempo,
-                    'velocidad': velocidad_procesamiento,
-                    'segmentos': segmentos_count,
-                    'palabras': palabras_count,
-                    'idioma': info.language,
-                    'confianza': info.language_probability
-                })
-                
-                # Registrar en el log general
-                registrar_transcripcion(log_file, fichero, duracion_video, transcripcion_tiempo, 
-                                      velocidad_procesamiento, segmentos_count, palabras_count, 
-                                      tamaño_mb, info, device)
-                
-                # Mostrar métricas detalladas
-                print(f"⚡ Tiempo procesamiento: {transcripcion_tiempo:.2f}s")
-                print(f"🚄 Velocidad: {velocidad_procesamiento:.2f}x (realtime)")
-                print(f"📝 Segmentos generados: {segmentos_count}")
-                print(f"📊 Palabras transcritas: {palabras_count}")
-                print(f"📈 Palabras por minuto: {(palabras_count / duracion_video * 60):.0f}")
-                
-                print(f"✅ Completado exitosamente!")
-                print(f"   📁 Carpeta: {carpeta_video.name}")
-                print(f"   🎞️ Video: {fichero.name}")
-                print(f"   💾 Backup: videos_backup/{fichero.name}")
-                print(f"   📄 Transcripción: {output_file.name}")
-                print(f"   🎬 Subtítulos: {srt_file.name}")
-                
-            except Exception as e:
-                print(f"❌ Error procesando {fichero.name}: {e}")
+    contexto = {
+        'carpeta_procesados': carpeta_procesados,
+        'carpeta_backup': carpeta_backup,
+        'archivo_transcripciones': archivo_transcripciones,
+        'registro': registro,
+        'trabajo_id': trabajo_id,
+        'modelo': modelo_whisper,
+        'device': device,
+        'estado': estado,
+        'reanudada': reanudada,
+        'arrendamientos': arrendamientos
+    }
+    
+    # Huellas acústicas: un vídeo ya transcrito con otra codificación o recortado reutiliza su transcripción
+    config_duplicados = cargar_config_duplicados()
+    if config_duplicados['activo']:
+        with metricas.etapa('carga_indice_huellas'):
+            contexto['indice_huellas'] = IndiceHuellas(carpeta_procesados, config_duplicados)
+        print(f"♊ Índice de huellas: {len(contexto['indice_huellas'].videos)} vídeos")
+    else:
+        contexto['indice_huellas'] = None
+    
+    # Índice de texto completo (FTS5) en el mismo registro SQLite
+    try:
+        contexto['indice_busqueda'] = IndiceBusqueda(registro)
+    except RuntimeError as e:
+        print(f"⚠️ Búsqueda de texto completo desactivada: {e}")
+        contexto['indice_busqueda'] = None
+    
+    # Estadísticas acumuladas de todas las ejecuciones para el panel de procesados/estadisticas/
+    contexto['estadisticas'] = EstadisticasAcumuladas(registro)
+    
+    # Nuevas versiones de un vídeo ya transcrito: solo se retranscriben los trozos cambiados
+    contexto['config_incremental'] = cargar_config_incremental()
+    
+    # Limpieza del texto que va al consolidado (bucles, créditos inventados, muletillas)
+    contexto['config_limpieza'] = cargar_config_limpieza()
+    
+    # Los vídeos ya transcritos en la ejecución interrumpida no se vuelven a decodificar
+    pendientes = []
+    reanudados = []
+    for candidato in candidatos:
+        estado_video = estado.descubrir(candidato['fichero'])
+        resultado = None
+        if etapa_alcanzada(estado_video, 'transcrito'):
+            resultado = estado.cargar_resultado(candidato['fichero'], estado_video)
+        if resultado:
+            print(f"♻️ {candidato['fichero'].name}: reanudando desde la etapa '{estado_video['etapa']}'")
+            reanudados.append((resultado, estado_video))
+        else:
+            pendientes.append(candidato)
+    
+    # El consolidado se escribe en orden de curso aunque los vídeos terminen en otro orden
+    consolidado = EscritorConsolidado(archivo_transcripciones, [c['fichero'].name for c in candidatos],
+                                      **cargar_config_consolidado())
+    contexto['consolidado'] = consolidado
+    
+    # Los clips cortos se empaquetan en un único trabajo si PACK_SHORT_CLIPS=true
+    config_empaquetado = cargar_config_empaquetado()
+    lotes = agrupar_candidatos(cola.ordenar(pendientes, rtf), config_empaquetado)
+    
+    # Los vídeos largos guardan puntos de control cada CHECKPOINT_INTERVAL_SECONDS
+    contexto['config_puntos_control'] = cargar_config_puntos_control()
+    
+    # Pipeline por etapas con colas acotadas: el dispositivo transcribe el siguiente vídeo
+    # mientras otros hilos escriben las salidas, copian el backup y recopilan estadísticas
+    config_tuberia = cargar_config_tuberia()
+    tuberia = Tuberia(config_tuberia['tamaño_cola'])
+    cola_audio = tuberia.cola('audio')
+    cola_escritura = tuberia.cola('escritura')
+    cola_backup = tuberia.cola('backup')
+    cola_estadisticas = tuberia.cola('estadisticas')
+    resultados_videos = []
+    
+    # Cada hilo de decodificación pide a la cola el siguiente lote con la puntuación del momento
+    tuberia.etapa('decodificacion', lambda lote: decodificar_lote(model, lote, config_empaquetado, consolidado),
+                  arrendamientos.reclamar(cola.extraer(lotes, rtf), al_rechazar=consolidado.omitir), cola_audio, hilos=config_tuberia['hilos_decodificacion'])
+    # Un vídeo que falla en cualquier etapa deja de esperarse en el consolidado (si aún no entregó su bloque)
+    def omitir_lote(decodificado):
+        for candidato in decodificado['lote']:
+            consolidado.omitir(candidato['fichero'].name)
+    
+    def omitir_video(elemento):
+        consolidado.omitir(elemento[0]['fichero'].name)
+    
+    # Con num_workers > 1 el modelo atiende varias transcripciones a la vez: un hilo por worker
+    tuberia.etapa('transcripcion', lambda decodificado: transcribir_decodificado(model, decodificado, contexto),
+                  cola_audio, cola_escritura, hilos=config_whisper['num_workers'], al_fallar=omitir_lote)
+    tuberia.etapa('reanudados', lambda elemento: elemento, reanudados_propios(reanudados, contexto), cola_escritura)
+    tuberia.etapa('escritura', lambda elemento: escribir_salidas_video(*elemento, contexto), cola_escritura, cola_backup,
+                  al_fallar=omitir_video)
+    tuberia.etapa('backup', lambda elemento: respaldar_video(*elemento, contexto), cola_backup, cola_estadisticas,
+                  al_fallar=omitir_video)
+    tuberia.etapa('estadisticas', lambda elemento: resultados_videos.append(cerrar_video(*elemento, contexto)), cola_estadisticas,
+                  al_fallar=omitir_video)
+    try:
+        tuberia.ejecutar()
+    finally:
+        arrendamientos.detener()
+        consolidado.cerrar()
+    
+    for resultado, info_video in resultados_videos:
+        tiempo_total_video += resultado['duracion']
+        videos_procesados.append(resultado['fichero'].name)
+        videos_info.append(info_video)
+        if info_video['estadisticas']:
+            estadisticas_videos.append(info_video['estadisticas'])
+    
+    # Palabras clave y entidades de los vídeos de esta ejecución (una sola pasada de spaCy)
+    config_glosario = cargar_config_glosario()
+    if config_glosario['activo'] and videos_procesados:
+        try:
+            with metricas.etapa('glosario', videos=len(videos_procesados)):
+                analizar_videos(carpeta_procesados, [pathlib.Path(nombre).stem for nombre in videos_procesados], config_glosario)
+                actualizar_glosario(carpeta_procesados)
+        except RuntimeError as e:
+            print(f"⚠️ Glosario no generado: {e}")
+    
+    estado.finalizar_ejecucion()
     
     # Resumen final con métricas globales
     tiempo_total_final = time.time() - tiempo_total_inicio
     
+    # Cerrar el trabajo en el registro
+    agregar_resumen_log(registro, trabajo_id, len(videos_procesados), tiempo_total_video, tiempo_total_final)
+    
     if videos_procesados:
-        # Agregar resumen al log
-        agregar_resumen_log(log_file, len(videos_procesados), tiempo_total_video, tiempo_total_final)
         
-        # Generar tabla de estadísticas detalladas
+        # Actualizar el panel de estadísticas acumuladas (solo se reescriben las secciones que cambian)
         if estadisticas_videos:
-            print(f"📊 Generando tabla de estadísticas detalladas...")
-            archivo_estadisticas = generar_tabla_estadisticas(estadisticas_videos, carpeta_procesados)
+            print("📊 Actualizando panel de estadísticas...")
+            with metricas.etapa('tabla_estadisticas', videos=len(estadisticas_videos)):
+                archivo_estadisticas, secciones_actualizadas = actualizar_panel(registro, carpeta_procesados)
+        
+        # Exportar métricas por etapa (JSONL ya escrito + textfile Prometheus)
+        archivo_metricas = metricas.exportar_openmetrics("transcripcion")
         
         print(f"\n{'='*60}")
         print(f"🎉 ¡PROCESAMIENTO COMPLETADO!")
@@ -204,12 +269,16 @@ def transcribir_archivos(videos: pathlib.Path, carpeta_procesados: pathlib.Path)
         print(f"   💾 Ahorro de tiempo: {format_duration(tiempo_total_video - tiempo_total_final)}")
         print(f"   📁 Organizados en: {carpeta_procesados}")
         print(f"   💾 Backups guardados en: {carpeta_backup}")
-        print(f"   📋 Log actualizado: {log_file.name}")
+        print(f"   🗃️ Registro actualizado: {registro.ruta.name} (trabajo #{trabajo_id})")
+        print(f"   ⏱️ Métricas por etapa: {archivo_metricas.parent.name}/metricas.jsonl, {archivo_metricas.name}")
+        print("   🧵 Pipeline (tiempo ocupado / esperando trabajo / esperando cola llena):")
+        print(tuberia.resumen())
         print(f"   📄 Transcripciones consolidadas: transcripciones_{timestamp}.txt")
         
         # Mostrar información de estadísticas si se generaron
         if estadisticas_videos and 'archivo_estadisticas' in locals():
-            print(f"   📊 Estadísticas detalladas: {archivo_estadisticas.name}")
+            print(f"   📊 Estadísticas acumuladas: {archivo_estadisticas.parent.name}/{archivo_estadisticas.name} "
+                  f"({len(secciones_actualizadas)} secciones actualizadas)")
         
         print(f"   🧹 Carpeta 'videos' liberada para nuevos archivos")
         print(f"   📅 Finalizado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -224,70 +293,456 @@ def transcribir_archivos(videos: pathlib.Path, carpeta_procesados: pathlib.Path)
     else:
         print(f"\n📭 No se encontraron videos para procesar en la carpeta 'videos'")
 
-def agregar_transcripcion_consolidada(archivo_transcripciones, fichero, transcripcion_completa, duracion_video, segmentos_count, palabras_count):
-    """Agrega la transcripción de un video al archivo consolidado de la ejecución"""
-    
-    # Crear el archivo si es la primera transcripción de la ejecución
-    if not archivo_transcripciones.exists():
-        with open(archivo_transcripciones, 'w', encoding='utf-8') as f:
-            f.write(f"TRANSCRIPCIONES CONSOLIDADAS - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("="*80 + "\n\n")
-    
-    # Agregar la transcripción del video actual
-    with open(archivo_transcripciones, 'a', encoding='utf-8') as f:
-        f.write(f"📂 {fichero.name}\n")
-        f.write(f"⏱️ Duración: {format_duration(duracion_video)} | 📝 Segmentos: {segmentos_count} | 📊 Palabras: {palabras_count}\n")
-        f.write("-" * 80 + "\n")
-        f.write(transcripcion_completa)
-        f.write("\n" + "="*80 + "\n\n")
-
-def agregar_resumen_log(log_file, num_videos, tiempo_total_video, tiempo_total_final):
-    """Agrega un resumen de la sesión al archivo de log"""
-    with open(log_file, 'a', encoding='utf-8') as f:
-        f.write("=" * 50 + "\n")
-        f.write(f"🎉 RESUMEN DE SESIÓN - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write("=" * 50 + "\n")
-        f.write(f"📺 Videos procesados en esta sesión: {num_videos}\n")
-        f.write(f"⏱️ Duración total de videos: {format_duration(tiempo_total_video)}\n")
-        f.write(f"⚡ Tiempo total de procesamiento: {format_duration(tiempo_total_final)}\n")
-        f.write(f"🚄 Velocidad promedio: {(tiempo_total_video / tiempo_total_final):.2f}x\n")
-        f.write(f"💾 Ahorro de tiempo: {format_duration(tiempo_total_video - tiempo_total_final)}\n")
-        f.write("=" * 50 + "\n\n")
+def reanudados_propios(reanudados, contexto):
+    """Vídeos reanudados que este nodo consigue arrendar (los demás los termina otro nodo)"""
+    for resultado, estado_video in reanudados:
+        nombre = resultado['fichero'].name
+        if contexto['arrendamientos'].adquirir(nombre):
+            yield resultado, estado_video
+        else:
+            contexto['consolidado'].omitir(nombre)
+
+def decodificar_lote(model, lote, config_empaquetado, consolidado=None):
+    """Etapa productora: decodifica el audio de un vídeo o de un paquete de clips cortos"""
+    print(f"\n{'='*60}")
+    if len(lote) > 1:
+        print(f"📦 Paquete de {len(lote)} clips cortos ({format_duration(sum(c['duracion'] for c in lote))})")
+        for candidato in lote:
+            print(f"   🎬 {candidato['fichero'].name}")
+    else:
+        candidato = lote[0]
+        print(f"🎬 Procesando: {candidato['fichero'].name}")
+        print(f"📦 Tamaño archivo: {candidato['tamaño_mb']:.2f} MB")
+        if candidato['duracion']:
+            print(f"🔎 Duración según cabecera: {format_duration(candidato['duracion'])}")
+        elif candidato['error']:
+            print(f"⚠️ No se pudo sondear el contenedor: {candidato['error']}")
+    print(f"📅 Inicio: {datetime.now().strftime('%H:%M:%S')}")
+    
+    inicio = time.time()
+    try:
+        if len(lote) > 1:
+            audio, tramos = preparar_audio_paquete(lote, config_empaquetado['silencio'])
+        else:
+            tramos = None
+            with metricas.etapa('decodificacion_audio', video=lote[0]['fichero'].name):
+                audio = decode_audio(str(lote[0]['fichero']), sampling_rate=model.feature_extractor.sampling_rate)
+    except Exception as e:
+        for candidato in lote:
+            print(f"❌ Error decodificando {candidato['fichero'].name}: {e}")
+            if consolidado:
+                consolidado.omitir(candidato['fichero'].name)
+        return None
+    
+    return {'lote': lote, 'audio': audio, 'tramos': tramos, 'tiempo_decodificacion': time.time() - inicio}
+
+def transcribir_decodificado(model, decodificado, contexto):
+    """Etapa de transcripción: devuelve (resultado, estado) de cada vídeo del lote"""
+    lote = decodificado['lote']
+    estado = contexto['estado']
+    carpeta_procesados = contexto['carpeta_procesados']
+    indice_huellas = contexto['indice_huellas']
+    punto_control = None
+    try:
+        if len(lote) > 1:
+            resultados = transcribir_paquete(model, lote, decodificado['audio'], decodificado['tramos'])
+        else:
+            candidato = lote[0]
+            fichero = candidato['fichero']
+            huella = None
+            coincidencia = None
+            incremental = None
+            config_incremental = contexto['config_incremental']
+            if indice_huellas or config_incremental['activo']:
+                with metricas.etapa('huella_acustica', video=fichero.name):
+                    huella = calcular_huella(decodificado['audio'])
+                    # La versión anterior se compara antes de que su huella se sustituya en el índice
+                    if config_incremental['activo']:
+                        incremental = plan_incremental(carpeta_procesados, fichero, huella, config_incremental)
+                    if indice_huellas and not incremental:
+                        coincidencia = indice_huellas.buscar(huella, excluir=fichero.name)
+                if coincidencia and not transcripcion_disponible(carpeta_procesados, coincidencia['stem']):
+                    coincidencia = None
+            
+            if incremental:
+                resultados = [transcribir_incremental(model, candidato, decodificado['audio'], *incremental)]
+            elif coincidencia:
+                resultados = [transcribir_duplicado(model, candidato, decodificado['audio'], coincidencia, carpeta_procesados)]
+            else:
+                punto_control = PuntoControl(carpeta_procesados, fichero, contexto['config_puntos_control']['intervalo'])
+                resultados = [transcribir_video(model, candidato, decodificado['audio'], punto_control)]
+            
+            if huella:
+                guardar_huella_video(carpeta_procesados, fichero, huella, indice_huellas)
+    except Exception as e:
+        for candidato in lote:
+            print(f"❌ Error procesando {candidato['fichero'].name}: {e}")
+            contexto['consolidado'].omitir(candidato['fichero'].name)
+        return None
+    
+    salida = []
+    for resultado in resultados:
+        # El tiempo de procesamiento incluye la decodificación, como antes de separar las etapas
+        resultado['tiempo_proc'] += decodificado['tiempo_decodificacion'] / len(lote)
+        # Los segmentos quedan en disco antes de escribir nada más
+        salida.append((resultado, estado.guardar_resultado(resultado)))
+        if punto_control:
+            punto_control.eliminar()
+    return salida
+
+def transcribir_video(model, candidato, audio, punto_control=None):
+    """Transcribe un vídeo completo y devuelve el resultado con los segmentos normalizados
+    
+    Con punto de control, los segmentos se guardan periódicamente y, si existe uno de una
+    ejecución interrumpida, solo se transcribe el audio posterior a su desplazamiento.
+    """
+    fichero = candidato['fichero']
+    inicio = time.time()
+    sampling_rate = model.feature_extractor.sampling_rate
+    
+    guardado = punto_control.cargar() if punto_control else None
+    segmentos = list(guardado['segmentos']) if guardado else []
+    desplazamiento = guardado['desplazamiento'] if guardado else 0.0
+    tiempo_previo = guardado['tiempo_proc'] if guardado else 0.0
+    if guardado:
+        print(f"♻️ Punto de control encontrado: continuando desde {format_duration(desplazamiento)} ({len(segmentos)} segmentos)")
+    
+    duracion = len(audio) / sampling_rate
+    
+    # Transcribir con faster-whisper (los segmentos se generan al consumir el iterador)
+    with metricas.etapa('transcripcion', video=fichero.name, reanudado=bool(guardado)):
+        segments, info = model.transcribe(
+            audio[int(desplazamiento * sampling_rate):], 
+            language="es",
+            beam_size=5,
+            word_timestamps=True,
+            initial_prompt=contexto_previo(segmentos)
+        )
+        idioma = guardado['idioma'] if guardado else info.language
+        confianza = guardado['confianza'] if guardado else info.language_probability
+        
+        for segment in segments:
+            segmentos.append(segmento_a_dict(segment, desplazamiento))
+            if punto_control:
+                # El siguiente arranque continuaría desde el final del último segmento emitido
+                punto_control.guardar(segmentos, segmentos[-1]['fin'], idioma, confianza,
+                                      tiempo_previo + time.time() - inicio)
+    
+    return {
+        'fichero': fichero,
+        'tamaño_mb': candidato['tamaño_mb'],
+        'duracion': duracion,
+        'idioma': idioma,
+        'confianza': confianza,
+        'segmentos': segmentos,
+        'tiempo_proc': tiempo_previo + time.time() - inicio
+    }
+
+def transcribir_duplicado(model, candidato, audio, coincidencia, carpeta_procesados):
+    """Reutiliza la transcripción de un vídeo casi idéntico y transcribe solo lo que no cubre"""
+    fichero = candidato['fichero']
+    inicio = time.time()
+    sampling_rate = model.feature_extractor.sampling_rate
+    duracion = len(audio) / sampling_rate
+    cubierto_inicio, cubierto_fin = coincidencia['cubierto']
+    print(f"♊ {fichero.name} es un duplicado de {coincidencia['nombre']} "
+          f"(desplazamiento {coincidencia['desplazamiento']:+.2f}s, {coincidencia['proporcion']:.0%} de coincidencias): "
+          f"se reutilizan {format_duration(cubierto_fin - cubierto_inicio)} de su transcripción")
+    
+    # Segmentos de la referencia llevados a la línea de tiempo del vídeo nuevo
+    referencia = segmentos_video(carpeta_procesados, coincidencia['stem'])
+    segmentos = [
+        segmento for segmento in desplazar_segmentos(referencia, -coincidencia['desplazamiento'])
+        if cubierto_inicio <= (segmento['inicio'] + segmento['fin']) / 2 <= cubierto_fin
+    ]
+    idioma, confianza = "es", 1.0
+    
+    for tramo_inicio, tramo_fin in tramos_sin_cubrir(duracion, coincidencia['cubierto']):
+        print(f"   🎙️ Transcribiendo la parte nueva {format_duration(tramo_inicio)} - {format_duration(tramo_fin)}")
+        with metricas.etapa('transcripcion', video=fichero.name, parcial=True):
+            segments, info = model.transcribe(
+                audio[int(tramo_inicio * sampling_rate):int(tramo_fin * sampling_rate)],
+                language="es",
+                beam_size=5,
+                word_timestamps=True
+            )
+            segmentos.extend(segmento_a_dict(segment, tramo_inicio) for segment in segments)
+        idioma, confianza = info.language, info.language_probability
+    
+    return {
+        'fichero': fichero,
+        'tamaño_mb': candidato['tamaño_mb'],
+        'duracion': duracion,
+        'idioma': idioma,
+        'confianza': confianza,
+        'segmentos': sorted(segmentos, key=lambda segmento: segmento['inicio']),
+        'tiempo_proc': time.time() - inicio,
+        'duplicado_de': coincidencia['nombre']
+    }
+
+def transcribir_incremental(model, candidato, audio, anterior, plan):
+    """Nueva versión de un vídeo: reutiliza los trozos sin cambios y transcribe solo los cambiados"""
+    fichero = candidato['fichero']
+    inicio = time.time()
+    sampling_rate = model.feature_extractor.sampling_rate
+    duracion = len(audio) / sampling_rate
+    print(f"✂️ {fichero.name} es una nueva versión de {anterior.name}: "
+          f"se retranscribe el {plan['proporcion_cambiada']:.0%} ({len(plan['cambiados'])} tramos cambiados)")
+    
+    previos = segmentos_video(anterior.parent, anterior.name)
+    segmentos = []
+    for tramo in plan['reutilizados']:
+        segmentos.extend(segmentos_reutilizados(previos, tramo))
+    idioma, confianza = "es", 1.0
+    
+    for tramo_inicio, tramo_fin in plan['cambiados']:
+        # Los segmentos reutilizados que asomen en el tramo se sustituyen por los nuevos
+        segmentos = [s for s in segmentos if not tramo_inicio <= (s['inicio'] + s['fin']) / 2 < tramo_fin]
+        print(f"   🎙️ Transcribiendo el tramo cambiado {format_duration(tramo_inicio)} - {format_duration(tramo_fin)}")
+        with metricas.etapa('transcripcion', video=fichero.name, parcial=True):
+            segments, info = model.transcribe(
+                audio[int(tramo_inicio * sampling_rate):int(tramo_fin * sampling_rate)],
+                language="es",
+                beam_size=5,
+                word_timestamps=True,
+                initial_prompt=contexto_previo(sorted((s for s in segmentos if s['fin'] <= tramo_inicio), key=lambda s: s['inicio']))
+            )
+            segmentos.extend(segmento_a_dict(segment, tramo_inicio) for segment in segments)
+        idioma, confianza = info.language, info.language_probability
+    
+    return {
+        'fichero': fichero,
+        'tamaño_mb': candidato['tamaño_mb'],
+        'duracion': duracion,
+        'idioma': idioma,
+        'confianza': confianza,
+        'segmentos': sorted(segmentos, key=lambda segmento: segmento['inicio']),
+        'tiempo_proc': time.time() - inicio,
+        'incremental_de': anterior.name
+    }
+
+def transcribir_paquete(model, lote, audio, tramos):
+    """Transcribe varios clips cortos (ya decodificados y concatenados) y devuelve un resultado por clip"""
+    inicio = time.time()
+    
+    with metricas.etapa('transcripcion', video=f"paquete de {len(lote)} clips", clips=len(lote)):
+        segments, info = model.transcribe(
+            audio,
+            language="es",
+            beam_size=5,
+            word_timestamps=True
+        )
+        segmentos_por_clip = repartir_segmentos(segments, tramos)
+    
+    # El tiempo del paquete se reparte entre los clips en proporción a su duración
+    tiempo_paquete = time.time() - inicio
+    duracion_audio = sum(fin - ini for ini, fin in tramos)
+    
+    resultados = []
+    for candidato, (tramo_inicio, tramo_fin), segmentos in zip(lote, tramos, segmentos_por_clip):
+        duracion = tramo_fin - tramo_inicio
+        resultados.append({
+            'fichero': candidato['fichero'],
+            'tamaño_mb': candidato['tamaño_mb'],
+            'duracion': duracion,
+            'idioma': info.language,
+            'confianza': info.language_probability,
+            'segmentos': segmentos,
+            'tiempo_proc': tiempo_paquete * duracion / duracion_audio if duracion_audio else 0
+        })
+    
+    return resultados
+
+def escribir_transcripcion_txt(output_file, resultado, device):
+    """Guarda la transcripción en texto con su cabecera de métricas y devuelve el texto plano"""
+    fichero = resultado['fichero']
+    transcripcion_completa = ""
+    
+    with escritura_atomica(output_file) as f:
+        f.write(f"=== MÉTRICAS DEL VIDEO ===\n")
+        f.write(f"Archivo: {fichero.name}\n")
+        f.write(f"Tamaño: {resultado['tamaño_mb']:.2f} MB\n")
+        f.write(f"Duración: {format_duration(resultado['duracion'])}\n")
+        f.write(f"Idioma detectado: {resultado['idioma']} (confianza: {resultado['confianza']:.1%})\n")
+        f.write(f"Fecha procesamiento: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"Dispositivo usado: {device.upper()}\n\n")
+        f.write(f"=== TRANSCRIPCIÓN ===\n\n")
+        
+        for segmento in resultado['segmentos']:
+            f.write(f"{segmento['texto']}\n")
+            transcripcion_completa += f"{segmento['texto']}\n"
+    
+    return transcripcion_completa
+
+def escribir_subtitulos_srt(srt_file, segmentos):
+    """Guarda los segmentos en formato SRT"""
+    with escritura_atomica(srt_file) as f:
+        for i, segmento in enumerate(segmentos, 1):
+            f.write(f"{i}\n")
+            f.write(f"{format_time(segmento['inicio'])} --> {format_time(segmento['fin'])}\n")
+            f.write(f"{segmento['texto']}\n\n")
+
+def texto_transcripcion(resultado):
+    """Texto plano de la transcripción (un segmento por línea) y sus recuentos"""
+    transcripcion_completa = "".join(f"{segmento['texto']}\n" for segmento in resultado['segmentos'])
+    return transcripcion_completa, len(resultado['segmentos']), len(transcripcion_completa.split())
+
+def escribir_salidas_video(resultado, estado_video, contexto):
+    """Etapa de escritura: TXT, SRT y bloque en el consolidado (se salta si ya se hizo antes de un corte)"""
+    fichero = resultado['fichero']
+    if etapa_alcanzada(estado_video, 'salidas_escritas'):
+        return resultado, estado_video
+    
+    # Crear carpeta específica para este video
+    carpeta_video = contexto['carpeta_procesados'] / fichero.stem
+    carpeta_video.mkdir(exist_ok=True)
+    
+    # Guardar transcripción en texto
+    with metricas.etapa('escritura_txt', video=fichero.name):
+        escribir_transcripcion_txt(carpeta_video / f"{fichero.stem}.txt", resultado, contexto['device'])
+    
+    # Entregar el bloque al escritor del consolidado (una sola vez aunque se reanude); los recuentos
+    # de la cabecera, que recoge el índice del consolidado, son los del texto limpio
+    segmentos_consolidado = limpiar_para_consolidado(fichero, resultado['segmentos'], contexto['config_limpieza'])
+    texto_consolidado, segmentos_count, palabras_count = texto_transcripcion({'segmentos': segmentos_consolidado})
+    with metricas.etapa('escritura_consolidado', video=fichero.name):
+        contexto['consolidado'].añadir(fichero.name, bloque_consolidado(fichero, texto_consolidado, resultado['duracion'], segmentos_count, palabras_count))
+    
+    # Guardar también en formato SRT (mismos segmentos, sin volver a transcribir)
+    with metricas.etapa('escritura_srt', video=fichero.name):
+        escribir_subtitulos_srt(carpeta_video / f"{fichero.stem}.srt", resultado['segmentos'])
+    
+    return resultado, contexto['estado'].avanzar(fichero.name, 'salidas_escritas')
+
+def limpiar_para_consolidado(fichero, segmentos, config_limpieza):
+    """Segmentos del vídeo para el consolidado: limpios si TRANSCRIPT_CLEANUP_ENABLED, tal cual si no"""
+    if not config_limpieza['activo']:
+        return segmentos
+    inicio = time.perf_counter()
+    segmentos_limpios, informe = limpiar_segmentos(segmentos, config_limpieza)
+    metricas.registrar('limpieza', time.perf_counter() - inicio, video=fichero.name, **informe)
+    ahorro = informe['tokens_antes'] - informe['tokens_despues']
+    if ahorro:
+        print(f"🧽 {fichero.name}: limpieza → {informe['eliminados']} segmentos descartados, "
+              f"~{ahorro} tokens menos ({ahorro / informe['tokens_antes']:.1%})")
+    return segmentos_limpios
+
+def respaldar_video(resultado, estado_video, contexto):
+    """Etapa de backup: copia el vídeo original a videos_backup/ (temporal + renombrado)"""
+    fichero = resultado['fichero']
+    if etapa_alcanzada(estado_video, 'respaldado'):
+        return resultado, estado_video
+    
+    print(f"💾 Creando backup de {fichero.name}...")
+    backup_destino = contexto['carpeta_backup'] / fichero.name
+    with metricas.etapa('backup', video=fichero.name, tamaño_mb=round(resultado['tamaño_mb'], 2)):
+        backup_temporal = backup_destino.with_name(f".{fichero.name}.tmp")
+        shutil.copy2(str(fichero), str(backup_temporal))
+        os.replace(backup_temporal, backup_destino)
+    
+    return resultado, contexto['estado'].avanzar(fichero.name, 'respaldado')
+
+def cerrar_video(resultado, estado_video, contexto):
+    """Etapa de estadísticas: registra el vídeo, lo mueve a su carpeta y devuelve (resultado, info)"""
+    fichero = resultado['fichero']
+    duracion_video = resultado['duracion']
+    estado = contexto['estado']
+    carpeta_video = contexto['carpeta_procesados'] / fichero.stem
+    carpeta_video.mkdir(exist_ok=True)
+    transcripcion_completa, segmentos_count, palabras_count = texto_transcripcion(resultado)
+    
+    # Calcular métricas de rendimiento
+    transcripcion_tiempo = resultado['tiempo_proc']
+    velocidad_procesamiento = duracion_video / transcripcion_tiempo if transcripcion_tiempo else 0
+    
+    # Recopilar estadísticas detalladas para la tabla y registrar en el log general
+    with metricas.etapa('estadisticas', video=fichero.name):
+        estadisticas_video = recopilar_estadisticas_video(contexto['carpeta_backup'] / fichero.name, duracion_video, transcripcion_completa)
+        if not estado_video.get('registrado'):
+            registrar_transcripcion(contexto, fichero, duracion_video, transcripcion_tiempo, 
+                                  segmentos_count, palabras_count, resultado['tamaño_mb'],
+                                  resultado['idioma'], resultado['confianza'])
+            estado_video = estado.avanzar(fichero.name, registrado=True)
+        # Índice de búsqueda: los segmentos del vídeo quedan consultables con busqueda.py
+        if contexto['indice_busqueda']:
+            contexto['indice_busqueda'].indexar_video(fichero.stem, resultado['segmentos'])
+        if estadisticas_video:
+            contexto['estadisticas'].registrar(estadisticas_video, contexto['trabajo_id'])
+    
+    # Mover el video procesado a su carpeta: último paso, deja libre la carpeta videos/
+    # Solo lo confirma el nodo que conserva el arrendamiento
+    if not contexto['arrendamientos'].vigente(fichero.name):
+        raise RuntimeError(f"{fichero.name}: arrendamiento perdido, lo confirmará otro nodo")
+    video_destino = carpeta_video / fichero.name
+    with metricas.etapa('mover_video', video=fichero.name):
+        shutil.move(str(fichero), str(video_destino))
+    estado.avanzar(fichero.name, 'movido')
+    estado.limpiar(fichero.name)
+    contexto['arrendamientos'].liberar(fichero.name)
+    
+    # Mostrar métricas detalladas (en un solo print para que no se mezcle con otras etapas)
+    lineas = [
+        f"\n🎞️ {fichero.name}",
+        f"⏱️ Duración video: {format_duration(duracion_video)}",
+        f"🌐 Idioma detectado: {resultado['idioma']} (confianza: {resultado['confianza']:.1%})",
+        f"⚡ Tiempo procesamiento: {transcripcion_tiempo:.2f}s",
+        f"🚄 Velocidad: {velocidad_procesamiento:.2f}x (realtime)",
+        f"📝 Segmentos generados: {segmentos_count}",
+        f"📊 Palabras transcritas: {palabras_count}"
+    ]
+    if duracion_video:
+        lineas.append(f"📈 Palabras por minuto: {(palabras_count / duracion_video * 60):.0f}")
+    lineas += [
+        f"✅ Completado exitosamente!",
+        f"   📁 Carpeta: {carpeta_video.name}",
+        f"   🎞️ Video: {fichero.name}",
+        f"   💾 Backup: videos_backup/{fichero.name}",
+        f"   📄 Transcripción: {fichero.stem}.txt",
+        f"   🎬 Subtítulos: {fichero.stem}.srt"
+    ]
+    print("\n".join(lineas))
+    
+    # Información detallada del video para el resumen
+    return resultado, {
+        'nombre': fichero.name,
+        'carpeta': fichero.stem,
+        'tamaño_mb': resultado['tamaño_mb'],
+        'duracion': duracion_video,
+        'tiempo_proc': transcripcion_tiempo,
+        'velocidad': velocidad_procesamiento,
+        'segmentos': segmentos_count,
+        'palabras': palabras_count,
+        'idioma': resultado['idioma'],
+        'confianza': resultado['confianza'],
+        'estadisticas': estadisticas_video
+    }
+
+def bloque_consolidado(fichero, transcripcion_completa, duracion_video, segmentos_count, palabras_count):
+    """Bloque de un vídeo en el archivo consolidado de la ejecución"""
+    return (
+        f"📂 {fichero.name}\n"
+        f"⏱️ Duración: {format_duration(duracion_video)} | 📝 Segmentos: {segmentos_count} | 📊 Palabras: {palabras_count}\n"
+        + "-" * 80 + "\n"
+        + transcripcion_completa
+        + "\n" + "=" * 80 + "\n\n"
+    )
+
+def agregar_resumen_log(registro, trabajo_id, num_videos, tiempo_total_video, tiempo_total_final):
+    """Cierra el trabajo de la sesión en el registro SQLite con sus totales"""
+    registro.cerrar_trabajo(trabajo_id, num_videos, tiempo_total_video, tiempo_total_final)
 
 def format_duration(seconds):
     """Convierte segundos a formato legible (HH:MM:SS)"""
     return str(timedelta(seconds=int(seconds)))
 
-def registrar_transcripcion(log_file, fichero, duracion_video, tiempo_procesamiento, 
-                          velocidad, segmentos, palabras, tamaño_mb, info, device):
-    """Registra los detalles de la transcripción en el archivo de log general"""
-    
-    # Crear encabezado si el archivo no existe
-    if not log_file.exists():
-        with open(log_file, 'w', encoding='utf-8') as f:
-            f.write("="*80 + "\n")
-            f.write("REGISTRO GENERAL DE TRANSCRIPCIONES\n")
-            f.write("="*80 + "\n")
-            f.write(f"Archivo de log creado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Sistema: faster-whisper con {device.upper()}\n")
-            f.write("="*80 + "\n\n")
-    
-    # Agregar entrada de la transcripción
-    with open(log_file, 'a', encoding='utf-8') as f:
-        f.write(f"📅 FECHA: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"📁 ARCHIVO: {fichero.name}\n")
-        f.write(f"📦 TAMAÑO: {tamaño_mb:.2f} MB\n")
-        f.write(f"⏱️ DURACIÓN: {format_duration(duracion_video)}\n")
-        f.write(f"🌐 IDIOMA: {info.language} (confianza: {info.language_probability:.1%})\n")
-        f.write(f"⚡ TIEMPO PROC: {tiempo_procesamiento:.2f}s\n")
-        f.write(f"🚄 VELOCIDAD: {velocidad:.2f}x\n")
-        f.write(f"📝 SEGMENTOS: {segmentos}\n")
-        f.write(f"📊 PALABRAS: {palabras}\n")
-        f.write(f"📈 PAL/MIN: {(palabras / duracion_video * 60):.0f}\n")
-        f.write(f"🎮 DISPOSITIVO: {device.upper()}\n")
-        f.write(f"📁 CARPETA: procesados/{fichero.stem}/\n")
-        f.write(f"💾 BACKUP: videos_backup/{fichero.name}\n")
-        f.write("-" * 50 + "\n\n")
+def registrar_transcripcion(contexto, fichero, duracion_video, tiempo_procesamiento, 
+                          segmentos, palabras, tamaño_mb, idioma, confianza):
+    """Registra los detalles de la transcripción en el registro SQLite de ejecuciones"""
+    contexto['registro'].registrar_archivo(
+        contexto['trabajo_id'], fichero.name, duracion_video, tiempo_procesamiento,
+        segmentos, palabras, tamaño_mb, idioma, confianza,
+        contexto['device'], contexto['modelo']
+    )
 
 def format_time(seconds):
     """Convierte segundos a formato SRT (HH:MM:SS,mmm)"""
@@ -438,813 +893,23 @@ Para cada página de fase, estructura así:
   - Párrafo introductorio con el objetivo de la fase (usa la síntesis global de la fase).
 
 - Sección "Vídeos de la fase":
-  - Para cada vídeo de esa fase (por ejemplo KK-F1-v1, KK-F1-v2…):
-    - Un bloque con:
-      - Código y título (ej.: "KK-F1-v1 – Introducción a la IA").
-      - Un resumen corto.
-      - Un bloque desplegable (puedes usar `<details><summary>…</summary>…</details>`) con:
-        - Resumen extendido del vídeo.
-        - Lista de ideas clave.
-        - Lista de errores típicos o puntos de atención (si los hay).
-
-- Sección "Manual / Guía rápida de la fase":
-  - Redacta un pequeño manual en texto (no hace falta HTML complejo, solo `<h3>`, `<p>`, `<ul>`).
-  - Enfocado a que alguien pueda leerlo sin ver los vídeos y aún así saber usar lo básico del tema de la fase.
-
-- Sección "Cuestionario de autoevaluación (tipo test)":
-  - Crea entre 5 y 10 preguntas tipo test por fase.
-  - Cada pregunta debe:
-    - Estar basada en los contenidos reales de los vídeos de la fase.
-    - Tener 3 o 4 opciones de respuesta.
-    - Indicar internamente cuál es la correcta (para que el JS pueda comprobar).
-  - Implementa un formulario sencillo con:
-    - Preguntas con opciones tipo `radio`.
-    - Un botón "Corregir".
-    - Un bloque de resultados que muestre:
-      - Cuántas respuestas correctas ha tenido el usuario.
-      - Un mensaje general según el porcentaje (ej: "Necesitas repasar", "Bien", "Excelente").
-    - Opción: mostrar un pequeño mensaje bajo cada pregunta indicando si esa pregunta se ha respondido bien o mal al corregir.
-
-IMPORTANTE: 
-- El JS debe ir al final del `<body>` dentro de `<script>`.
-- No uses librerías, solo JavaScript nativo.
-- Usa IDs o `data-` atributos para marcar qué opción es correcta.
-
-2.4. Interactividad mínima (JS) para el cuestionario
-
-Quiero un JS genérico que:
-- Recorra todas las preguntas del cuestionario de la fase.
-- Para cada pregunta:
-  - Compruebe si la opción seleccionada coincide con la respuesta correcta.
-- Cuente el número de aciertos.
-- Muestre:
-  - Nº de aciertos.
-  - Nº de preguntas totales.
-  - Un mensaje general según el porcentaje de acierto.
-- Opcional: añada a cada pregunta una clase CSS o texto "Correcto" / "Incorrecto".
-
-2.5. Estilo general (CSS)
-
-Mantén un estilo limpio:
-- Fondo claro.
-- Tipografía sans-serif.
-- Contenedores tipo "tarjeta" para cada bloque.
-- Barra de navegación sencilla con enlaces a las fases.
-- Botones sencillos pero visibles para:
-  - "Ir a la fase F{{n}}".
-  - "Corregir cuestionario".
-
---------------------------------
-FORMATO DE LA RESPUESTA
---------------------------------
-
-Quiero que tu respuesta siga este orden:
-
-1) BLOQUE 1 – ANÁLISIS Y SÍNTESIS (solo texto, bien estructurado, sin HTML)
-2) BLOQUE 2 – HTML
-
-Dentro del BLOQUE 2, dame cada archivo HTML en un bloque de código separado así:
-
-- Comentario indicando el nombre del archivo.
-- Luego el contenido completo.
-
-Ejemplo de formato:
-
-[ARCHIVO: index.html]
-```html
-...código...
-```
-
-[ARCHIVO: fase-F1.html]
-```html
-...código...
-```
-
-Y así sucesivamente para cada fase que detectes.
-Si por límite de longitud no puedes generar todos los HTML en una sola respuesta, prioriza:
-1) index.html
-2) la fase más baja (por ejemplo F1)
-y luego indica qué quedaría pendiente.
-
-Con todo esto, genera ahora el análisis y la estructura HTML en base a las transcripciones proporcionadas."""
-
-    return prompt
-    
-    prompt = f"""Quiero que actúes como analista y diseñador de material formativo para la plataforma Klinikare / CliniQuer.
-
-Te voy a dar transcripciones de varios vídeos de formación. 
-Cada vídeo sigue esta nomenclatura en el nombre de archivo:
-
-- Siempre empieza por "KK" (de Klinikare).
-- Luego "-F" + número de fase. Ejemplo: F1, F2, F3…
-- Luego "-v" + número de vídeo dentro de esa fase. Ejemplo: v1, v2, v3…
-- Después del nombre, suele venir un título descriptivo. 
-  Ejemplo: "KK-F1-v1-Introducción a la IA.mp4"
-
-Quiero dos grandes bloques de salida:
-
-1) ANÁLISIS Y SÍNTESIS EN TEXTO
-2) GENERACIÓN DE ESTRUCTURA WEB EN HTML (MÚLTIPLES PÁGINAS + QUIZ INTERACTIVO)
-
---------------------------------
-BLOQUE 0 – ENTRADA (TRANSCRIPCIONES)
---------------------------------
-
-Estas son las transcripciones consolidadas que debes analizar:
-
-{transcripciones_consolidadas}
-
-(Nota: las transcripciones ya vienen agrupadas por archivo. Cada bloque empieza con algo parecido a:
-"📂 KK-F1-v1-Introducción a la IA.mp4" seguido del contenido).
-
---------------------------------
-BLOQUE 1 – ANÁLISIS Y SÍNTESIS
---------------------------------
-
-Primero quiero un análisis en texto, SIN generar HTML todavía.
-
-1.1. Identificación de estructura por fases y vídeos
-- Detecta todas las fases: F1, F2, F3, etc. a partir de los nombres de archivo (KK-F{{fase}}-v{{n}}).
-- Dentro de cada fase, lista los vídeos en orden (v1, v2, v3…).
-- Para cada vídeo, indica:
-  - Código: por ejemplo "KK-F1-v1"
-  - Título (si aparece en el nombre)
-  - Fase a la que pertenece
-
-1.2. Resumen corto por vídeo
-Para cada vídeo, genera un resumen muy breve (2–3 frases) que explique:
-- De qué trata.
-- Qué quiere que aprenda el usuario al final.
-
-1.3. Resumen extendido por vídeo
-Para cada vídeo, genera:
-- Un resumen en 1–3 párrafos.
-- Una lista de 4–8 ideas clave o puntos importantes.
-- Opcional: una lista de "errores típicos" o "malos usos" relacionados con el tema, si se deducen del contenido.
-
-1.4. Síntesis global por fase
-Para cada fase F1, F2, etc.:
-- Explica en 1–2 párrafos cuál es el objetivo de la fase.
-- Indica el perfil objetivo (por ejemplo: recepción, dirección, clínicos, etc. si se intuye).
-- Resume qué sabrá hacer el usuario al terminar la fase.
-
-Haz este BLOQUE 1 en texto estructurado con títulos y subtítulos, pero sin HTML.
-
-Cuando termines el BLOQUE 1, continúa con el BLOQUE 2.
-
---------------------------------
-BLOQUE 2 – GENERACIÓN WEB HTML
---------------------------------
-
-Ahora quiero que conviertas todo esto en una pequeña "web de formación" en HTML, NO en una sola página, sino MULTI-PÁGINA:
-
-REQUISITOS GENERALES:
-- Usa solo HTML, CSS y JavaScript puro (sin frameworks).
-- No dependas de librerías externas.
-- El estilo puede ser sencillo pero ordenado y legible.
-- El idioma de la interfaz debe ser ESPAÑOL.
-- Respeta la organización por FASES (F1, F2…) y vídeos.
-
-2.1. Estructura de archivos HTML a generar
-
-Quiero que me devuelvas el código de estos archivos (cada uno en su bloque de código separado):
-
-1) index.html  
-2) fase-F1.html (si existe la fase 1)  
-3) fase-F2.html (si existe la fase 2)  
-4) etc. para todas las fases que aparezcan en las transcripciones.
-
-IMPORTANTE:
-- En cada archivo HTML, incluye el `<head>` completo (doctype, meta charset, título, estilos, etc.).
-- Puedes repetir el CSS en cada archivo para simplificar (no pasa nada).
-- Usa una misma barra de navegación en todos los archivos con enlaces a:
-  - Inicio (index.html)
-  - Cada fase detectada: F1, F2, F3, etc. (ej: fase-F1.html, fase-F2.html…)
-
-2.2. Contenido de index.html
-
-El `index.html` debe ser una portada/resumen con:
-
-- Un título general: "Formación Klinikare / CliniQuer".
-- Un pequeño texto explicando:
-  - Que los vídeos están organizados por fases.
-  - Que cada fase tiene su propia página.
-  - Que hay cuestionarios tipo test al final de cada fase.
-- Una sección "Listado de fases":
-  - Una tarjeta por fase (F1, F2, F3…).
-  - En cada tarjeta: 
-    - Título de la fase (resumen breve basado en el análisis).
-    - Lista de los vídeos de esa fase (con su código y título).
-    - Un botón/enlace a la página de esa fase: por ejemplo `fase-F1.html`.
-- Opcional: una pequeña nota recordando buenas prácticas para preguntar a la IA (si aplica por los contenidos).
-
-2.3. Contenido de cada página de fase (fase-F1.html, fase-F2.html, etc.)
-
-Para cada página de fase, estructura así:
-
-- Cabecera con:
-  - Título: "Fase F{{n}}: [nombre o descripción breve]".
-  - Párrafo introductorio con el objetivo de la fase (usa la síntesis global de la fase).
-
-- Sección "Vídeos de la fase":
-  - Para cada vídeo de esa fase (por ejemplo KK-F1-v1, KK-F1-v2…):
-    - Un bloque con:
-      - Código y título (ej.: "KK-F1-v1 – Introducción a la IA").
-      - Un resumen corto.
-      - Un bloque desplegable (puedes usar `<details><summary>…</summary>…</details>`) con:
-        - Resumen extendido del vídeo.
-        - Lista de ideas clave.
-        - Lista de errores típicos o puntos de atención (si los hay).
-
-- Sección "Manual / Guía rápida de la fase":
-  - Redacta un pequeño manual en texto (no hace falta HTML complejo, solo `<h3>`, `<p>`, `<ul>`).
-  - Enfocado a que alguien pueda leerlo sin ver los vídeos y aún así saber usar lo básico del tema de la fase.
-
-- Sección "Cuestionario de autoevaluación (tipo test)":
-  - Crea entre 5 y 10 preguntas tipo test por fase.
-  - Cada pregunta debe:
-    - Estar basada en los contenidos reales de los vídeos de la fase.
-    - Tener 3 o 4 opciones de respuesta.
-    - Indicar internamente cuál es la correcta (para que el JS pueda comprobar).
-  - Implementa un formulario sencillo con:
-    - Preguntas con opciones tipo `radio`.
-    - Un botón "Corregir".
-    - Un bloque de resultados que muestre:
-      - Cuántas respuestas correctas ha tenido el usuario.
-      - Un mensaje general según el porcentaje (ej: "Necesitas repasar", "Bien", "Excelente").
-    - Opción: mostrar un pequeño mensaje bajo cada pregunta indicando si esa pregunta se ha respondido bien o mal al corregir.
-
-IMPORTANTE: 
-- El JS debe ir al final del `<body>` dentro de `<script>`.
-- No uses librerías, solo JavaScript nativo.
-- Usa IDs o `data-` atributos para marcar qué opción es correcta.
-
-2.4. Interactividad mínima (JS) para el cuestionario
-
-Quiero un JS genérico que:
-- Recorra todas las preguntas del cuestionario de la fase.
-- Para cada pregunta:
-  - Compruebe si la opción seleccionada coincide con la respuesta correcta.
-- Cuente el número de aciertos.
-- Muestre:
-  - Nº de aciertos.
-  - Nº de preguntas totales.
-  - Un mensaje general según el porcentaje de acierto.
-- Opcional: añada a cada pregunta una clase CSS o texto "Correcto" / "Incorrecto".
-
-2.5. Estilo general (CSS)
-
-Mantén un estilo limpio:
-- Fondo claro.
-- Tipografía sans-serif.
-- Contenedores tipo "tarjeta" para cada bloque.
-- Barra de navegación sencilla con enlaces a las fases.
-- Botones sencillos pero visibles para:
-  - "Ir a la fase F{{n}}".
-  - "Corregir cuestionario".
-
---------------------------------
-FORMATO DE LA RESPUESTA
---------------------------------
-
-Quiero que tu respuesta siga este orden:
-
-1) BLOQUE 1 – ANÁLISIS Y SÍNTESIS (solo texto, bien estructurado, sin HTML)
-2) BLOQUE 2 – HTML
-
-Dentro del BLOQUE 2, dame cada archivo HTML en un bloque de código separado así:
-
-- Comentario indicando el nombre del archivo.
-- Luego el contenido completo.
-
-Ejemplo de formato:
-
-[ARCHIVO: index.html]
-```html
-...código...
-```
-
-[ARCHIVO: fase-F1.html]
-```html
-...código...
-```
-
-Y así sucesivamente para cada fase que detectes.
-Si por límite de longitud no puedes generar todos los HTML en una sola respuesta, prioriza:
-1) index.html
-2) la fase más baja (por ejemplo F1)
-y luego indica qué quedaría pendiente.
-
-Con todo esto, genera ahora el análisis y la estructura HTML en base a las transcripciones proporcionadas."""
-
-    return prompt
-
-
-def recopilar_estadisticas_video(video_path, duracion_transcripcion, caracteres_transcripcion):
-    """Recopila estadísticas detalladas de un vídeo procesado"""
-    try:
-        # Obtener información básica del archivo
-        video_stats = video_path.stat()
-        tamaño_mb = video_stats.st_size / (1024 * 1024)
-        
-        # Información del nombre del archivo
-        nombre_archivo = video_path.name
-        codigo_video = extraer_codigo_video(nombre_archivo)
-        
-        # Calcular estadísticas de transcripción
-        palabras_transcripcion = len(caracteres_transcripcion.split()) if caracteres_transcripcion else 0
-        velocidad_transcripcion = palabras_transcripcion / (duracion_transcripcion / 60) if duracion_transcripcion > 0 else 0
-        
-        estadisticas = {
-            'nombre_archivo': nombre_archivo,
-            'codigo_video': codigo_video,
-            'tamaño_mb': round(tamaño_mb, 2),
-            'duracion_segundos': round(duracion_transcripcion, 2),
-            'duracion_formateada': f"{int(duracion_transcripcion//60):02d}:{int(duracion_transcripcion%60):02d}",
-            'caracteres_transcripcion': len(caracteres_transcripcion) if caracteres_transcripcion else 0,
-            'palabras_transcripcion': palabras_transcripcion,
-            'velocidad_palabras_min': round(velocidad_transcripcion, 1),
-            'fecha_procesamiento': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        
-        return estadisticas
-    except Exception as e:
-        print(f"⚠️ Error al recopilar estadísticas de {video_path}: {e}")
-        return None
-
-
-def extraer_codigo_video(nombre_archivo):
-    """Extrae el código KLC-TX-vY del nombre del archivo"""
-    import re
-    match = re.search(r'KLC-T\d+-v\d+', nombre_archivo)
-    return match.group(0) if match else "Sin código"
-
-
-def generar_tabla_estadisticas(lista_estadisticas, output_dir):
-    """Genera tabla HTML con estadísticas detalladas de todos los vídeos"""
-    try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        archivo_estadisticas = output_dir / f"estadisticas_procesamiento_{timestamp}.html"
-        
-        # Calcular totales
-        total_videos = len(lista_estadisticas)
-        total_duracion = sum(est['duracion_segundos'] for est in lista_estadisticas if est)
-        total_caracteres = sum(est['caracteres_transcripcion'] for est in lista_estadisticas if est)
-        total_palabras = sum(est['palabras_transcripcion'] for est in lista_estadisticas if est)
-        total_tamaño = sum(est['tamaño_mb'] for est in lista_estadisticas if est)
-        
-        promedio_velocidad = sum(est['velocidad_palabras_min'] for est in lista_estadisticas if est and est['velocidad_palabras_min'] > 0) / total_videos if total_videos > 0 else 0
-        
-        # Formatear duración total
-        horas = int(total_duracion // 3600)
-        minutos = int((total_duracion % 3600) // 60)
-        segundos = int(total_duracion % 60)
-        duracion_total_formateada = f"{horas:02d}:{minutos:02d}:{segundos:02d}"
-        
-        html_content = f"""<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Estadísticas de Procesamiento - Klinikare Transcriptor</title>
-    <style>
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            margin: 0;
-            padding: 20px;
-            background-color: #f5f7fa;
-            color: #333;
-        }}
-        .container {{
-            max-width: 1400px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 12px;
-            box-shadow: 0 4px 20px rgba(0,0,0,0.1);
-            overflow: hidden;
-        }}
-        .header {{
-            background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%);
-            color: white;
-            padding: 30px;
-            text-align: center;
-        }}
-        .header h1 {{
-            margin: 0;
-            font-size: 2.2rem;
-            font-weight: 700;
-        }}
-        .header p {{
-            margin: 10px 0 0 0;
-            opacity: 0.9;
-            font-size: 1.1rem;
-        }}
-        
-        .stats-summary {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 20px;
-            padding: 30px;
-            background-color: #f8fafc;
-            border-bottom: 2px solid #e2e8f0;
-        }}
-        .stat-card {{
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-            text-align: center;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.08);
-            border: 1px solid #e2e8f0;
-        }}
-        .stat-card h3 {{
-            margin: 0 0 10px 0;
-            color: #1e40af;
-            font-size: 0.9rem;
-            text-transform: uppercase;
-            font-weight: 600;
-            letter-spacing: 0.5px;
-        }}
-        .stat-card .number {{
-            font-size: 2rem;
-            font-weight: 700;
-            color: #1f2937;
-            margin: 0;
-        }}
-        .stat-card .unit {{
-            color: #6b7280;
-            font-size: 0.9rem;
-            margin-top: 5px;
-        }}
-        
-        .table-container {{
-            padding: 30px;
-            overflow-x: auto;
-        }}
-        .table-title {{
-            font-size: 1.5rem;
-            font-weight: 600;
-            color: #1f2937;
-            margin-bottom: 20px;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }}
-        
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-            background: white;
-            border-radius: 8px;
-            overflow: hidden;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.06);
-        }}
-        th {{
-            background: linear-gradient(135deg, #1e40af 0%, #1d4ed8 100%);
-            color: white;
-            padding: 15px 12px;
-            text-align: left;
-            font-weight: 600;
-            font-size: 0.9rem;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }}
-        td {{
-            padding: 12px;
-            border-bottom: 1px solid #e5e7eb;
-            vertical-align: top;
-        }}
-        tr:nth-child(even) {{
-            background-color: #f8fafc;
-        }}
-        tr:hover {{
-            background-color: #f1f5f9;
-        }}
-        .codigo {{
-            font-family: 'Courier New', monospace;
-            background: #f3f4f6;
-            padding: 4px 8px;
-            border-radius: 4px;
-            font-weight: 600;
-            color: #1f2937;
-        }}
-        .numero {{
-            text-align: right;
-            font-weight: 600;
-        }}
-        .fecha {{
-            font-size: 0.85rem;
-            color: #6b7280;
-        }}
-        .duracion {{
-            font-family: 'Courier New', monospace;
-            font-weight: 600;
-        }}
-        .tamaño-grande {{ color: #dc2626; }}
-        .tamaño-medio {{ color: #f59e0b; }}
-        .tamaño-pequeño {{ color: #16a34a; }}
-        
-        .footer {{
-            text-align: center;
-            padding: 20px;
-            background-color: #f8fafc;
-            color: #6b7280;
-            font-size: 0.9rem;
-            border-top: 1px solid #e2e8f0;
-        }}
-        
-        @media (max-width: 768px) {{
-            .stats-summary {{
-                grid-template-columns: 1fr 1fr;
-            }}
-            .table-container {{
-                padding: 15px;
-            }}
-            th, td {{
-                padding: 8px 6px;
-                font-size: 0.85rem;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>📊 Estadísticas de Procesamiento</h1>
-            <p>Klinikare Video Whisper-Transcriptor | {datetime.now().strftime("%d de %B de %Y, %H:%M")}</p>
-        </div>
-        
-        <div class="stats-summary">
-            <div class="stat-card">
-                <h3>Total Vídeos</h3>
-                <div class="number">{total_videos}</div>
-                <div class="unit">archivos procesados</div>
-            </div>
-            <div class="stat-card">
-                <h3>Duración Total</h3>
-                <div class="number">{duracion_total_formateada}</div>
-                <div class="unit">horas:minutos:segundos</div>
-            </div>
-            <div class="stat-card">
-                <h3>Tamaño Total</h3>
-                <div class="number">{total_tamaño:.1f}</div>
-                <div class="unit">MB</div>
-            </div>
-            <div class="stat-card">
-                <h3>Palabras Totales</h3>
-                <div class="number">{total_palabras:,}</div>
-                <div class="unit">palabras transcritas</div>
-            </div>
-            <div class="stat-card">
-                <h3>Caracteres Totales</h3>
-                <div class="number">{total_caracteres:,}</div>
-                <div class="unit">caracteres</div>
-            </div>
-            <div class="stat-card">
-                <h3>Velocidad Promedio</h3>
-                <div class="number">{promedio_velocidad:.1f}</div>
-                <div class="unit">palabras/minuto</div>
-            </div>
-        </div>
-        
-        <div class="table-container">
-            <h2 class="table-title">📋 Detalles por Vídeo</h2>
-            <table>
-                <thead>
-                    <tr>
-                        <th>Código</th>
-                        <th>Archivo</th>
-                        <th>Duración</th>
-                        <th>Tamaño (MB)</th>
-                        <th>Palabras</th>
-                        <th>Caracteres</th>
-                        <th>Vel. (pal/min)</th>
-                        <th>Procesado</th>
-                    </tr>
-                </thead>
-                <tbody>"""
-        
-        # Añadir filas de datos
-        for est in lista_estadisticas:
-            if not est:
-                continue
-                
-            # Clasificar tamaño del archivo
-            if est['tamaño_mb'] > 100:
-                clase_tamaño = "tamaño-grande"
-            elif est['tamaño_mb'] > 50:
-                clase_tamaño = "tamaño-medio"
-            else:
-                clase_tamaño = "tamaño-pequeño"
-            
-            html_content += f"""
-                    <tr>
-                        <td><span class="codigo">{est['codigo_video']}</span></td>
-                        <td>{est['nombre_archivo']}</td>
-                        <td class="duracion numero">{est['duracion_formateada']}</td>
-                        <td class="numero {clase_tamaño}">{est['tamaño_mb']}</td>
-                        <td class="numero">{est['palabras_transcripcion']:,}</td>
-                        <td class="numero">{est['caracteres_transcripcion']:,}</td>
-                        <td class="numero">{est['velocidad_palabras_min']}</td>
-                        <td class="fecha">{est['fecha_procesamiento']}</td>
-                    </tr>"""
-        
-        html_content += f"""
-                </tbody>
-            </table>
-        </div>
-        
-        <div class="footer">
-            <p>Generado automáticamente por Klinikare Video Whisper-Transcriptor<br>
-            🕐 Tiempo total de vídeo: {duracion_total_formateada} | 💾 Espacio total: {total_tamaño:.1f} MB | 📝 {total_palabras:,} palabras transcritas</p>
-        </div>
-    </div>
-</body>
-</html>"""
-        
-        with open(archivo_estadisticas, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        print(f"📊 Estadísticas guardadas en: {archivo_estadisticas}")
-        return archivo_estadisticas
-        
-    except Exception as e:
-        print(f"❌ Error al generar tabla de estadísticas: {e}")
-        return None
-    
-    prompt = f"""Eres un experto diseñador de materiales educativos y plataformas de e-learning para empresas. Tu misión es crear una GUÍA DE FORMACIÓN Y ESTUDIO INTERACTIVA de alta calidad para Klinikare / CliniQuer.
-
-🎯 OBJETIVO PRINCIPAL: Crear una plataforma web de formación profesional que sirva como:
-- Guía de estudio completa y estructurada
-- Material de consulta rápida para empleados
-- Sistema de autoevaluación y seguimiento del aprendizaje
-- Recurso de onboarding para nuevos usuarios
-- Manual de referencia interactivo
-
-Te voy a dar transcripciones de varios vídeos de formación empresarial. 
-Cada vídeo sigue esta nomenclatura en el nombre de archivo:
-
-- Siempre empieza por "KLC" (de Klinikare / CliniQuer).
-- Luego "-T" + número de tema. Ejemplo: T1, T2, T3…
-- Luego "-v" + número de vídeo dentro de ese tema. Ejemplo: v1, v2, v3…
-- Después del nombre, suele venir un título descriptivo. 
-  Ejemplo: "KLC-T1-v1-Introducción a la IA.mp4"
-
-Quiero dos grandes bloques de salida:
-
-1) ANÁLISIS EDUCATIVO Y ESTRUCTURACIÓN PEDAGÓGICA
-2) PLATAFORMA WEB DE FORMACIÓN INTERACTIVA (DISEÑO MODERNO + FUNCIONALIDADES EDUCATIVAS)
-
---------------------------------
-BLOQUE 0 – ENTRADA (TRANSCRIPCIONES)
---------------------------------
-
-Estas son las transcripciones consolidadas que debes analizar:
-
-{transcripciones_consolidadas}
-
-(Nota: las transcripciones ya vienen agrupadas por archivo. Cada bloque empieza con algo parecido a:
-"📂 KLC-T1-v1-Introducción a la IA.mp4" seguido del contenido).
-
---------------------------------
-BLOQUE 1 – ANÁLISIS Y SÍNTESIS
---------------------------------
-
-Primero quiero un análisis en texto, SIN generar HTML todavía.
-
-1.1. Identificación de estructura por temas y vídeos
-- Detecta todos los temas: T1, T2, T3, etc. a partir de los nombres de archivo (KLC-T{{tema}}-v{{n}}).
-- Dentro de cada tema, lista los vídeos en orden (v1, v2, v3…).
-- Para cada vídeo, indica:
-  - Código: por ejemplo "KLC-T1-v1"
-  - Título (si aparece en el nombre)
-  - Tema al que pertenece
-
-1.2. Resumen corto por vídeo
-Para cada vídeo, genera un resumen muy breve (2–3 frases) que explique:
-- De qué trata.
-- Qué quiere que aprenda el usuario al final.
-
-1.3. Resumen extendido por vídeo
-Para cada vídeo, genera:
-- Un resumen en 1–3 párrafos.
-- Una lista de 4–8 ideas clave o puntos importantes.
-- Opcional: una lista de "errores típicos" o "malos usos" relacionados con el tema, si se deducen del contenido.
-
-1.4. Síntesis global por tema
-Para cada tema T1, T2, etc.:
-- Explica en 1–2 párrafos cuál es el objetivo del tema.
-- Indica el perfil objetivo (por ejemplo: recepción, dirección, clínicos, etc. si se intuye).
-- Resume qué sabrá hacer el usuario al terminar el tema.
-
-Haz este BLOQUE 1 en texto estructurado con títulos y subtítulos, pero sin HTML.
-
-Cuando termines el BLOQUE 1, continúa con el BLOQUE 2.
-
---------------------------------
-BLOQUE 2 – GENERACIÓN WEB HTML
---------------------------------
-
-Ahora quiero que conviertas todo esto en una pequeña "web de formación" en HTML, NO en una sola página, sino MULTI-PÁGINA:
-
-REQUISITOS GENERALES:
-- Usa solo HTML, CSS y JavaScript puro (sin frameworks).
-- No dependas de librerías externas.
-- El estilo puede ser sencillo pero ordenado y legible.
-- El idioma de la interfaz debe ser ESPAÑOL.
-- Respeta la organización por TEMAS (T1, T2…) y vídeos.
-
-2.1. Estructura de archivos HTML a generar
-
-Quiero que me devuelvas el código de estos archivos con esta estructura específica:
-
-📁 ESTRUCTURA DE DIRECTORIOS:
-```
-/
-├── index-openai.html             (Página principal OpenAI - DIRECTORIO RAÍZ)
-├── index-ollama.html             (Página principal Ollama - DIRECTORIO RAÍZ)  
-└── www/                          (Carpeta para archivos web)
-    ├── openai/                   (Archivos generados con OpenAI)
-    │   ├── tema-T1.html
-    │   ├── tema-T2.html
-    │   └── tema-T3.html          (etc.)
-    └── ollama/                   (Archivos generados con Ollama)
-        ├── tema-T1.html
-        ├── tema-T2.html
-        └── tema-T3.html          (etc.)
-```
-
-📋 ARCHIVOS A GENERAR (cada uno en su bloque de código separado):
-
-1) **index.html** (EN EL DIRECTORIO RAÍZ - se renombrará según el motor)
-   - Página de bienvenida y navegación principal
-   - Enlaces relativos a los archivos en www/motor/
-   - Ejemplo de enlaces: `<a href="www/openai/tema-T1.html">Tema 1</a>` o `<a href="www/ollama/tema-T1.html">Tema 1</a>`
-
-2) **www/tema-T1.html** (se moverán a www/motor/ automáticamente)
-3) **www/tema-T2.html** (se moverán a www/motor/ automáticamente)  
-4) etc. para todos los temas que aparezcan en las transcripciones.
-
-⚠️ IMPORTANTE PARA LOS ENLACES:
-- El index.html está en la raíz, usa rutas: `www/motor/tema-TX.html` (motor será openai u ollama)
-- Los archivos tema-TX.html están en www/motor/, usan rutas: `../../index-motor.html` para volver al inicio
-- Entre temas: `tema-T1.html`, `tema-T2.html` (sin ../ porque están en la misma carpeta)
-
-IMPORTANTE:
-- En cada archivo HTML, incluye el `<head>` completo (doctype, meta charset, título, estilos, etc.).
-- Puedes repetir el CSS en cada archivo para simplificar (no pasa nada).
-- Usa una misma barra de navegación en todos los archivos con enlaces ADAPTADOS A SU UBICACIÓN:
-  
-  📍 **Para index.html (en raíz)**:
-  - Inicio: # (misma página) 
-  - Temas: www/motor/tema-T1.html, www/motor/tema-T2.html, etc. (motor = openai u ollama)
-  
-  📍 **Para tema-TX.html (en www/motor/)**:
-  - Inicio: ../../index-motor.html (motor = openai u ollama)
-  - Otros temas: tema-T1.html, tema-T2.html, etc. (sin ../../ porque están en la misma carpeta)
-
-2.2. Contenido de index.html (EN EL DIRECTORIO RAÍZ)
-
-El `index.html` debe ser una portada/resumen con:
-
-- Un título general: "Formación Klinikare / CliniQuer".
-- Un pequeño texto explicando:
-  - Que los vídeos están organizados por temas.
-  - Que cada tema tiene su propia página en la carpeta www/motor/.
-  - Que hay cuestionarios tipo test al final de cada tema.
-- Una sección "Listado de temas":
-  - Una tarjeta por tema (T1, T2, T3…).
-  - En cada tarjeta: 
-    - Título del tema (resumen breve basado en el análisis).
-    - Lista de los vídeos de ese tema (con su código y título).
-    - Un botón/enlace a la página de ese tema usando rutas relativas: `www/motor/tema-T1.html`, `www/motor/tema-T2.html`, etc. (donde motor = openai u ollama).
-- Opcional: una pequeña nota recordando buenas prácticas para preguntar a la IA (si aplica por los contenidos).
-
-2.3. Contenido de cada página de tema (tema-T1.html, tema-T2.html, etc.)
-
-Para cada página de tema, estructura así:
-
-- Cabecera con:
-  - Título: "Tema T{{n}}: [nombre o descripción breve]".
-  - Párrafo introductorio con el objetivo del tema (usa la síntesis global del tema).
-
-- Sección "Vídeos del tema":
-  - Para cada vídeo de ese tema (por ejemplo KLC-T1-v1, KLC-T1-v2…):
+  - Para cada vídeo de esa fase (por ejemplo KK-F1-v1, KK-F1-v2…):
     - Un bloque con:
-      - Código y título (ej.: "KLC-T1-v1 – Introducción a la IA").
+      - Código y título (ej.: "KK-F1-v1 – Introducción a la IA").
       - Un resumen corto.
       - Un bloque desplegable (puedes usar `<details><summary>…</summary>…</details>`) con:
         - Resumen extendido del vídeo.
         - Lista de ideas clave.
         - Lista de errores típicos o puntos de atención (si los hay).
 
-- Sección "Manual / Guía rápida del tema":
+- Sección "Manual / Guía rápida de la fase":
   - Redacta un pequeño manual en texto (no hace falta HTML complejo, solo `<h3>`, `<p>`, `<ul>`).
-  - Enfocado a que alguien pueda leerlo sin ver los vídeos y aún así saber usar lo básico del tema del tema.
+  - Enfocado a que alguien pueda leerlo sin ver los vídeos y aún así saber usar lo básico del tema de la fase.
 
 - Sección "Cuestionario de autoevaluación (tipo test)":
-  - Crea entre 5 y 10 preguntas tipo test por tema.
+  - Crea entre 5 y 10 preguntas tipo test por fase.
   - Cada pregunta debe:
-    - Estar basada en los contenidos reales de los vídeos del tema.
+    - Estar basada en los contenidos reales de los vídeos de la fase.
     - Tener 3 o 4 opciones de respuesta.
     - Indicar internamente cuál es la correcta (para que el JS pueda comprobar).
   - Implementa un formulario sencillo con:
@@ -1263,7 +928,7 @@ IMPORTANTE:
 2.4. Interactividad mínima (JS) para el cuestionario
 
 Quiero un JS genérico que:
-- Recorra todas las preguntas del cuestionario del tema.
+- Recorra todas las preguntas del cuestionario de la fase.
 - Para cada pregunta:
   - Compruebe si la opción seleccionada coincide con la respuesta correcta.
 - Cuente el número de aciertos.
@@ -1279,270 +944,57 @@ Mantén un estilo limpio:
 - Fondo claro.
 - Tipografía sans-serif.
 - Contenedores tipo "tarjeta" para cada bloque.
-- Barra de navegación sencilla con enlaces a los temas.
+- Barra de navegación sencilla con enlaces a las fases.
 - Botones sencillos pero visibles para:
-  - "Ir al tema T{{n}}".
+  - "Ir a la fase F{{n}}".
   - "Corregir cuestionario".
 
-Con este análisis, genera ahora el análisis completo y la estructura HTML en base a las transcripciones proporcionadas.
-
 --------------------------------
 FORMATO DE LA RESPUESTA
 --------------------------------
 
-Tu respuesta debe seguir este orden exacto:
-
-**1) BLOQUE 1 – ANÁLISIS Y SÍNTESIS** (solo texto, bien estructurado, sin HTML)
-
-**2) BLOQUE 2 – ARCHIVOS HTML**
-
-Dentro del BLOQUE 2, dame cada archivo HTML en un bloque de código separado usando EXACTAMENTE este formato:
-
-```
-[ARCHIVO: index.html]
-```html
-<!DOCTYPE html>
-<html lang="es">
-...código completo del index.html...
-```
-
-[ARCHIVO: www/tema-T1.html]
-```html
-<!DOCTYPE html>
-<html lang="es">
-...código completo del tema T1...
-```
-
-[ARCHIVO: www/tema-T2.html]
-```html
-<!DOCTYPE html>
-<html lang="es">
-...código completo del tema T2...
-```
+Quiero que tu respuesta siga este orden:
 
-Y así sucesivamente para cada tema detectado.
-
-🔥 INSTRUCCIONES CRÍTICAS:
-1. **SIEMPRE** genera un archivo index.html
-2. **SIEMPRE** genera un archivo tema-TX.html por CADA tema que detectes (T1, T2, T3, etc.)
-3. **NO OMITAS** ningún tema
-4. **USA EXACTAMENTE** el formato [ARCHIVO: nombre] antes de cada ```html
-5. **INCLUYE TODO** el código HTML completo en cada archivo
-6. **VERIFICA** que generas al menos 2 archivos (index + al menos 1 tema)
-
-Si detectas 3 temas (T1, T2, T3), debes generar 4 archivos:
-- [ARCHIVO: index.html]
-- [ARCHIVO: www/tema-T1.html] 
-- [ARCHIVO: www/tema-T2.html]
-- [ARCHIVO: www/tema-T3.html]
-
-⚠️ IMPORTANTE:
-- Usa EXACTAMENTE el formato [ARCHIVO: nombre] antes de cada bloque
-- Para el index.html usa: [ARCHIVO: index.html]
-- Para los temas usa: [ARCHIVO: www/tema-TX.html]
-- DEBES generar UN ARCHIVO POR CADA TEMA detectado en las transcripciones
-- Incluye el código HTML completo con DOCTYPE, head, body, estilos CSS y JavaScript
-- Asegúrate de que las rutas de navegación sean correctas según la estructura de directorios
-- NO omitas ningún tema, genera TODOS los archivos HTML necesarios
-
-🔥 REQUISITO CRÍTICO: Debes generar:
-1. Un archivo index.html
-2. Un archivo tema-TX.html por cada tema T1, T2, T3, etc. que detectes
-3. Cada tema debe tener su página completa con navegación, contenido y cuestionario
-
-Ejemplo de salida esperada si hay 2 temas:
-- [ARCHIVO: index.html] + código HTML
-- [ARCHIVO: www/tema-T1.html] + código HTML  
-- [ARCHIVO: www/tema-T2.html] + código HTML"""
+1) BLOQUE 1 – ANÁLISIS Y SÍNTESIS (solo texto, bien estructurado, sin HTML)
+2) BLOQUE 2 – HTML
 
-    return prompt
-    """Crea un prompt simplificado para Ollama que sea menos pesado de procesar"""
-    
-    # Extraer solo una muestra de las transcripciones para no sobrecargar a Ollama
-    lineas = transcripciones_consolidadas.split('\n')
-    muestra = '\n'.join(lineas[:150])  # Solo las primeras 150 líneas
-    
-    prompt = f"""Eres un analista educativo experto. Analiza estas transcripciones de videos formativos y genera documentación web.
+Dentro del BLOQUE 2, dame cada archivo HTML en un bloque de código separado así:
 
-TRANSCRIPCIONES (muestra):
-{muestra}
+- Comentario indicando el nombre del archivo.
+- Luego el contenido completo.
 
-INSTRUCCIONES:
-1) Los videos siguen formato: KK-FX-vY (donde X=tema, Y=video)
-2) Genera EXACTAMENTE estos archivos con formato [ARCHIVO: nombre]:
+Ejemplo de formato:
 
 [ARCHIVO: index.html]
 ```html
-<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <title>Formación Klinikare</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; }}
-        .tema {{ border: 1px solid #ddd; padding: 15px; margin: 10px 0; }}
-        .btn {{ background: #007bff; color: white; padding: 10px; text-decoration: none; }}
-    </style>
-</head>
-<body>
-    <h1>Formación Klinikare / CliniQuer</h1>
-    <div class="tema">
-        <h3>Tema 1: Introducción a IA</h3>
-        <p>Videos sobre uso básico de IA en la plataforma</p>
-        <a href="www/ollama/tema-T1.html" class="btn">Ver Tema 1</a>
-    </div>
-    <div class="tema">
-        <h3>Tema 2: Gestión de Pacientes</h3>
-        <p>Manejo de agendas y pacientes</p>
-        <a href="www/ollama/tema-T2.html" class="btn">Ver Tema 2</a>
-    </div>
-</body>
-</html>
+...código...
 ```
 
-[ARCHIVO: www/tema-T1.html]
+[ARCHIVO: fase-F1.html]
 ```html
-<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <title>Tema 1 - IA</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; }}
-        .video {{ border-left: 4px solid #007bff; padding: 10px; margin: 10px 0; }}
-        .nav {{ background: #f8f9fa; padding: 10px; margin-bottom: 20px; }}
-        .quiz {{ background: #e9ecef; padding: 15px; margin-top: 20px; }}
-    </style>
-</head>
-<body>
-    <div class="nav">
-        <a href="../../index-ollama.html">← Inicio</a> |
-        <a href="tema-T2.html">Tema 2 →</a>
-    </div>
-    
-    <h1>Tema 1: Introducción a la IA</h1>
-    
-    <div class="video">
-        <h3>Video 1: Introducción a la IA</h3>
-        <p><strong>Resumen:</strong> Conceptos básicos sobre el uso de IA en CliniQuer.</p>
-        <p><strong>Ideas clave:</strong> IA disponible 24/7, importancia de preguntas claras, ejemplos prácticos.</p>
-    </div>
-    
-    <div class="quiz">
-        <h3>Cuestionario</h3>
-        <form id="quiz1">
-            <p><strong>1. ¿Cuál es la ventaja principal de la IA en CliniQuer?</strong></p>
-            <input type="radio" name="q1" value="a"> Cuesta menos<br>
-            <input type="radio" name="q1" value="b" data-correct="true"> Está disponible 24/7<br>
-            <input type="radio" name="q1" value="c"> Es más rápida<br>
-            
-            <p><strong>2. ¿Cómo debes hacer las preguntas a la IA?</strong></p>
-            <input type="radio" name="q2" value="a" data-correct="true"> Claras y específicas<br>
-            <input type="radio" name="q2" value="b"> Cortas y simples<br>
-            <input type="radio" name="q2" value="c"> Con muchas preguntas juntas<br>
-            
-            <button type="button" onclick="corregirQuiz()">Corregir</button>
-            <div id="resultado1"></div>
-        </form>
-    </div>
-    
-    <script>
-        function corregirQuiz() {{
-            const form = document.getElementById('quiz1');
-            const correctas = form.querySelectorAll('input[data-correct="true"]');
-            let aciertos = 0;
-            
-            correctas.forEach(input => {{
-                if (input.checked) aciertos++;
-            }});
-            
-            const total = correctas.length;
-            const porcentaje = (aciertos / total) * 100;
-            let mensaje = "";
-            
-            if (porcentaje >= 80) mensaje = "¡Excelente! Has entendido perfectamente.";
-            else if (porcentaje >= 60) mensaje = "Bien, pero puedes mejorar.";
-            else mensaje = "Necesitas repasar el contenido.";
-            
-            document.getElementById('resultado1').innerHTML = 
-                `<p>Aciertos: ${{aciertos}}/${{total}} (${{porcentaje}}%)</p><p>${{mensaje}}</p>`;
-        }}
-    </script>
-</body>
-</html>
+...código...
 ```
 
-[ARCHIVO: www/tema-T2.html]
-```html
-<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <title>Tema 2 - Gestión</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; }}
-        .video {{ border-left: 4px solid #28a745; padding: 10px; margin: 10px 0; }}
-        .nav {{ background: #f8f9fa; padding: 10px; margin-bottom: 20px; }}
-        .quiz {{ background: #e9ecef; padding: 15px; margin-top: 20px; }}
-    </style>
-</head>
-<body>
-    <div class="nav">
-        <a href="../../index-ollama.html">← Inicio</a> |
-        <a href="tema-T1.html">← Tema 1</a>
-    </div>
-    
-    <h1>Tema 2: Gestión de Pacientes</h1>
-    
-    <div class="video">
-        <h3>Video 1: Introducción</h3>
-        <p><strong>Resumen:</strong> Conceptos básicos de gestión en la plataforma.</p>
-    </div>
-    
-    <div class="video">
-        <h3>Video 2: Agenda de pacientes</h3>
-        <p><strong>Resumen:</strong> Cómo manejar las citas y agenda de pacientes.</p>
-    </div>
-    
-    <div class="quiz">
-        <h3>Cuestionario</h3>
-        <form id="quiz2">
-            <p><strong>1. ¿Qué permite hacer el módulo de gestión?</strong></p>
-            <input type="radio" name="q1" value="a" data-correct="true"> Manejar citas y pacientes<br>
-            <input type="radio" name="q1" value="b"> Solo ver información<br>
-            <input type="radio" name="q1" value="c"> Enviar emails<br>
-            
-            <button type="button" onclick="corregirQuiz2()">Corregir</button>
-            <div id="resultado2"></div>
-        </form>
-    </div>
-    
-    <script>
-        function corregirQuiz2() {{
-            const aciertos = document.querySelector('input[name="q1"][data-correct="true"]').checked ? 1 : 0;
-            const mensaje = aciertos > 0 ? "¡Correcto!" : "Revisa el contenido.";
-            document.getElementById('resultado2').innerHTML = `<p>Resultado: ${{mensaje}}</p>`;
-        }}
-    </script>
-</body>
-</html>
-```
+Y así sucesivamente para cada fase que detectes.
+Si por límite de longitud no puedes generar todos los HTML en una sola respuesta, prioriza:
+1) index.html
+2) la fase más baja (por ejemplo F1)
+y luego indica qué quedaría pendiente.
 
-Genera EXACTAMENTE estos 3 archivos con este formato."""
+Con todo esto, genera ahora el análisis y la estructura HTML en base a las transcripciones proporcionadas."""
 
     return prompt
-    """Crea el prompt maestro para generar documentación con las transcripciones"""
     
     prompt = f"""Quiero que actúes como analista y diseñador de material formativo para la plataforma Klinikare / CliniQuer.
 
 Te voy a dar transcripciones de varios vídeos de formación. 
 Cada vídeo sigue esta nomenclatura en el nombre de archivo:
 
-- Siempre empieza por "KLC" (de Klinikare / CliniQuer).
-- Luego "-T" + número de tema. Ejemplo: T1, T2, T3…
-- Luego "-v" + número de vídeo dentro de ese tema. Ejemplo: v1, v2, v3…
+- Siempre empieza por "KK" (de Klinikare).
+- Luego "-F" + número de fase. Ejemplo: F1, F2, F3…
+- Luego "-v" + número de vídeo dentro de esa fase. Ejemplo: v1, v2, v3…
 - Después del nombre, suele venir un título descriptivo. 
-  Ejemplo: "KLC-T1-v1-Introducción a la IA.mp4"
+  Ejemplo: "KK-F1-v1-Introducción a la IA.mp4"
 
 Quiero dos grandes bloques de salida:
 
@@ -1558,7 +1010,7 @@ Estas son las transcripciones consolidadas que debes analizar:
 {transcripciones_consolidadas}
 
 (Nota: las transcripciones ya vienen agrupadas por archivo. Cada bloque empieza con algo parecido a:
-"📂 KLC-T1-v1-Introducción a la IA.mp4" seguido del contenido).
+"📂 KK-F1-v1-Introducción a la IA.mp4" seguido del contenido).
 
 --------------------------------
 BLOQUE 1 – ANÁLISIS Y SÍNTESIS
@@ -1566,13 +1018,13 @@ BLOQUE 1 – ANÁLISIS Y SÍNTESIS
 
 Primero quiero un análisis en texto, SIN generar HTML todavía.
 
-1.1. Identificación de estructura por temas y vídeos
-- Detecta todos los temas: T1, T2, T3, etc. a partir de los nombres de archivo (KLC-T{{tema}}-v{{n}}).
-- Dentro de cada tema, lista los vídeos en orden (v1, v2, v3…).
+1.1. Identificación de estructura por fases y vídeos
+- Detecta todas las fases: F1, F2, F3, etc. a partir de los nombres de archivo (KK-F{{fase}}-v{{n}}).
+- Dentro de cada fase, lista los vídeos en orden (v1, v2, v3…).
 - Para cada vídeo, indica:
-  - Código: por ejemplo "KLC-T1-v1"
+  - Código: por ejemplo "KK-F1-v1"
   - Título (si aparece en el nombre)
-  - Tema al que pertenece
+  - Fase a la que pertenece
 
 1.2. Resumen corto por vídeo
 Para cada vídeo, genera un resumen muy breve (2–3 frases) que explique:
@@ -1585,11 +1037,11 @@ Para cada vídeo, genera:
 - Una lista de 4–8 ideas clave o puntos importantes.
 - Opcional: una lista de "errores típicos" o "malos usos" relacionados con el tema, si se deducen del contenido.
 
-1.4. Síntesis global por tema
-Para cada tema T1, T2, etc.:
-- Explica en 1–2 párrafos cuál es el objetivo del tema.
+1.4. Síntesis global por fase
+Para cada fase F1, F2, etc.:
+- Explica en 1–2 párrafos cuál es el objetivo de la fase.
 - Indica el perfil objetivo (por ejemplo: recepción, dirección, clínicos, etc. si se intuye).
-- Resume qué sabrá hacer el usuario al terminar el tema.
+- Resume qué sabrá hacer el usuario al terminar la fase.
 
 Haz este BLOQUE 1 en texto estructurado con títulos y subtítulos, pero sin HTML.
 
@@ -1606,100 +1058,67 @@ REQUISITOS GENERALES:
 - No dependas de librerías externas.
 - El estilo puede ser sencillo pero ordenado y legible.
 - El idioma de la interfaz debe ser ESPAÑOL.
-- Respeta la organización por TEMAS (T1, T2…) y vídeos.
+- Respeta la organización por FASES (F1, F2…) y vídeos.
 
 2.1. Estructura de archivos HTML a generar
 
-Quiero que me devuelvas el código de estos archivos con esta estructura específica:
-
-📁 ESTRUCTURA DE DIRECTORIOS:
-```
-/
-├── index-openai.html             (Página principal OpenAI - DIRECTORIO RAÍZ)
-├── index-ollama.html             (Página principal Ollama - DIRECTORIO RAÍZ)  
-└── www/                          (Carpeta para archivos web)
-    ├── openai/                   (Archivos generados con OpenAI)
-    │   ├── tema-T1.html
-    │   ├── tema-T2.html
-    │   └── tema-T3.html          (etc.)
-    └── ollama/                   (Archivos generados con Ollama)
-        ├── tema-T1.html
-        ├── tema-T2.html
-        └── tema-T3.html          (etc.)
-```
-
-📋 ARCHIVOS A GENERAR (cada uno en su bloque de código separado):
-
-1) **index.html** (EN EL DIRECTORIO RAÍZ - se renombrará según el motor)
-   - Página de bienvenida y navegación principal
-   - Enlaces relativos a los archivos en www/motor/
-   - Ejemplo de enlaces: `<a href="www/openai/tema-T1.html">Tema 1</a>` o `<a href="www/ollama/tema-T1.html">Tema 1</a>`
-
-2) **www/tema-T1.html** (se moverán a www/motor/ automáticamente)
-3) **www/tema-T2.html** (se moverán a www/motor/ automáticamente)  
-4) etc. para todos los temas que aparezcan en las transcripciones.
+Quiero que me devuelvas el código de estos archivos (cada uno en su bloque de código separado):
 
-⚠️ IMPORTANTE PARA LOS ENLACES:
-- El index.html está en la raíz, usa rutas: `www/motor/tema-TX.html` (motor será openai u ollama)
-- Los archivos tema-TX.html están en www/motor/, usan rutas: `../../index-motor.html` para volver al inicio
-- Entre temas: `tema-T1.html`, `tema-T2.html` (sin ../ porque están en la misma carpeta)
+1) index.html  
+2) fase-F1.html (si existe la fase 1)  
+3) fase-F2.html (si existe la fase 2)  
+4) etc. para todas las fases que aparezcan en las transcripciones.
 
 IMPORTANTE:
 - En cada archivo HTML, incluye el `<head>` completo (doctype, meta charset, título, estilos, etc.).
 - Puedes repetir el CSS en cada archivo para simplificar (no pasa nada).
-- Usa una misma barra de navegación en todos los archivos con enlaces ADAPTADOS A SU UBICACIÓN:
-  
-  📍 **Para index.html (en raíz)**:
-  - Inicio: # (misma página) 
-  - Temas: www/motor/tema-T1.html, www/motor/tema-T2.html, etc. (motor = openai u ollama)
-  
-  📍 **Para tema-TX.html (en www/motor/)**:
-  - Inicio: ../../index-motor.html (motor = openai u ollama)
-  - Otros temas: tema-T1.html, tema-T2.html, etc. (sin ../../ porque están en la misma carpeta)
-
-2.2. Contenido de index.html (EN EL DIRECTORIO RAÍZ)
+- Usa una misma barra de navegación en todos los archivos con enlaces a:
+  - Inicio (index.html)
+  - Cada fase detectada: F1, F2, F3, etc. (ej: fase-F1.html, fase-F2.html…)
+
+2.2. Contenido de index.html
 
 El `index.html` debe ser una portada/resumen con:
 
 - Un título general: "Formación Klinikare / CliniQuer".
 - Un pequeño texto explicando:
-  - Que los vídeos están organizados por temas.
-  - Que cada tema tiene su propia página en la carpeta www/motor/.
-  - Que hay cuestionarios tipo test al final de cada tema.
-- Una sección "Listado de temas":
-  - Una tarjeta por tema (T1, T2, T3…).
+  - Que los vídeos están organizados por fases.
+  - Que cada fase tiene su propia página.
+  - Que hay cuestionarios tipo test al final de cada fase.
+- Una sección "Listado de fases":
+  - Una tarjeta por fase (F1, F2, F3…).
   - En cada tarjeta: 
-    - Título del tema (resumen breve basado en el análisis).
-    - Lista de los vídeos de ese tema (con su código y título).
-    - Un botón/enlace a la página de ese tema usando rutas relativas: `www/motor/tema-T1.html`, `www/motor/tema-T2.html`, etc. (donde motor = openai u ollama).
+    - Título de la fase (resumen breve basado en el análisis).
+    - Lista de los vídeos de esa fase (con su código y título).
+    - Un botón/enlace a la página de esa fase: por ejemplo `fase-F1.html`.
 - Opcional: una pequeña nota recordando buenas prácticas para preguntar a la IA (si aplica por los contenidos).
 
-2.3. Contenido de cada página de tema (tema-T1.html, tema-T2.html, etc.)
+2.3. Contenido de cada página de fase (fase-F1.html, fase-F2.html, etc.)
 
-Para cada página de tema, estructura así:
+Para cada página de fase, estructura así:
 
 - Cabecera con:
-  - Título: "Tema T{{n}}: [nombre o descripción breve]".
-  - Párrafo introductorio con el objetivo del tema (usa la síntesis global del tema).
+  - Título: "Fase F{{n}}: [nombre o descripción breve]".
+  - Párrafo introductorio con el objetivo de la fase (usa la síntesis global de la fase).
 
-- Sección "Vídeos del tema":
-  - Para cada vídeo de ese tema (por ejemplo KLC-T1-v1, KLC-T1-v2…):
+- Sección "Vídeos de la fase":
+  - Para cada vídeo de esa fase (por ejemplo KK-F1-v1, KK-F1-v2…):
     - Un bloque con:
-      - Código y título (ej.: "KLC-T1-v1 – Introducción a la IA").
+      - Código y título (ej.: "KK-F1-v1 – Introducción a la IA").
       - Un resumen corto.
       - Un bloque desplegable (puedes usar `<details><summary>…</summary>…</details>`) con:
         - Resumen extendido del vídeo.
         - Lista de ideas clave.
         - Lista de errores típicos o puntos de atención (si los hay).
 
-- Sección "Manual / Guía rápida del tema":
+- Sección "Manual / Guía rápida de la fase":
   - Redacta un pequeño manual en texto (no hace falta HTML complejo, solo `<h3>`, `<p>`, `<ul>`).
-  - Enfocado a que alguien pueda leerlo sin ver los vídeos y aún así saber usar lo básico del tema del tema.
+  - Enfocado a que alguien pueda leerlo sin ver los vídeos y aún así saber usar lo básico del tema de la fase.
 
 - Sección "Cuestionario de autoevaluación (tipo test)":
-  - Crea entre 5 y 10 preguntas tipo test por tema.
+  - Crea entre 5 y 10 preguntas tipo test por fase.
   - Cada pregunta debe:
-    - Estar basada en los contenidos reales de los vídeos del tema.
+    - Estar basada en los contenidos reales de los vídeos de la fase.
     - Tener 3 o 4 opciones de respuesta.
     - Indicar internamente cuál es la correcta (para que el JS pueda comprobar).
   - Implementa un formulario sencillo con:
@@ -1718,7 +1137,7 @@ IMPORTANTE:
 2.4. Interactividad mínima (JS) para el cuestionario
 
 Quiero un JS genérico que:
-- Recorra todas las preguntas del cuestionario del tema.
+- Recorra todas las preguntas del cuestionario de la fase.
 - Para cada pregunta:
   - Compruebe si la opción seleccionada coincide con la respuesta correcta.
 - Cuente el número de aciertos.
@@ -1734,84 +1153,87 @@ Mantén un estilo limpio:
 - Fondo claro.
 - Tipografía sans-serif.
 - Contenedores tipo "tarjeta" para cada bloque.
-- Barra de navegación sencilla con enlaces a los temas.
+- Barra de navegación sencilla con enlaces a las fases.
 - Botones sencillos pero visibles para:
-  - "Ir al tema T{{n}}".
+  - "Ir a la fase F{{n}}".
   - "Corregir cuestionario".
 
-Con este análisis, genera ahora el análisis completo y la estructura HTML en base a las transcripciones proporcionadas.
-
 --------------------------------
 FORMATO DE LA RESPUESTA
 --------------------------------
 
-Tu respuesta debe seguir este orden exacto:
+Quiero que tu respuesta siga este orden:
+
+1) BLOQUE 1 – ANÁLISIS Y SÍNTESIS (solo texto, bien estructurado, sin HTML)
+2) BLOQUE 2 – HTML
 
-**1) BLOQUE 1 – ANÁLISIS Y SÍNTESIS** (solo texto, bien estructurado, sin HTML)
+Dentro del BLOQUE 2, dame cada archivo HTML en un bloque de código separado así:
 
-**2) BLOQUE 2 – ARCHIVOS HTML**
+- Comentario indicando el nombre del archivo.
+- Luego el contenido completo.
 
-Dentro del BLOQUE 2, dame cada archivo HTML en un bloque de código separado usando EXACTAMENTE este formato:
+Ejemplo de formato:
 
-```
 [ARCHIVO: index.html]
 ```html
-<!DOCTYPE html>
-<html lang="es">
-...código completo del index.html...
+...código...
 ```
 
-[ARCHIVO: www/tema-T1.html]
+[ARCHIVO: fase-F1.html]
 ```html
-<!DOCTYPE html>
-<html lang="es">
-...código completo del tema T1...
+...código...
 ```
 
-[ARCHIVO: www/tema-T2.html]
-```html
-<!DOCTYPE html>
-<html lang="es">
-...código completo del tema T2...
-```
+Y así sucesivamente para cada fase que detectes.
+Si por límite de longitud no puedes generar todos los HTML en una sola respuesta, prioriza:
+1) index.html
+2) la fase más baja (por ejemplo F1)
+y luego indica qué quedaría pendiente.
 
-Y así sucesivamente para cada tema detectado.
-
-🔥 INSTRUCCIONES CRÍTICAS:
-1. **SIEMPRE** genera un archivo index.html
-2. **SIEMPRE** genera un archivo tema-TX.html por CADA tema que detectes (T1, T2, T3, etc.)
-3. **NO OMITAS** ningún tema
-4. **USA EXACTAMENTE** el formato [ARCHIVO: nombre] antes de cada ```html
-5. **INCLUYE TODO** el código HTML completo en cada archivo
-6. **VERIFICA** que generas al menos 2 archivos (index + al menos 1 tema)
-
-Si detectas 3 temas (T1, T2, T3), debes generar 4 archivos:
-- [ARCHIVO: index.html]
-- [ARCHIVO: www/tema-T1.html] 
-- [ARCHIVO: www/tema-T2.html]
-- [ARCHIVO: www/tema-T3.html]
-
-⚠️ IMPORTANTE:
-- Usa EXACTAMENTE el formato [ARCHIVO: nombre] antes de cada bloque
-- Para el index.html usa: [ARCHIVO: index.html]
-- Para los temas usa: [ARCHIVO: www/tema-TX.html]
-- DEBES generar UN ARCHIVO POR CADA TEMA detectado en las transcripciones
-- Incluye el código HTML completo con DOCTYPE, head, body, estilos CSS y JavaScript
-- Asegúrate de que las rutas de navegación sean correctas según la estructura de directorios
-- NO omitas ningún tema, genera TODOS los archivos HTML necesarios
-
-🔥 REQUISITO CRÍTICO: Debes generar:
-1. Un archivo index.html
-2. Un archivo tema-TX.html por cada tema T1, T2, T3, etc. que detectes
-3. Cada tema debe tener su página completa con navegación, contenido y cuestionario
-
-Ejemplo de salida esperada si hay 2 temas:
-- [ARCHIVO: index.html] + código HTML
-- [ARCHIVO: www/tema-T1.html] + código HTML  
-- [ARCHIVO: www/tema-T2.html] + código HTML"""
+Con todo esto, genera ahora el análisis y la estructura HTML en base a las transcripciones proporcionadas."""
 
     return prompt
 
+
+def recopilar_estadisticas_video(video_path, duracion_transcripcion, caracteres_transcripcion):
+    """Recopila estadísticas detalladas de un vídeo procesado"""
+    try:
+        # Obtener información básica del archivo
+        video_stats = video_path.stat()
+        tamaño_mb = video_stats.st_size / (1024 * 1024)
+        
+        # Información del nombre del archivo
+        nombre_archivo = video_path.name
+        codigo_video = extraer_codigo_video(nombre_archivo)
+        
+        # Calcular estadísticas de transcripción
+        palabras_transcripcion = len(caracteres_transcripcion.split()) if caracteres_transcripcion else 0
+        velocidad_transcripcion = palabras_transcripcion / (duracion_transcripcion / 60) if duracion_transcripcion > 0 else 0
+        
+        estadisticas = {
+            'nombre_archivo': nombre_archivo,
+            'codigo_video': codigo_video,
+            'tamaño_mb': round(tamaño_mb, 2),
+            'duracion_segundos': round(duracion_transcripcion, 2),
+            'duracion_formateada': f"{int(duracion_transcripcion//60):02d}:{int(duracion_transcripcion%60):02d}",
+            'caracteres_transcripcion': len(caracteres_transcripcion) if caracteres_transcripcion else 0,
+            'palabras_transcripcion': palabras_transcripcion,
+            'velocidad_palabras_min': round(velocidad_transcripcion, 1),
+            'fecha_procesamiento': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        
+        return estadisticas
+    except Exception as e:
+        print(f"⚠️ Error al recopilar estadísticas de {video_path}: {e}")
+        return None
+
+
+def extraer_codigo_video(nombre_archivo):
+    """Extrae el código KLC-TX-vY / KK-FX-vY del nombre del archivo"""
+    partes = descomponer_codigo_video(nombre_archivo)
+    return partes['codigo'] if partes else "Sin código"
+
+
 def procesar_y_guardar_html(contenido_respuesta, carpeta_base, carpeta_www, motor):
     """Extrae y guarda los archivos HTML de la respuesta de IA"""
     archivos_creados = []
@@ -1984,62 +1406,164 @@ def actualizar_enlaces_html(codigo_html, motor, nombre_archivo):
     
     return codigo_html
 
-def validar_respuesta_completa(contenido_respuesta, transcripciones_content):
-    """Valida que la respuesta contenga todos los archivos HTML necesarios"""
-    
-    import re
-    
-    # Detectar cuántas fases hay en las transcripciones
-    fases_encontradas = set()
-    patron_fases = r'📂\s+KK-F(\d+)-v\d+'
-    matches = re.findall(patron_fases, transcripciones_content)
-    
-    for match in matches:
-        fases_encontradas.add(f"F{match}")
-    
-    print(f"🔍 Fases detectadas en transcripciones: {sorted(fases_encontradas)}")
-    
-    # Buscar archivos HTML en la respuesta
-    patron_archivos = r'\[ARCHIVO:\s*([^\]]+)\]'
-    archivos_en_respuesta = re.findall(patron_archivos, contenido_respuesta, re.IGNORECASE)
-    
-    print(f"📋 Archivos encontrados en respuesta: {archivos_en_respuesta}")
-    
-    # Verificar que tenemos index
-    tiene_index = any("index" in archivo.lower() for archivo in archivos_en_respuesta)
+def transcripciones_para_prompt(transcripciones_file):
+    """Transcripciones que se pegan en el prompt, seguidas de los términos clave precalculados de cada vídeo"""
+    contenido = texto_transcripciones_prompt(transcripciones_file)
+    stems = [pathlib.Path(video['nombre']).stem for video in cargar_indice(transcripciones_file)['videos']]
+    return contenido + seccion_terminos(transcripciones_file.parent, stems)
+
+def texto_transcripciones_prompt(transcripciones_file):
+    """Los trozos relevantes (DOC_RAG_ENABLED), un resumen extractivo (DOC_SUMMARY_ENABLED) o, si no, el texto completo"""
+    config_recuperacion = cargar_config_recuperacion()
+    if config_recuperacion['activo']:
+        try:
+            with metricas.etapa('recuperacion', archivo=transcripciones_file.name):
+                contenido = transcripciones_recuperadas(transcripciones_file, config_recuperacion)
+            print(f"🧭 Prompt con los {config_recuperacion['top_k']} trozos más relevantes de cada vídeo "
+                  f"({len(contenido.split()):,} palabras)")
+            return contenido
+        except Exception as e:
+            print(f"⚠️ No se pudieron recuperar trozos relevantes ({e}): se envían las transcripciones completas")
     
-    # Verificar que tenemos todas las fases
-    fases_en_respuesta = set()
-    for archivo in archivos_en_respuesta:
-        match_fase = re.search(r'fase-(F\d+)', archivo, re.IGNORECASE)
-        if match_fase:
-            fases_en_respuesta.add(match_fase.group(1))
+    config_resumen = cargar_config_resumen()
+    if config_resumen['activo']:
+        try:
+            with metricas.etapa('resumen_extractivo', archivo=transcripciones_file.name):
+                contenido = transcripciones_resumidas(transcripciones_file, config_resumen)
+            print(f"✂️ Prompt con el resumen extractivo de cada vídeo ({len(contenido.split()):,} palabras)")
+            return contenido
+        except RuntimeError as e:
+            print(f"⚠️ Resumen extractivo no disponible ({e}): se envían las transcripciones completas")
     
-    print(f"🎯 Fases en respuesta HTML: {sorted(fases_en_respuesta)}")
+    with open(transcripciones_file, 'r', encoding='utf-8') as f:
+        return f.read()
+
+PATRON_ARCHIVO_HTML = re.compile(r'\[ARCHIVO:\s*([^\]]+)\]\s*```html\s*(.*?)(```|(?=\[ARCHIVO:)|$)', re.DOTALL | re.IGNORECASE)
+
+def nombre_archivo_esperado(nombre_archivo):
+    """Nombre normalizado de un archivo de la respuesta (index.html, fase-F1.html, tema-T2.html)"""
+    nombre = nombre_archivo.strip().split('/')[-1].lower()
+    if "index" in nombre:
+        return "index.html"
+    match = re.search(r'(fase|tema)-([ft])(\d+)', nombre)
+    if not match:
+        return nombre
+    prefijo, letra, numero = match.groups()
+    return f"{prefijo}-{letra.upper()}{int(numero)}.html"
+
+def archivos_esperados(transcripciones_file):
+    """index.html y una página por cada fase del consolidado (fase-FX.html), lo que pide el prompt maestro
+
+    Los vídeos de temas (T1, T2...) no tienen página propia en el prompt: no se esperan ni se piden.
+    """
+    fases = {video['fase'] for video in cargar_indice(transcripciones_file)['videos']
+             if video['fase'] and video['fase'].startswith('F')}
+    return ["index.html"] + [f"fase-{fase}.html" for fase in sorted(fases, key=lambda fase: int(fase[1:]))]
+
+def archivos_completos(contenido_respuesta):
+    """Archivos de la respuesta cuyo bloque ```html está cerrado: {nombre normalizado: código}"""
+    completos = {}
+    for match in PATRON_ARCHIVO_HTML.finditer(contenido_respuesta):
+        if match.group(3) == '```':
+            completos.setdefault(nombre_archivo_esperado(match.group(1)), match.group(2))
+    return completos
+
+def archivos_faltantes(contenido_respuesta, transcripciones_file):
+    """Archivos esperados que no están completos en la respuesta"""
+    completos = archivos_completos(contenido_respuesta)
+    return [archivo for archivo in archivos_esperados(transcripciones_file) if archivo not in completos]
+
+def validar_respuesta_completa(contenido_respuesta, transcripciones_file):
+    """Valida que la respuesta contenga todos los archivos HTML necesarios"""
+    esperados = archivos_esperados(transcripciones_file)
+    print(f"🔍 Páginas esperadas según las transcripciones: {esperados}")
+    print(f"📋 Archivos completos en respuesta: {sorted(archivos_completos(contenido_respuesta))}")
     
-    # Calcular qué falta
-    fases_faltantes = fases_encontradas - fases_en_respuesta
+    faltantes = archivos_faltantes(contenido_respuesta, transcripciones_file)
+    if not faltantes:
+        print("✅ Respuesta completa: index + todas las fases/temas")
+        return True
+    print(f"⚠️ FALTAN: {faltantes}")
+    print("❌ Respuesta incompleta")
+    return False
+
+def recortar_archivo_incompleto(contenido_respuesta):
+    """Quita el último archivo si quedó a medias (se pedirá entero aparte, sin solapar con lo recibido)"""
+    ultimo = None
+    for match in PATRON_ARCHIVO_HTML.finditer(contenido_respuesta):
+        ultimo = match
+    if ultimo and ultimo.group(3) != '```':
+        return contenido_respuesta[:ultimo.start()].rstrip()
+    return contenido_respuesta
+
+def prompt_archivo_faltante(archivo, contenido_respuesta, transcripciones_file, esperados):
+    """Prompt de seguimiento para un único archivo: el análisis ya hecho y solo las transcripciones de su fase"""
+    analisis = contenido_respuesta.split('[ARCHIVO:', 1)[0].strip()
+    match = re.match(r'fase-(F\d+)\.html', archivo)
+    if match:
+        fragmento = "".join(bloques_de_fases(transcripciones_file, [match.group(1)]))
+        contexto = f"TRANSCRIPCIONES DE {match.group(1)}:\n\n{fragmento}"
+    else:
+        videos = cargar_indice(transcripciones_file)['videos']
+        contexto = "VÍDEOS DEL CURSO:\n" + "\n".join(f"- {video['fase'] or '-'}: {video['nombre']}" for video in videos)
+    return f"""Estás completando una documentación web de formación de Klinikare / CliniQuer que ya está a medias.
+
+ANÁLISIS YA REALIZADO (BLOQUE 1 de la respuesta anterior):
+{analisis}
+
+PÁGINAS DEL SITIO (para la navegación): {', '.join(esperados)}
+
+{contexto}
+
+Genera ÚNICAMENTE el archivo {archivo}, completo, con el mismo estilo y navegación que el resto del sitio y con este formato exacto:
+
+[ARCHIVO: {archivo}]
+```html
+...código...
+```"""
+
+def completar_archivos_faltantes(contenido_respuesta, faltantes, transcripciones_file, mensaje_sistema):
+    """Pide cada archivo que falta en una llamada pequeña (en paralelo) y los añade a la respuesta sin duplicados"""
+    esperados = archivos_esperados(transcripciones_file)
+    contenido_respuesta = recortar_archivo_incompleto(contenido_respuesta)
     
-    if not tiene_index:
-        print("⚠️ FALTA: Archivo index.html")
+    def pedir(archivo):
+        with metricas.etapa('llm', motor='openai', modelo="gpt-4o", llamada='continuacion', archivo=archivo):
+            respuesta = client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": mensaje_sistema},
+                    {"role": "user", "content": prompt_archivo_faltante(archivo, contenido_respuesta, transcripciones_file, esperados)}
+                ],
+                max_tokens=16384,
+                temperature=0.1
+            )
+        eleccion = respuesta.choices[0]
+        # Solo se toma el archivo pedido, aunque el modelo repita otros
+        for match in PATRON_ARCHIVO_HTML.finditer(eleccion.message.content or ""):
+            if nombre_archivo_esperado(match.group(1)) == archivo:
+                if eleccion.finish_reason == 'length':
+                    print(f"⚠️ {archivo}: la continuación también se cortó, se guarda lo recibido")
+                return archivo, match.group(2).rstrip()
+        print(f"⚠️ {archivo}: la continuación no incluye el archivo pedido")
+        return archivo, None
     
-    if fases_faltantes:
-        print(f"⚠️ FALTAN fases: {sorted(fases_faltantes)}")
+    print(f"🧩 Pidiendo solo los archivos que faltan: {faltantes}")
+    with ThreadPoolExecutor(max_workers=int(os.getenv('OPENAI_CONTINUATION_WORKERS', '4'))) as ejecutor:
+        recibidos = list(ejecutor.map(pedir, faltantes))
     
-    if tiene_index and not fases_faltantes:
-        print("✅ Respuesta completa: index + todas las fases")
-        return True
-    else:
-        print("❌ Respuesta incompleta")
-        return False
+    partes = [contenido_respuesta]
+    for archivo, codigo in recibidos:
+        if codigo:
+            partes.append(f"[ARCHIVO: {archivo}]\n```html\n{codigo}\n```")
+    return "\n\n".join(partes)
 
 def generar_documentacion_con_openai(transcripciones_file):
     """Genera documentación usando OpenAI con las transcripciones consolidadas"""
     
     try:
         # Leer el archivo de transcripciones consolidadas
-        with open(transcripciones_file, 'r', encoding='utf-8') as f:
-            transcripciones_content = f.read()
+        transcripciones_content = transcripciones_para_prompt(transcripciones_file)
         
         print("🤖 Generando documentación con OpenAI...")
         print(f"📄 Procesando: {transcripciones_file.name}")
@@ -2052,15 +1576,17 @@ def generar_documentacion_con_openai(transcripciones_file):
         print("⏱️  Enviando solicitud a OpenAI GPT-4o...")
         
         # Llamada a OpenAI
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "Eres un experto analista de contenido formativo y diseñador de material educativo. Generas análisis detallados y documentación web interactiva de alta calidad. CRÍTICO: Siempre genera TODOS los archivos HTML solicitados sin excepción. Si hay múltiples fases, crea una página HTML para CADA fase. Nunca truncar la respuesta."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=16384,  # Máximo permitido por GPT-4o
-            temperature=0.1
-        )
+        mensaje_sistema = "Eres un experto analista de contenido formativo y diseñador de material educativo. Generas análisis detallados y documentación web interactiva de alta calidad. CRÍTICO: Siempre genera TODOS los archivos HTML solicitados sin excepción. Si hay múltiples fases, crea una página HTML para CADA fase. Nunca truncar la respuesta."
+        with metricas.etapa('llm', motor='openai', modelo="gpt-4o", llamada='principal'):
+            response = client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": mensaje_sistema},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=16384,  # Máximo permitido por GPT-4o
+                temperature=0.1
+            )
         
         # Calcular tiempo transcurrido
         tiempo_transcurrido = time.time() - inicio_tiempo
@@ -2091,30 +1617,14 @@ def generar_documentacion_con_openai(transcripciones_file):
             f.write("---\n\n")
             f.write(response.choices[0].message.content)
         
-        # Verificar si la respuesta está completa y solicitar continuación si es necesario
+        # Si la respuesta se cortó (finish_reason='length') o faltan páginas, se piden solo las que faltan
         respuesta_contenido = response.choices[0].message.content
-        
-        # Detectar si OpenAI truncó la respuesta
-        if not respuesta_contenido.strip().endswith('```') and '[ARCHIVO:' in respuesta_contenido:
-            print("⚠️ Respuesta posiblemente truncada, solicitando continuación...")
-            
-            # Solicitar continuación
-            continuation_response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "Continúa generando EXACTAMENTE donde te quedaste. Completa todos los archivos HTML faltantes."},
-                    {"role": "user", "content": prompt},
-                    {"role": "assistant", "content": respuesta_contenido},
-                    {"role": "user", "content": "Por favor continúa generando el resto de archivos HTML que faltan. Usa el mismo formato [ARCHIVO: nombre] ```html ... ``` para cada archivo."}
-                ],
-                max_tokens=16384,  # Máximo permitido por GPT-4o
-                temperature=0.1
-            )
-            
-            # Combinar respuestas
-            respuesta_continuacion = continuation_response.choices[0].message.content
-            respuesta_contenido = respuesta_contenido + "\n\n" + respuesta_continuacion
-            print("✅ Continuación recibida y combinada")
+        if response.choices[0].finish_reason == 'length':
+            print("⚠️ Respuesta truncada por límite de tokens (finish_reason=length)")
+        faltantes = archivos_faltantes(respuesta_contenido, transcripciones_file)
+        if faltantes:
+            respuesta_contenido = completar_archivos_faltantes(respuesta_contenido, faltantes, transcripciones_file, mensaje_sistema)
+            print("✅ Archivos faltantes recibidos y combinados")
         
         # Crear hash único de la respuesta para debugging
         import hashlib
@@ -2122,7 +1632,7 @@ def generar_documentacion_con_openai(transcripciones_file):
         print(f"🔍 Hash único de respuesta OpenAI: {hash_respuesta}")
         
         # Validar que la respuesta esté completa
-        respuesta_completa = validar_respuesta_completa(respuesta_contenido, transcripciones_content)
+        respuesta_completa = validar_respuesta_completa(respuesta_contenido, transcripciones_file)
         
         archivos_creados = procesar_y_guardar_html(respuesta_contenido, carpeta_base, carpeta_www_openai, "openai")
         
@@ -2136,6 +1646,7 @@ def generar_documentacion_con_openai(transcripciones_file):
         else:
             print("⚠️ No se crearon archivos HTML. Revisa el archivo .md para la respuesta completa.")
         
+        metricas.exportar_openmetrics("documentacion")
         return documentacion_file
         
     except Exception as e:
@@ -2146,35 +1657,35 @@ def generar_documentacion_con_ollama(transcripciones_file):
     """Genera documentación usando Ollama local con las transcripciones consolidadas"""
     
     try:
-        # Verificar que Ollama esté disponible
-        ollama_host = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
+        # Verificar que Ollama esté disponible (uno o varios servidores en OLLAMA_HOST)
+        pool = obtener_pool()
         ollama_model = os.getenv('OLLAMA_MODEL', 'llama2')
         
         print(f"🤖 Generando documentación con Ollama (modelo: {ollama_model})...")
-        print(f"📶 Host: {ollama_host}")
+        print(f"📶 Host: {pool.describir()}")
         
-        # Verificar que el modelo esté disponible
+        # Verificar que el modelo esté disponible (caché de OLLAMA_MODELS_CACHE_FILE; sin descargas a mitad de trabajo)
         try:
-            modelos_disponibles = ollama.list()
-            modelo_encontrado = any(modelo.model.startswith(ollama_model) for modelo in modelos_disponibles.models)
-            
-            if not modelo_encontrado:
+            gestor = obtener_gestor()
+            if not gestor.disponible(ollama_model):
+                if not pool.sanos():
+                    raise RuntimeError(f"ningún servidor responde ({pool.describir()})")
                 print(f"⚠️ Modelo {ollama_model} no encontrado. Modelos disponibles:")
-                for modelo in modelos_disponibles.models:
-                    print(f"   - {modelo.model}")
-                
-                # Intentar descargar el modelo
-                print(f"📥 Descargando modelo {ollama_model}...")
-                ollama.pull(ollama_model)
+                for modelo in pool.modelos():
+                    print(f"   - {modelo}")
+                print(f"📥 Descárgalo antes de documentar: python ciclo_modelos.py preparar {ollama_model}")
+                return None
                 
         except Exception as e:
             print(f"⚠️ No se pudo verificar los modelos de Ollama: {str(e)}")
             print("Asegúrate de que Ollama esté ejecutándose: ollama serve")
             return None
         
+        # El modelo se carga en memoria mientras se prepara el prompt
+        gestor.precargar([ollama_model])
+        
         # Leer el archivo de transcripciones consolidadas
-        with open(transcripciones_file, 'r', encoding='utf-8') as f:
-            transcripciones_content = f.read()
+        transcripciones_content = transcripciones_para_prompt(transcripciones_file)
         
         print(f"📄 Procesando: {transcripciones_file.name}")
         
@@ -2189,27 +1700,29 @@ def generar_documentacion_con_ollama(transcripciones_file):
         print("⏱️  El modelo gpt-oss es muy potente pero requiere tiempo...")
         
         try:
-            response = ollama.chat(
-                model=ollama_model,
-                messages=[
-                    {
-                        'role': 'system',
-                        'content': 'Eres un experto analista de contenido formativo. Genera documentación web HTML completa siguiendo EXACTAMENTE el formato solicitado con [ARCHIVO: nombre] antes de cada código HTML.'
-                    },
-                    {
-                        'role': 'user',
-                        'content': prompt
+            with metricas.etapa('llm', motor='ollama', modelo=ollama_model, llamada='principal'):
+                response = pool.chat(
+                    model=ollama_model,
+                    keep_alive=gestor.keep_alive,
+                    messages=[
+                        {
+                            'role': 'system',
+                            'content': 'Eres un experto analista de contenido formativo. Genera documentación web HTML completa siguiendo EXACTAMENTE el formato solicitado con [ARCHIVO: nombre] antes de cada código HTML.'
+                        },
+                        {
+                            'role': 'user',
+                            'content': prompt
+                        }
+                    ],
+                    options={
+                        'temperature': 0.1,  # Más determinista
+                        'top_p': 0.9,
+                        'num_ctx': 16384,  # Contexto más amplio
+                        'num_predict': 8192,  # Más tokens de salida
+                        'repeat_penalty': 1.1,
+                        'stop': []  # Sin paradas automáticas
                     }
-                ],
-                options={
-                    'temperature': 0.1,  # Más determinista
-                    'top_p': 0.9,
-                    'num_ctx': 16384,  # Contexto más amplio
-                    'num_predict': 8192,  # Más tokens de salida
-                    'repeat_penalty': 1.1,
-                    'stop': []  # Sin paradas automáticas
-                }
-            )
+                )
             
             # Calcular tiempo transcurrido
             tiempo_transcurrido = time.time() - inicio_tiempo
@@ -2270,7 +1783,7 @@ def generar_documentacion_con_ollama(transcripciones_file):
         print(f"✅ Respuesta recibida: {len(respuesta_contenido)} caracteres")
         
         # Validar que la respuesta esté completa
-        respuesta_completa = validar_respuesta_completa(respuesta_contenido, transcripciones_content)
+        respuesta_completa = validar_respuesta_completa(respuesta_contenido, transcripciones_file)
         
         archivos_creados = procesar_y_guardar_html(respuesta_contenido, carpeta_base, carpeta_www_ollama, "ollama")
         
@@ -2284,6 +1797,7 @@ def generar_documentacion_con_ollama(transcripciones_file):
         else:
             print("⚠️ No se crearon archivos HTML. Revisa el archivo .md para la respuesta completa.")
         
+        metricas.exportar_openmetrics("documentacion")
         return documentacion_file
         
     except Exception as e:
@@ -2379,17 +1893,24 @@ def generar_documentacion_con_deepseek(transcripciones_file):
     Returns:
         bool: True si se genera correctamente, False en caso de error
     """
-    print("📶 Host: http://localhost:11434")
+    pool = obtener_pool()
+    print(f"📶 Host: {pool.describir()}")
     
-    import ollama
     import time
     
-    deepseek_model = "deepseek-r1:latest"
+    deepseek_model = os.getenv('DEEPSEEK_MODEL', 'deepseek-r1:latest')
     
     try:
+        # Sin descargas a mitad de trabajo; el modelo se carga mientras se prepara el prompt
+        gestor = obtener_gestor()
+        if not gestor.disponible(deepseek_model):
+            print(f"⚠️ Modelo {deepseek_model} no disponible en {pool.describir()}")
+            print(f"📥 Descárgalo antes de documentar: python ciclo_modelos.py preparar {deepseek_model}")
+            return False
+        gestor.precargar([deepseek_model])
+        
         # Leer transcripciones
-        with open(transcripciones_file, 'r', encoding='utf-8') as f:
-            transcripciones_content = f.read()
+        transcripciones_content = transcripciones_para_prompt(transcripciones_file)
         
         print(f"📄 Procesando: {transcripciones_file.name}")
         
@@ -2404,27 +1925,29 @@ def generar_documentacion_con_deepseek(transcripciones_file):
         print("⏱️  El modelo DeepSeek-R1 es muy avanzado y eficiente...")
         
         try:
-            response = ollama.chat(
-                model=deepseek_model,
-                messages=[
-                    {
-                        'role': 'system',
-                        'content': 'Eres un experto analista de contenido formativo. Genera documentación web HTML completa siguiendo EXACTAMENTE el formato solicitado con [ARCHIVO: nombre] antes de cada código HTML.'
-                    },
-                    {
-                        'role': 'user',
-                        'content': prompt
+            with metricas.etapa('llm', motor='deepseek', modelo=deepseek_model, llamada='principal'):
+                response = pool.chat(
+                    model=deepseek_model,
+                    keep_alive=gestor.keep_alive,
+                    messages=[
+                        {
+                            'role': 'system',
+                            'content': 'Eres un experto analista de contenido formativo. Genera documentación web HTML completa siguiendo EXACTAMENTE el formato solicitado con [ARCHIVO: nombre] antes de cada código HTML.'
+                        },
+                        {
+                            'role': 'user',
+                            'content': prompt
+                        }
+                    ],
+                    options={
+                        'temperature': 0.1,  # Más determinista
+                        'top_p': 0.9,
+                        'num_ctx': 32768,  # Contexto más amplio para DeepSeek
+                        'num_predict': 16384,  # Más tokens de salida
+                        'repeat_penalty': 1.1,
+                        'stop': []  # Sin paradas automáticas
                     }
-                ],
-                options={
-                    'temperature': 0.1,  # Más determinista
-                    'top_p': 0.9,
-                    'num_ctx': 32768,  # Contexto más amplio para DeepSeek
-                    'num_predict': 16384,  # Más tokens de salida
-                    'repeat_penalty': 1.1,
-                    'stop': []  # Sin paradas automáticas
-                }
-            )
+                )
             
             # Calcular tiempo transcurrido
             tiempo_transcurrido = time.time() - inicio_tiempo
@@ -2452,7 +1975,7 @@ def generar_documentacion_con_deepseek(transcripciones_file):
         print(f"✅ Respuesta recibida: {len(contenido_respuesta)} caracteres")
         
         # Validar completitud usando la función existente
-        respuesta_completa = validar_respuesta_completa(contenido_respuesta, transcripciones_content)
+        respuesta_completa = validar_respuesta_completa(contenido_respuesta, transcripciones_file)
         if respuesta_completa:
             print("✅ Respuesta completa: index + todas las fases")
         else:
@@ -2479,7 +2002,8 @@ def generar_documentacion_con_deepseek(transcripciones_file):
                 f.write(contenido_respuesta)
             
             print(f"📋 Archivo de análisis: {archivo_analisis}")
-            
+        
+        metricas.exportar_openmetrics("documentacion")
         return True
     
     except Exception as e:
@@ -0,0 +1,203 @@
+"""
+Pipeline por etapas con colas acotadas
+Cada etapa corre en su propio hilo (o hilos), toma elementos de la cola de entrada,
+los procesa y deja el resultado en la cola de salida. Las colas tienen tamaño máximo,
+así que una etapa lenta frena a las anteriores en lugar de acumular audio en memoria.
+Se mide la profundidad de cada cola y el tiempo que cada etapa pasa esperando
+trabajo (inactiva) o esperando sitio en la cola siguiente (bloqueada)
+"""
+import os
+import queue
+import threading
+import time
+
+import metricas
+
+# Marca de fin que cada hilo productor deja en su cola de salida
+FIN = object()
+
+
+def cargar_config_tuberia():
+    """Tamaño de las colas entre etapas y número de hilos de decodificación"""
+    return {
+        'tamaño_cola': max(1, int(os.getenv('PIPELINE_QUEUE_SIZE', '2'))),
+        'hilos_decodificacion': max(1, int(os.getenv('PIPELINE_DECODE_WORKERS', '1')))
+    }
+
+
+class Cola:
+    """Cola acotada que publica su profundidad como indicador"""
+
+    def __init__(self, nombre, tamaño):
+        self.nombre = nombre
+        self.cola = queue.Queue(maxsize=tamaño)
+        self.profundidad_maxima = 0
+        self._lock = threading.Lock()
+
+    def _publicar(self):
+        profundidad = self.cola.qsize()
+        with self._lock:
+            self.profundidad_maxima = max(self.profundidad_maxima, profundidad)
+        metricas.fijar_indicador('cola_profundidad', profundidad, cola=self.nombre)
+        metricas.fijar_indicador('cola_profundidad_maxima', self.profundidad_maxima, cola=self.nombre)
+
+    def poner(self, elemento):
+        """Añade el elemento (bloquea si la cola está llena) y devuelve los segundos de espera"""
+        inicio = time.perf_counter()
+        self.cola.put(elemento)
+        espera = time.perf_counter() - inicio
+        self._publicar()
+        return espera
+
+    def tomar(self):
+        """Saca el siguiente elemento y devuelve (elemento, segundos de espera)"""
+        inicio = time.perf_counter()
+        elemento = self.cola.get()
+        espera = time.perf_counter() - inicio
+        self._publicar()
+        return elemento, espera
+
+
+class Etapa:
+    """Hilos que aplican una función a cada elemento de la entrada
+
+    La entrada es una Cola o un iterable (etapa productora). La función devuelve el
+    elemento para la etapa siguiente, una lista de elementos, o None para descartarlo;
+    los errores se informan y descartan el elemento sin detener el pipeline (al_fallar
+    recibe el elemento descartado, para avisar a quien lo esperaba más adelante).
+    """
+
+    def __init__(self, nombre, funcion, entrada, salida=None, hilos=1, productores=1, al_fallar=None):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.al_fallar = al_fallar
+        self.entrada = entrada
+        self.salida = salida
+        self.num_hilos = hilos
+        self.productores = productores
+        self.procesados = 0
+        self.errores = 0
+        self.inactiva = 0.0
+        self.bloqueada = 0.0
+        self.ocupada = 0.0
+        self._lock = threading.Lock()
+        self._fines = 0
+        self._hilos = []
+        self.fallo = None
+
+    def _siguiente(self):
+        """Siguiente elemento de la entrada, o FIN cuando se ha agotado"""
+        if isinstance(self.entrada, Cola):
+            while True:
+                elemento, espera = self.entrada.tomar()
+                self._acumular('inactiva', espera)
+                if elemento is not FIN:
+                    return elemento
+                with self._lock:
+                    self._fines += 1
+                    agotada = self._fines >= self.productores
+                if agotada:
+                    # Reenviar la marca para que los demás hilos de esta etapa también terminen
+                    self.entrada.poner(FIN)
+                    return FIN
+
+        inicio = time.perf_counter()
+        with self._lock:
+            elemento = next(self.entrada, FIN)
+        self._acumular('inactiva', time.perf_counter() - inicio)
+        return elemento
+
+    def _acumular(self, campo, segundos):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + segundos)
+            total = getattr(self, campo)
+        metricas.fijar_indicador(f'etapa_{campo}_segundos_total', round(total, 3), etapa=self.nombre)
+
+    def _trabajar(self):
+        try:
+            while True:
+                elemento = self._siguiente()
+                if elemento is FIN:
+                    break
+
+                inicio = time.perf_counter()
+                try:
+                    resultado = self.funcion(elemento)
+                except Exception as e:
+                    resultado = None
+                    with self._lock:
+                        self.errores += 1
+                    print(f"❌ Error en la etapa '{self.nombre}': {e}")
+                    if self.al_fallar:
+                        self.al_fallar(elemento)
+                self._acumular('ocupada', time.perf_counter() - inicio)
+
+                with self._lock:
+                    self.procesados += 1
+                if resultado is None or self.salida is None:
+                    continue
+                for siguiente in (resultado if isinstance(resultado, list) else [resultado]):
+                    self._acumular('bloqueada', self.salida.poner(siguiente))
+        except Exception as e:
+            # Error de la propia etapa (p. ej. el generador de entrada): se guarda para ejecutar()
+            with self._lock:
+                self.fallo = self.fallo or e
+            print(f"❌ La etapa '{self.nombre}' se ha detenido: {e}")
+        finally:
+            # Las etapas siguientes terminan igualmente en lugar de esperar para siempre
+            if self.salida is not None:
+                self.salida.poner(FIN)
+
+    def iniciar(self):
+        for i in range(self.num_hilos):
+            hilo = threading.Thread(target=self._trabajar, name=f"{self.nombre}-{i}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def esperar(self):
+        # join con timeout para que Ctrl+C siga llegando al hilo principal
+        for hilo in self._hilos:
+            while hilo.is_alive():
+                hilo.join(0.5)
+
+
+class Tuberia:
+    """Conjunto de etapas encadenadas por colas acotadas"""
+
+    def __init__(self, tamaño_cola):
+        self.tamaño_cola = tamaño_cola
+        self.etapas = []
+        self.colas = []
+
+    def cola(self, nombre):
+        cola = Cola(nombre, self.tamaño_cola)
+        self.colas.append(cola)
+        return cola
+
+    def etapa(self, nombre, funcion, entrada, salida=None, hilos=1, al_fallar=None):
+        # Una etapa que lee de una cola espera una marca FIN por cada hilo que escribe en ella
+        # (las etapas productoras se declaran antes que sus consumidoras)
+        productores = sum(anterior.num_hilos for anterior in self.etapas if anterior.salida is entrada) or 1
+        etapa = Etapa(nombre, funcion, entrada, salida, hilos, productores, al_fallar)
+        self.etapas.append(etapa)
+        return etapa
+
+    def ejecutar(self):
+        """Ejecuta todas las etapas; si alguna se detuvo por un error propio, lo relanza al terminar"""
+        for etapa in self.etapas:
+            etapa.iniciar()
+        for etapa in self.etapas:
+            etapa.esperar()
+        for etapa in self.etapas:
+            if etapa.fallo:
+                raise RuntimeError(f"La etapa '{etapa.nombre}' se detuvo: {etapa.fallo}") from etapa.fallo
+
+    def resumen(self):
+        """Tabla por etapa con elementos, tiempo ocupado, inactivo y bloqueado"""
+        lineas = [f"   {'Etapa':<16} {'Elem.':>5} {'Ocupada':>9} {'Inactiva':>9} {'Bloqueada':>10}"]
+        for etapa in self.etapas:
+            lineas.append(f"   {etapa.nombre:<16} {etapa.procesados:>5} {etapa.ocupada:>8.1f}s "
+                          f"{etapa.inactiva:>8.1f}s {etapa.bloqueada:>9.1f}s")
+        for cola in self.colas:
+            lineas.append(f"   🧺 Cola {cola.nombre}: profundidad máxima {cola.profundidad_maxima}/{self.tamaño_cola}")
+        return "\n".join(lineas)